@@ -0,0 +1,472 @@
+def _time_call( function, *args, **kwargs ):
+    '''
+    Time a function call with a high resolution clock
+
+    Args
+        function: the function to call
+        args: positional arguments for the function
+        kwargs: keyword arguments for the function
+
+    Return
+        seconds: wall time of the call in seconds
+        output: whatever the function returned
+    '''
+
+    # import required libraries
+    import time
+
+    # time function call
+    start = time.perf_counter()
+    output = function( *args, **kwargs )
+    seconds = time.perf_counter() - start
+
+
+    return seconds, output
+
+
+
+def make_lat_long_series( n_rows = 1_000_000, n_distinct = 50_000, seed = 42, bounds = (-33.7, 5.3), hemispheres = ('S', 'N') ):
+    '''
+    Create a series of messy coordinate strings shaped like CENIPA lat/long columns:
+    a pool of distinct values (dot and comma decimals, degree-minute-second strings
+    and "***" placeholders) repeated over the rows, plus missing values.
+
+    Args
+        n_rows: number of rows of the series
+        n_distinct: number of distinct coordinate strings
+        seed: seed for the random generator
+        bounds: tuple with the (min, max) coordinates (default: Brazil latitudes)
+        hemispheres: tuple with the (negative, positive) hemisphere letters of degree-minute-second strings
+
+    Return
+        series: a pandas series with coordinate strings
+    '''
+
+    # import required libraries
+    import numpy  as np
+    import pandas as pd
+
+    # create random generator
+    rng = np.random.default_rng( seed )
+
+    # create distinct coordinates within bounds
+    coordinates = rng.uniform( bounds[0], bounds[1], n_distinct )
+
+    # dot decimals
+    pool = np.array( [ f'{x:.10f}' for x in coordinates ], dtype = 'object' )
+    # comma decimals
+    comma = rng.random( n_distinct ) < 0.2
+    pool[ comma ] = [ x.replace( '.', ',' ) for x in pool[ comma ] ]
+    # degree-minute-second strings
+    dms = rng.random( n_distinct ) < 0.05
+    pool[ dms ] = [ f"{int(abs(x))}°{int(abs(x) * 60 % 60)}'{int(abs(x) * 3600 % 60)}\"{hemispheres[0] if x < 0 else hemispheres[1]}"
+                    for x in coordinates[ dms ] ]
+    # placeholders for missing data
+    pool[ rng.random( n_distinct ) < 0.02 ] = '***'
+
+    # repeat pool values over rows (few values repeat a lot)
+    series = pd.Series( pool[ rng.zipf( 1.3, n_rows ) % n_distinct ], dtype = 'object' )
+    # add missing values
+    series[ rng.random( n_rows ) < 0.03 ] = np.nan
+
+
+    return series
+
+
+
+def benchmark_lat_long( n_rows = 1_000_000, n_distinct = 50_000, seed = 42, verbose = True ):
+    '''
+    Compare clean_lat_long (per-row regex) with parse_lat_long (factorized and vectorized)
+    on a CENIPA-like coordinate series.
+
+    Args
+        n_rows: number of rows of the series
+        n_distinct: number of distinct coordinate strings
+        seed: seed for the random generator
+        verbose: a boolean to check if user wants to see a report of the results
+
+    Return
+        results: a dictionary with timings, speedup and agreement between both parsers
+    '''
+
+    # import required libraries
+    import numpy as np
+    from a3data_case.data_description import clean_lat_long, parse_lat_long
+
+    # create coordinates
+    series = make_lat_long_series( n_rows, n_distinct, seed )
+
+    # time both parsers
+    old_seconds, old_values = _time_call( clean_lat_long, series )
+    new_seconds, new_values = _time_call( parse_lat_long, series )
+
+    # compare outputs on rows that are not degree-minute-second strings
+    decimal_rows = ~series.astype( str ).str.contains( '°', regex = False ).to_numpy()
+    agreement = np.mean( np.isclose( old_values[ decimal_rows ], new_values[ decimal_rows ], equal_nan = True ) )
+
+    # gather results
+    results = {'n_rows': n_rows,
+               'n_distinct': n_distinct,
+               'clean_lat_long_seconds': old_seconds,
+               'parse_lat_long_seconds': new_seconds,
+               'speedup': old_seconds / new_seconds,
+               'decimal_agreement': float( agreement ) }
+
+    # check if user wants a quick report of the results
+    if verbose:
+        print(f"clean_lat_long: {old_seconds:,.3f} s",
+              f"\nparse_lat_long: {new_seconds:,.3f} s",
+              f"\nSpeedup: {results['speedup']:,.1f}x",
+              f"\nAgreement on decimal coordinates: {agreement * 100:.2f}%")
+
+
+    return results
+
+
+
+# libraries that must not be imported by the package or by the CLI startup
+HEAVY_LIBRARIES = ['pandas', 'numpy', 'scipy', 'matplotlib', 'seaborn', 'IPython', 'pyarrow']
+
+
+
+def check_import_time( budget_ms = 100, argv = ('--help',), repeat = 3, verbose = True ):
+    '''
+    Check the import-time budget of the a3data_case-run CLI.
+    The CLI runs on a fresh interpreter (python -X importtime -m a3data_case.cli) and the self time
+    of every import is summed (best of repeat runs). The check fails if the total is
+    over budget or if any heavy library (HEAVY_LIBRARIES) was imported.
+
+    Args
+        budget_ms: maximum import time in milliseconds
+        argv: command line arguments given to the CLI
+        repeat: number of runs (the fastest one is kept)
+        verbose: a boolean to check if user wants to see a report of the results
+
+    Return
+        results: a dictionary with import and wall times in milliseconds, heavy libraries
+                 that were imported and whether the check passed
+    '''
+
+    # import required libraries
+    import os
+    import sys
+    import subprocess
+
+    # make the package importable on the child interpreter
+    package_root = os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) )
+    env = dict( os.environ, PYTHONPATH = os.pathsep.join( [ package_root, os.environ.get( 'PYTHONPATH', '' ) ] ) )
+
+
+    # keep the fastest run
+    import_ms, wall_ms, imported = None, None, set()
+    for _ in range( repeat ):
+
+        # run CLI on a fresh interpreter
+        seconds, process = _time_call( subprocess.run, [ sys.executable, '-X', 'importtime', '-m', 'a3data_case.cli', *argv ],
+                                       capture_output = True, text = True, env = env )
+
+        # sum the self time of every import ("import time: self [us] | cumulative | imported package")
+        total_us, modules = 0, set()
+        for line in process.stderr.splitlines():
+            if line.startswith( 'import time:' ) and not line.rstrip().endswith( 'imported package' ):
+                self_us, _, module = line[ len( 'import time:' ): ].split( '|' )
+                total_us += int( self_us )
+                modules.add( module.strip().split( '.' )[0] )
+
+        # save fastest run
+        if import_ms is None or total_us / 1000 < import_ms:
+            import_ms, wall_ms, imported = total_us / 1000, seconds * 1000, modules
+
+    # gather results
+    heavy_imports = sorted( imported.intersection( HEAVY_LIBRARIES ) )
+    results = {'argv': list( argv ),
+               'import_ms': import_ms,
+               'wall_ms': wall_ms,
+               'budget_ms': budget_ms,
+               'heavy_imports': heavy_imports,
+               'passed': import_ms <= budget_ms and not heavy_imports }
+
+    # check if user wants a quick report of the results
+    if verbose:
+        print(f"a3data_case-run {' '.join( argv )}: imports {import_ms:,.1f} ms (budget {budget_ms:,.0f} ms),",
+              f"wall time {wall_ms:,.1f} ms",
+              f"\nHeavy libraries imported: {', '.join( heavy_imports ) if heavy_imports else 'none'}",
+              f"\nImport-time check {'passed' if results['passed'] else 'FAILED'}")
+
+
+    return results
+
+
+
+def _zipf_choice( rng, levels, n_rows, exponent = 1.1, na_rate = 0.0 ):
+    '''
+    Draw categorical values whose frequencies decay with their rank (few levels are very common)
+
+    Args
+        rng: a numpy random generator
+        levels: list with the levels
+        n_rows: number of values to draw
+        exponent: decay exponent of the frequencies
+        na_rate: share of missing values
+
+    Return
+        values: a numpy object array with the drawn values (None for missing values)
+    '''
+
+    # import required libraries
+    import numpy as np
+
+    # frequency of each level decays with its rank
+    probabilities = 1 / np.arange( 1, len( levels ) + 1 ) ** exponent
+    probabilities = probabilities / probabilities.sum()
+
+    # draw values
+    values = np.asarray( levels, dtype = 'object' )[ rng.choice( len( levels ), size = n_rows, p = probabilities ) ]
+    # add missing values
+    values[ rng.random( n_rows ) < na_rate ] = None
+
+
+    return values
+
+
+
+def make_cenipa_frame( n_rows = 10_000, seed = 42 ):
+    '''
+    Create a seeded dataframe shaped like the merged CENIPA tables (occurrence, aircraft
+    and contributing factors): realistic categorical cardinalities with skewed frequencies,
+    messy lat/long strings, skewed numerical columns and missing values.
+
+    Args
+        n_rows: number of rows (e.g. 10k to 10M)
+        seed: seed for the random generator
+
+    Return
+        dataframe: a pandas dataframe
+    '''
+
+    # import required libraries
+    import numpy  as np
+    import pandas as pd
+
+    # create random generator
+    rng = np.random.default_rng( seed )
+
+    # brazilian states (+ placeholder for missing data)
+    states = ['SP', 'RS', 'PR', 'MG', 'MT', 'GO', 'RJ', 'BA', 'PA', 'MS', 'SC', 'AM', 'TO', 'MA', 'PE',
+              'DF', 'RO', 'CE', 'PI', 'ES', 'RR', 'AC', 'AP', 'PB', 'RN', 'AL', 'SE', '***']
+
+    # occurrence dates from 2007 on
+    dates = pd.Timestamp( '2007-01-01' ) + pd.to_timedelta( rng.integers( 0, 16 * 365, n_rows ), unit = 'D' )
+
+    # distinct coordinate strings -> some repetition as on the real data
+    n_distinct = max( min( n_rows // 5, 200_000 ), 10 )
+
+    # build dataframe
+    dataframe = pd.DataFrame({
+        # ======= OCCURRENCE =======
+        'codigo_ocorrencia': np.arange( n_rows ) + 10_000,
+        'ocorrencia_classificacao': _zipf_choice( rng, ['INCIDENTE', 'ACIDENTE', 'INCIDENTE GRAVE'], n_rows, 0.8 ),
+        'ocorrencia_tipo': _zipf_choice( rng, [ f'TIPO {i}' for i in range( 80 ) ], n_rows, 1.1, 0.01 ),
+        'ocorrencia_uf': _zipf_choice( rng, states, n_rows, 1.0, 0.005 ),
+        'ocorrencia_cidade': _zipf_choice( rng, [ f'CIDADE {i}' for i in range( 2_000 ) ], n_rows, 1.0, 0.01 ),
+        'ocorrencia_dia': dates.strftime( '%d/%m/%Y' ),
+        'ocorrencia_latitude': make_lat_long_series( n_rows, n_distinct, seed + 1 ).to_numpy(),
+        'ocorrencia_longitude': make_lat_long_series( n_rows, n_distinct, seed + 2, bounds = (-73.9, -34.8),
+                                                      hemispheres = ('W', 'E') ).to_numpy(),
+        'total_recomendacoes': rng.poisson( 0.6, n_rows ),
+        # ======= AIRCRAFT =======
+        'aeronave_tipo_veiculo': _zipf_choice( rng, ['AVIÃO', 'HELICÓPTERO', 'ULTRALEVE', 'PLANADOR', 'ANFÍBIO',
+                                                     'DIRIGÍVEL', 'GIROCÓPTERO', 'BALÃO', 'HIDROAVIÃO', '***'], n_rows, 1.5 ),
+        'aeronave_fabricante': _zipf_choice( rng, [ f'FABRICANTE {i}' for i in range( 300 ) ], n_rows, 1.2, 0.02 ),
+        'aeronave_modelo': _zipf_choice( rng, [ f'MODELO {i}' for i in range( 1_500 ) ], n_rows, 1.1, 0.02 ),
+        'aeronave_motor_quantidade': _zipf_choice( rng, ['MONOMOTOR', 'BIMOTOR', 'TRIMOTOR', 'QUADRIMOTOR', 'SEM TRAÇÃO'], n_rows, 1.5 ),
+        'aeronave_pmd': np.round( rng.lognormal( 7.5, 1.2, n_rows ) ),
+        'aeronave_assentos': np.where( rng.random( n_rows ) < 0.05, np.nan, rng.choice( [1, 2, 4, 6, 8, 12, 50, 150], n_rows ) ),
+        'aeronave_ano_fabricacao': np.where( rng.random( n_rows ) < 0.04, np.nan, rng.integers( 1940, 2023, n_rows ) ),
+        'aeronave_fase_operacao': _zipf_choice( rng, [ f'FASE {i}' for i in range( 30 ) ], n_rows, 1.0, 0.01 ),
+        'aeronave_tipo_operacao': _zipf_choice( rng, ['PRIVADA', 'REGULAR', 'INSTRUÇÃO', 'TÁXI AÉREO', 'AGRÍCOLA',
+                                                      'EXPERIMENTAL', 'POLICIAL', 'ESPECIALIZADA'], n_rows, 1.0 ),
+        'aeronave_nivel_dano': _zipf_choice( rng, ['NENHUM', 'LEVE', 'SUBSTANCIAL', 'DESTRUÍDA', '***'], n_rows, 1.0 ),
+        'aeronave_fatalidades_total': rng.poisson( 0.08, n_rows ) * rng.integers( 1, 4, n_rows ),
+        # ======= CONTRIBUTING FACTORS =======
+        'fator_nome': _zipf_choice( rng, [ f'FATOR {i}' for i in range( 100 ) ], n_rows, 1.0, 0.2 ),
+        'fator_area': _zipf_choice( rng, ['FATOR HUMANO', 'FATOR OPERACIONAL', 'FATOR MATERIAL', 'OUTRO'], n_rows, 1.0, 0.2 ),
+    })
+
+
+    return dataframe
+
+
+
+# categorical columns used to benchmark create_cramer_v_dataframe
+BENCHMARK_CATEGORICAL_COLUMNS = ['ocorrencia_classificacao', 'ocorrencia_uf', 'aeronave_tipo_veiculo',
+                                 'aeronave_motor_quantidade', 'aeronave_tipo_operacao', 'aeronave_nivel_dano',
+                                 'fator_area', 'aeronave_fase_operacao']
+
+
+
+def benchmark_functions():
+    '''
+    Get the library functions timed by run_benchmarks.
+    Display-only functions are timed through their headless counterparts.
+
+    Args
+        None
+
+    Return
+        functions: a dictionary with names as keys and functions of a CENIPA-like dataframe as values
+    '''
+
+    # import required libraries
+    from a3data_case import data_description, data_extraction, eda
+
+    # every function gets the synthetic dataframe
+    functions = {
+        'compute_summary_statistics': lambda df: data_description.compute_summary_statistics( df ),
+        'compute_dataframe_description': lambda df: data_description.compute_dataframe_description( df ),
+        'compute_dataframe_description_approx': lambda df: data_description.compute_dataframe_description( df, mode = 'approx', seed = 0 ),
+        'clean_lat_long': lambda df: data_description.clean_lat_long( df['ocorrencia_latitude'] ),
+        'parse_lat_long': lambda df: data_description.parse_lat_long( df['ocorrencia_latitude'] ),
+        'downcast_dataframe': lambda df: data_extraction.downcast_dataframe( df, verbose = False ),
+        'create_cramer_v_dataframe': lambda df: eda.create_cramer_v_dataframe( df[ BENCHMARK_CATEGORICAL_COLUMNS ] ),
+        'cramer_v_significance': lambda df: eda.cramer_v_significance( df[ BENCHMARK_CATEGORICAL_COLUMNS ], n_permutations = 99, seed = 0 ),
+    }
+
+
+    return functions
+
+
+
+def run_benchmarks( scales = (10_000, 100_000, 1_000_000), functions = None, repeat = 3, seed = 42,
+                    output_path = None, verbose = True ):
+    '''
+    Time every library function (best of repeat runs) and track its peak allocated memory
+    (one extra run under tracemalloc) on CENIPA-like dataframes of several sizes.
+
+    Args
+        scales: list with the number of rows of each dataframe (e.g. 10k to 10M)
+        functions: list with the names of the functions to run (None runs all of benchmark_functions)
+        repeat: number of timed runs of each function (the fastest one is kept)
+        seed: seed for the synthetic dataframes
+        output_path: path of a JSON file to save results (None doesn't save)
+        verbose: a boolean to check if user wants to see each result
+
+    Return
+        results: a dictionary with environment metadata and one entry per (function, scale)
+    '''
+
+    # import required libraries
+    import json
+    import platform
+    import datetime
+    import tracemalloc
+    import numpy  as np
+    import pandas as pd
+
+    # get functions to run
+    registry = benchmark_functions()
+    names = list( registry ) if functions is None else list( functions )
+
+    # environment metadata
+    results = {'meta': {'timestamp': datetime.datetime.now().isoformat( timespec = 'seconds' ),
+                        'python': platform.python_version(),
+                        'numpy': np.__version__,
+                        'pandas': pd.__version__,
+                        'platform': platform.platform(),
+                        'seed': seed,
+                        'repeat': repeat},
+               'results': [] }
+
+    # iterate over dataframe sizes
+    for n_rows in scales:
+
+        # create synthetic dataframe
+        dataframe = make_cenipa_frame( n_rows, seed )
+
+        # iterate over functions
+        for name in names:
+
+            # keep fastest run
+            seconds = min( _time_call( registry[ name ], dataframe )[0] for _ in range( repeat ) )
+
+            # track peak allocated memory on a separate run (tracing slows code down)
+            tracemalloc.start()
+            registry[ name ]( dataframe )
+            peak_bytes = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            # save result
+            results['results'].append( {'function': name, 'n_rows': n_rows, 'seconds': seconds, 'peak_mb': peak_bytes / (10**6)} )
+
+            # check if user wants to see each result
+            if verbose:
+                print(f"{name:<40} {n_rows:>12,} rows {seconds:>10.4f} s {peak_bytes / (10**6):>10.1f} MB")
+
+    # save results
+    if output_path is not None:
+        with open( output_path, 'w', encoding = 'utf-8' ) as file:
+            json.dump( results, file, indent = 4 )
+
+
+    return results
+
+
+
+def check_benchmark_regressions( results, baseline, threshold = 1.25, min_seconds = 0.01, verbose = True ):
+    '''
+    Compare benchmark results with a stored baseline.
+    A function regressed if it is slower than threshold times its baseline time
+    (and slower by more than min_seconds, so tiny timings don't fail on noise).
+
+    Args
+        results: a dictionary returned by run_benchmarks or the path of its JSON file
+        baseline: a dictionary returned by run_benchmarks or the path of its JSON file
+        threshold: maximum allowed ratio between new and baseline times
+        min_seconds: minimum slowdown in seconds to be considered a regression
+        verbose: a boolean to check if user wants to see a report of the results
+
+    Return
+        report: a dictionary with every compared (function, scale) pair, the regressions
+                and whether the check passed
+    '''
+
+    # import required libraries
+    import json
+
+    # load results from files if needed
+    loaded = []
+    for data in (results, baseline):
+        if isinstance( data, dict ):
+            loaded.append( data )
+        else:
+            with open( data, encoding = 'utf-8' ) as file:
+                loaded.append( json.load( file ) )
+    results, baseline = loaded
+
+    # index baseline times by function and scale
+    baseline_seconds = { (entry['function'], entry['n_rows']): entry['seconds'] for entry in baseline['results'] }
+
+    # compare every result that has a baseline
+    comparisons = []
+    for entry in results['results']:
+        key = (entry['function'], entry['n_rows'])
+        if key in baseline_seconds:
+            ratio = entry['seconds'] / baseline_seconds[ key ] if baseline_seconds[ key ] > 0 else float( 'inf' )
+            regressed = ratio > threshold and entry['seconds'] - baseline_seconds[ key ] > min_seconds
+            comparisons.append( {'function': entry['function'], 'n_rows': entry['n_rows'],
+                                 'baseline_seconds': baseline_seconds[ key ], 'seconds': entry['seconds'],
+                                 'ratio': ratio, 'regressed': regressed} )
+
+    # gather report
+    regressions = [ comparison for comparison in comparisons if comparison['regressed'] ]
+    report = {'threshold': threshold, 'comparisons': comparisons, 'regressions': regressions, 'passed': not regressions}
+
+    # check if user wants a quick report of the results
+    if verbose:
+        for regression in regressions:
+            print(f"REGRESSION {regression['function']} ({regression['n_rows']:,} rows): "
+                  f"{regression['baseline_seconds']:.4f} s -> {regression['seconds']:.4f} s ({regression['ratio']:.2f}x)")
+        print(f"{len( comparisons )} timings compared, {len( regressions )} regressions (threshold {threshold:.2f}x)")
+
+
+    return report
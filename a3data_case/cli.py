@@ -0,0 +1,370 @@
+'''
+Command line interface of the a3data_case package (a3data_case-run).
+
+Only argparse is imported at startup: each subcommand imports
+the libraries it needs when it runs.
+'''
+
+# import required libraries
+import argparse
+
+
+
+def _read_csv( args, columns = None ):
+    '''
+    Read the CSV file given on the command line
+
+    Args
+        args: parsed command line arguments (file, sep and encoding)
+        columns: list with the columns to read (None reads all columns)
+
+    Return
+        dataframe: a pandas dataframe
+    '''
+
+    # import required libraries
+    import pandas as pd
+
+
+    return pd.read_csv( args.file, sep = args.sep, encoding = args.encoding, usecols = columns, low_memory = False )
+
+
+
+def _write_table( dataframe, output, index = False ):
+    '''
+    Write a table to a CSV file or print it when no output file is given
+
+    Args
+        dataframe: a pandas dataframe
+        output: path of the output CSV file or None
+        index: a boolean to check if the dataframe index is written
+
+    Return
+        None: a None type object
+    '''
+
+    # print table
+    if output is None:
+        print( dataframe.to_string( index = index ) )
+    # write table
+    else:
+        dataframe.to_csv( output, index = index )
+        print( f'Table saved to {output}' )
+
+
+    return None
+
+
+
+def _profile( args ):
+    '''
+    Run the profile subcommand: streaming summary statistics (and optionally the descriptive table)
+
+    Args
+        args: parsed command line arguments
+
+    Return
+        None: a None type object
+    '''
+
+    # import required libraries
+    from a3data_case.data_description import stream_summary_statistics, compute_dataframe_description
+
+    # calculate statistics reading the file in chunks
+    df_stats = stream_summary_statistics( args.file, chunksize = args.chunksize, sep = args.sep, encoding = args.encoding )
+    _write_table( df_stats, args.output )
+
+    # check if user wants the descriptive table
+    if args.describe is not None:
+        df_description = compute_dataframe_description( _read_csv( args ), mode = args.describe, n_jobs = args.n_jobs )
+        print( f"Dataframe size in memory: {df_description.attrs['memory_mb']:,.3f} MB" )
+        _write_table( df_description, args.describe_output, index = True )
+
+
+    return None
+
+
+
+def _downcast( args ):
+    '''
+    Run the downcast subcommand: plan dtypes and save the plan as JSON
+
+    Args
+        args: parsed command line arguments
+
+    Return
+        None: a None type object
+    '''
+
+    # import required libraries
+    import json
+    from a3data_case.data_extraction import plan_downcast, save_dtype_plan
+
+    # scan columns and plan their dtypes
+    plan = plan_downcast( _read_csv( args ), categories = not args.no_categories,
+                          max_category_ratio = args.max_category_ratio, n_jobs = args.n_jobs )
+
+    # print plan
+    if args.output is None:
+        print( json.dumps( plan, indent = 4, ensure_ascii = False ) )
+    # save plan
+    else:
+        save_dtype_plan( plan, args.output )
+        print( f'Dtype plan saved to {args.output}' )
+
+
+    return None
+
+
+
+def _correlate( args ):
+    '''
+    Run the correlate subcommand: Cramer-V matrix of categorical columns
+    (or a table of pairs with permutation p-values)
+
+    Args
+        args: parsed command line arguments
+
+    Return
+        None: a None type object
+    '''
+
+    # import required libraries
+    from a3data_case.eda import create_cramer_v_dataframe, cramer_v_significance
+
+    # read categorical columns (all non-numerical columns by default)
+    dataframe = _read_csv( args, args.columns )
+    if args.columns is None:
+        dataframe = dataframe.select_dtypes( exclude = 'number' )
+
+    # calculate Cramer-V and p-value of every pair
+    if args.permutations is not None:
+        df_significance = cramer_v_significance( dataframe, n_permutations = args.permutations,
+                                                 nan_policy = args.nan_policy, seed = args.seed, n_jobs = args.n_jobs )
+        _write_table( df_significance, args.output )
+        return None
+
+    # calculate Cramer-V matrix
+    categ_corr_matrix = create_cramer_v_dataframe( dataframe, n_jobs = args.n_jobs )
+    _write_table( categ_corr_matrix, args.output, index = True )
+
+
+    return None
+
+
+
+def _plot_export( args ):
+    '''
+    Run the plot-export subcommand: one figure file per column plus a manifest
+
+    Args
+        args: parsed command line arguments
+
+    Return
+        None: a None type object
+    '''
+
+    # import required libraries
+    from a3data_case.eda import export_figures
+
+    # render and save figures
+    manifest = export_figures( _read_csv( args ), args.output_dir, formats = args.formats,
+                               n_jobs = args.n_jobs, aggregate = not args.no_aggregate )
+
+    # print a quick report
+    n_errors = sum( entry['error'] is not None for entry in manifest['figures'] )
+    print( f"{len( manifest['figures'] )} figures exported to {manifest['output_dir']} "
+           f"in {manifest['seconds']:,.1f} s ({n_errors} errors)" )
+
+
+    return None
+
+
+
+def _update_profile( args ):
+    '''
+    Run the update-profile subcommand: add the rows of a CSV file (e.g. only the new rows
+    of a release) to a saved profile state and print refreshed statistics
+
+    Args
+        args: parsed command line arguments
+
+    Return
+        None: a None type object
+    '''
+
+    # import required libraries
+    import os
+    import pandas as pd
+    from a3data_case.incremental import ProfileState
+
+    # load saved state or create a new one
+    if os.path.isfile( args.state ):
+        state = ProfileState.load( args.state )
+    else:
+        state = ProfileState( categorical_columns = args.categorical, max_levels = args.max_levels )
+
+    # add new rows chunk by chunk
+    n_rows = state.n_rows
+    for chunk in pd.read_csv( args.file, sep = args.sep, encoding = args.encoding, chunksize = args.chunksize, low_memory = False ):
+        state.update( chunk )
+
+    # save state
+    state.save( args.state )
+    print( f'{state.n_rows - n_rows:,} rows added to {args.state} ({state.n_rows:,} rows in total)' )
+
+    # write refreshed statistics and Cramer-V matrix
+    _write_table( state.summary_statistics(), args.output )
+    if args.cramer_output is not None:
+        _write_table( state.cramer_v_dataframe(), args.cramer_output, index = True )
+
+
+    return None
+
+
+
+def _benchmark( args ):
+    '''
+    Run the benchmark subcommand: time library functions on synthetic CENIPA-like data
+    and optionally compare them with a stored baseline
+
+    Args
+        args: parsed command line arguments
+
+    Return
+        exit_code: 1 if any function regressed against the baseline, otherwise 0
+    '''
+
+    # import required libraries
+    from a3data_case.benchmark import run_benchmarks, check_benchmark_regressions
+
+    # time functions
+    results = run_benchmarks( scales = args.scales, functions = args.functions, repeat = args.repeat,
+                              seed = args.seed, output_path = args.output )
+
+    # compare with baseline
+    if args.baseline is not None:
+        report = check_benchmark_regressions( results, args.baseline, threshold = args.threshold )
+        return 0 if report['passed'] else 1
+
+
+    return 0
+
+
+
+def build_parser():
+    '''
+    Build the command line parser
+
+    Args
+        None
+
+    Return
+        parser: an argparse.ArgumentParser object
+    '''
+
+    # create parser
+    parser = argparse.ArgumentParser( prog = 'a3data_case-run',
+                                      description = 'Profile, downcast, correlate and plot CENIPA CSV exports.' )
+    subparsers = parser.add_subparsers( dest = 'command', required = True )
+
+    # arguments shared by every subcommand
+    csv_parser = argparse.ArgumentParser( add_help = False )
+    csv_parser.add_argument( 'file', help = 'CSV file' )
+    csv_parser.add_argument( '--sep', default = ';', help = 'CSV separator (default: ;)' )
+    csv_parser.add_argument( '--encoding', default = 'latin-1', help = 'CSV encoding (default: latin-1)' )
+
+    # profile subcommand
+    profile = subparsers.add_parser( 'profile', parents = [ csv_parser ],
+                                     help = 'summary statistics of numerical columns (streamed in chunks)' )
+    profile.add_argument( '--chunksize', type = int, default = 100_000, help = 'rows per chunk' )
+    profile.add_argument( '--output', help = 'CSV file for the statistics table (default: print)' )
+    profile.add_argument( '--describe', choices = ['exact', 'approx'],
+                          help = 'also build the descriptive table (loads the whole file)' )
+    profile.add_argument( '--describe-output', help = 'CSV file for the descriptive table (default: print)' )
+    profile.add_argument( '--n-jobs', type = int, default = None, help = 'worker threads of the descriptive table (-1 uses all cores)' )
+    profile.set_defaults( function = _profile )
+
+    # downcast subcommand
+    downcast = subparsers.add_parser( 'downcast', parents = [ csv_parser ], help = 'plan the smallest dtypes of every column' )
+    downcast.add_argument( '--output', help = 'JSON file for the dtype plan (default: print)' )
+    downcast.add_argument( '--max-category-ratio', type = float, default = 0.5,
+                           help = 'maximum unique/non-missing ratio for category columns' )
+    downcast.add_argument( '--no-categories', action = 'store_true', help = 'keep string columns as they are' )
+    downcast.add_argument( '--n-jobs', type = int, default = None, help = 'worker threads (-1 uses all cores)' )
+    downcast.set_defaults( function = _downcast )
+
+    # correlate subcommand
+    correlate = subparsers.add_parser( 'correlate', parents = [ csv_parser ], help = "Cramer's V matrix of categorical columns" )
+    correlate.add_argument( '--columns', nargs = '+', help = 'categorical columns (default: all non-numerical columns)' )
+    correlate.add_argument( '--n-jobs', type = int, default = None, help = 'worker processes (-1 uses all cores)' )
+    correlate.add_argument( '--permutations', type = int,
+                            help = 'maximum shuffles per pair of a permutation test (writes a table of pairs with p-values)' )
+    correlate.add_argument( '--nan-policy', choices = ['drop', 'level'], default = 'drop',
+                            help = 'drop missing values of each pair or count them as a level (permutation test)' )
+    correlate.add_argument( '--seed', type = int, default = None, help = 'seed of the permutation test' )
+    correlate.add_argument( '--output', help = 'CSV file for the matrix (default: print)' )
+    correlate.set_defaults( function = _correlate )
+
+    # plot-export subcommand
+    plot_export = subparsers.add_parser( 'plot-export', parents = [ csv_parser ], help = 'export one figure per column' )
+    plot_export.add_argument( 'output_dir', help = 'directory for figures and manifest.json' )
+    plot_export.add_argument( '--formats', nargs = '+', default = ['png'], help = 'file formats (default: png)' )
+    plot_export.add_argument( '--n-jobs', type = int, default = -1, help = 'worker processes (default: all cores)' )
+    plot_export.add_argument( '--no-aggregate', action = 'store_true', help = 'plot raw rows with seaborn' )
+    plot_export.set_defaults( function = _plot_export )
+
+    # update-profile subcommand
+    update_profile = subparsers.add_parser( 'update-profile', parents = [ csv_parser ],
+                                            help = 'add new rows to a saved profile state (statistics and Cramer-V)' )
+    update_profile.add_argument( '--state', required = True, help = 'profile state file (.npz), created if it does not exist' )
+    update_profile.add_argument( '--categorical', nargs = '+',
+                                 help = 'categorical columns of a new state (default: non-numerical columns with few levels)' )
+    update_profile.add_argument( '--max-levels', type = int, default = 1000,
+                                 help = 'maximum levels of the default categorical columns of a new state' )
+    update_profile.add_argument( '--chunksize', type = int, default = 100_000, help = 'rows per chunk' )
+    update_profile.add_argument( '--output', help = 'CSV file for the statistics table (default: print)' )
+    update_profile.add_argument( '--cramer-output', help = "CSV file for the Cramer's V matrix" )
+    update_profile.set_defaults( function = _update_profile )
+
+    # benchmark subcommand
+    benchmark = subparsers.add_parser( 'benchmark', help = 'time library functions on synthetic CENIPA-like data' )
+    benchmark.add_argument( '--scales', type = int, nargs = '+', default = [10_000, 100_000, 1_000_000],
+                            help = 'number of rows of each synthetic dataframe' )
+    benchmark.add_argument( '--functions', nargs = '+', help = 'functions to time (default: all)' )
+    benchmark.add_argument( '--repeat', type = int, default = 3, help = 'timed runs per function (fastest is kept)' )
+    benchmark.add_argument( '--seed', type = int, default = 42, help = 'seed of the synthetic data' )
+    benchmark.add_argument( '--output', help = 'JSON file for the results' )
+    benchmark.add_argument( '--baseline', help = 'JSON file with baseline results to compare with' )
+    benchmark.add_argument( '--threshold', type = float, default = 1.25,
+                            help = 'maximum allowed slowdown ratio against the baseline (default: 1.25)' )
+    benchmark.set_defaults( function = _benchmark )
+
+
+    return parser
+
+
+
+def main( argv = None ):
+    '''
+    Run the a3data_case-run command line interface
+
+    Args
+        argv: list of command line arguments (None uses sys.argv)
+
+    Return
+        exit_code: 0 on success (subcommands may return other exit codes)
+    '''
+
+    # parse arguments and run subcommand
+    args = build_parser().parse_args( argv )
+    exit_code = args.function( args )
+
+
+    return exit_code or 0
+
+
+
+if __name__ == '__main__':
+    import sys
+    sys.exit( main() )
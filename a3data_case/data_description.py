@@ -1,81 +1,237 @@
-def summary_statistics( dataframe ):
+# order of the columns of the statistics table
+STATISTICS_COLUMNS = ['attribute', 
+                      'mean',
+                      'median',
+                      'std',
+                      'iqr',
+                      'min',
+                      'max',
+                      'range',
+                      'skew',
+                      'kurtosis']
+
+
+
+def _moment_statistics( count, max_abs, m2, m3, m4 ):
     '''
-    It displays statistics for numerical features of the dataframe.
-    Displayed statistics are: mean, median, std, min, max, range, skew, kurtosis and iqr.
+    It calculates std, skew and kurtosis from the sums of central powers of each column.
+    Std is the population std (like np.std) and skew/kurtosis are the bias-corrected
+    estimators used by pandas.
+    
+    Args
+        count: numpy array with the number of non-missing values of each column
+        max_abs: numpy array with the maximum absolute value of each column
+        m2: numpy array with the sum of squared deviations from the mean
+        m3: numpy array with the sum of cubed deviations from the mean
+        m4: numpy array with the sum of deviations from the mean to the fourth power
+
+    Return
+        statistics: a dictionary with std, skew and kurtosis numpy arrays
+    '''
+
+    # import required libraries
+    import numpy as np
+
+    # ensure all inputs are float arrays
+    count, max_abs, m2, m3, m4 = [ np.asarray( x, dtype = 'float64' ) for x in (count, max_abs, m2, m3, m4) ]
+
+    # zero out floating point errors of (almost) constant columns
+    eps = np.finfo( 'float64' ).eps
+    m2 = np.where( np.abs( m2 ) <= ( (eps * max_abs) ** 2 ) * count, 0, m2 )
+    m3 = np.where( np.abs( m3 ) <= ( (eps * max_abs) ** 3 ) * count, 0, m3 )
+    m4 = np.where( np.abs( m4 ) <= ( (eps * max_abs) ** 4 ) * count, 0, m4 )
+
+    with np.errstate( invalid = 'ignore', divide = 'ignore' ):
+        # population standard deviation
+        std = np.sqrt( m2 / count )
+
+        # bias-corrected skew
+        skew = ( count * (count - 1) ** 0.5 / (count - 2) ) * ( m3 / m2**1.5 )
+        skew = np.where( m2 == 0, 0, skew )
+        skew = np.where( count < 3, np.nan, skew )
+
+        # bias-corrected excess kurtosis
+        numerator = count * (count + 1) * (count - 1) * m4
+        denominator = (count - 2) * (count - 3) * m2**2
+        kurtosis = numerator / denominator - 3 * (count - 1) ** 2 / ( (count - 2) * (count - 3) )
+        kurtosis = np.where( denominator == 0, 0, kurtosis )
+        kurtosis = np.where( count < 4, np.nan, kurtosis )
+
+
+    return {'std': std, 'skew': skew, 'kurtosis': kurtosis}
+
+
+
+def _block_statistics( block ):
+    '''
+    It calculates statistics of every row of a float block (one row per numerical feature).
+    Missing values (nan) are skipped.
+
+    Args
+        block: a 2D float numpy array with one row per feature
+
+    Return
+        dict_stats: a dictionary with one numpy array per statistic (without attribute names)
+    '''
+
+    # import required libraris
+    import numpy  as np
+
+    # get missing values mask and number of valid values
+    na_mask = np.isnan( block )
+    has_na = na_mask.any()
+    count = block.shape[1] - na_mask.sum( axis = 1 )
+
+    with np.errstate( invalid = 'ignore', divide = 'ignore' ):
+        # check if there are missing values
+        if has_na:
+            # sort values -> missing values are moved to the end of each row
+            sorted_block = np.sort( block, axis = 1 )
+            # get the quantiles position of each row from the number of valid values
+            positions = np.outer( count - 1, [0.25, 0.5, 0.75] ).clip( min = 0 )
+            lower = np.floor( positions ).astype( 'int64' )
+            upper = np.ceil( positions ).astype( 'int64' )
+            # linearly interpolate quantiles (same as np.percentile)
+            lower_values = np.take_along_axis( sorted_block, lower, axis = 1 )
+            upper_values = np.take_along_axis( sorted_block, upper, axis = 1 )
+            quantiles = ( lower_values + (upper_values - lower_values) * (positions - lower) ).T
+            # get min and max from the sorted values
+            min_stats = sorted_block[ :, 0 ]
+            max_stats = np.take_along_axis( sorted_block, ( count - 1 ).clip( min = 0 )[:, None], axis = 1 )[:, 0]
+            # zero out missing values so they don't change sums
+            block = np.where( na_mask, 0, block )
+
+        # no missing values
+        else:
+            # calculate median, Q1 and Q3 with a single partition
+            quantiles = np.quantile( block, [0.25, 0.5, 0.75], axis = 1 ) if block.shape[1] > 0 \
+                        else np.full( (3, block.shape[0]), np.nan )
+            # calculate min and max
+            min_stats = block.min( axis = 1, initial = np.inf )
+            max_stats = block.max( axis = 1, initial = -np.inf )
+
+        # columns without valid values have no statistics
+        quantiles = np.where( count > 0, quantiles, np.nan )
+        min_stats = np.where( count > 0, min_stats, np.nan )
+        max_stats = np.where( count > 0, max_stats, np.nan )
+
+        # central tendency statistics
+        mean_stats = block.sum( axis = 1 ) / count
+
+        # sums of central powers
+        deviations = block - mean_stats[:, None]
+        if has_na:
+            deviations[ na_mask ] = 0
+        deviations2 = deviations**2
+        m2 = deviations2.sum( axis = 1 )
+        m3 = ( deviations2 * deviations ).sum( axis = 1 )
+        m4 = ( deviations2**2 ).sum( axis = 1 )
+
+    # deviation statistics
+    moment_stats = _moment_statistics( count, np.fmax( np.abs( min_stats ), np.abs( max_stats ) ), m2, m3, m4 )
+
+    # gather statistics
+    dict_stats = {'mean': mean_stats,
+                  'median': quantiles[1],
+                  'std': moment_stats['std'],
+                  'iqr': quantiles[2] - quantiles[0],
+                  'min': min_stats,
+                  'max': max_stats,
+                  'range': max_stats - min_stats,
+                  'skew': moment_stats['skew'],
+                  'kurtosis': moment_stats['kurtosis'] }
+
+
+    return dict_stats
+
+
+
+def compute_summary_statistics( dataframe, as_dict = False, n_jobs = None, backend = 'threads' ):
+    '''
+    It calculates statistics for numerical features of the dataframe without displaying anything.
+    Calculated statistics are: mean, median, std, iqr, min, max, range, skew and kurtosis.
+    All statistics are calculated at once over a contiguous float block of the numerical features
+    and median, Q1 and Q3 come from a single quantile call. Missing values are skipped.
     
     Args
         dataframe: the dataframe that the user wants to check statistics
+        as_dict: boolean to indicate if user wants a dictionary of numpy arrays (True)
+            or a pandas dataframe (False)
+        n_jobs: number of workers the features are split on (None or 1 -> current thread, -1 -> all cores)
+        backend: 'threads' or 'processes' (the float block is shared with processes through shared memory)
 
     Return
-        None: a None type object
+        df_stats: a pandas dataframe with one row per numerical feature
+            (or a dictionary with one numpy array per statistic)
     '''
 
     # import required libraris
     import pandas as pd
     import numpy  as np
+    from a3data_case.parallel import map_block_rows
+    from a3data_case.instrumentation import stage
 
-    # ======= STATISTICS =======
-    
-    # get numeric variables
-    df_numeric = dataframe.select_dtypes( include = 'number' )
-    
-    # central tendency statistics   
-    mean_stats = pd.DataFrame( df_numeric.apply( np.mean ) ).T
-    median_stats  = pd.DataFrame( df_numeric.apply( np.median ) ).T
-    
-    # deviation statistics
-    std_stats = pd.DataFrame( df_numeric.apply( np.std ) ).T
-    min_stats = pd.DataFrame( df_numeric.apply( np.nanmin ) ).T
-    max_stats = pd.DataFrame( df_numeric.apply( np.nanmax ) ).T
-    range_stats = pd.DataFrame( df_numeric.apply( lambda x: x.max() - x.min() ) ).T
-    skew_stats = pd.DataFrame( df_numeric.apply( lambda x: x.skew() ) ).T
-    kurtosis_stats = pd.DataFrame( df_numeric.apply( lambda x: x.kurtosis() ) ).T
-    iqr_stats = pd.DataFrame( df_numeric.apply( lambda x: np.percentile(x, 75, axis = 0) - \
-                                                          np.percentile(x, 25, axis = 0)
-                                              ) ).T
+    # ======= FLOAT BLOCK =======
     
-    # concatenate statistics    
-    df_stats = pd.concat( [  mean_stats,
-                             median_stats,
-                             std_stats,
-                             min_stats,
-                             max_stats,
-                             range_stats,
-                             skew_stats,
-                             kurtosis_stats,
-                             iqr_stats
-                          ] ).T.reset_index()
+    with stage( 'compute_summary_statistics.float_block', rows = len( dataframe ) ):
+        # get numeric variables
+        df_numeric = dataframe.select_dtypes( include = 'number' )
+
+        # get a contiguous float block with one row per feature
+        block = np.ascontiguousarray( df_numeric.to_numpy( dtype = 'float64', na_value = np.nan ).T )
+
+    # ======= STATISTICS =======
+
+    # calculate statistics of groups of features
+    with stage( 'compute_summary_statistics.statistics', rows = len( dataframe ) ):
+        block_stats = map_block_rows( _block_statistics, block, n_jobs = n_jobs, backend = backend )
+
+    # gather statistics
+    dict_stats = {'attribute': np.asarray( df_numeric.columns, dtype = 'object' ), **block_stats }
+
+    # check if user wants a dictionary of numpy arrays
+    if as_dict:
+        return dict_stats
+
+
+    return pd.DataFrame( dict_stats, columns = STATISTICS_COLUMNS )
+
+
+
+def render_summary_statistics( df_stats ):
+    '''
+    It displays a statistics table highlighting min and max statistics.
+    Outside a notebook, the table is just printed.
     
-    # rename columns
-    df_stats.columns = ['attribute', 
-                       'mean',
-                       'median',
-                       'std',
-                       'min',
-                       'max',
-                       'range',
-                       'skew',
-                       'kurtosis',
-                       'iqr']
-
-    # reorder columns
-    df_stats = df_stats[['attribute', 
-                         'mean',
-                         'median',
-                         'std',
-                         'iqr',
-                         'min',
-                         'max',
-                         'range',
-                         'skew',
-                         'kurtosis'
-                        ]]    
-        
+    Args
+        df_stats: a pandas dataframe with statistics as returned by compute_summary_statistics
+
+    Return
+        None: a None type object
+    '''
+
+    #########################################################
+    # This function requires that Jinja2 library is installed,
+    # but it doesn't need to be imported 
+    # -> pip install Jinja2
+    #########################################################
+
     # print statistics for numerical data
     print( '\n\nStatistics for Numerical Variables')
+
+    # check if IPython display is available
+    try:
+        from IPython.display import display
+    # no IPython -> print plain table
+    except ImportError:
+        print( df_stats )
+        return None
        
     # highlight min and max statistics -> help identify 'non-sense' data
-    df_stats = df_stats.style.applymap(lambda x: 'background-color: Navy; color: White', subset = ['min', 'max'])
+    # (Styler.applymap was renamed to Styler.map on newer pandas versions)
+    styler = df_stats.style
+    styler_map = styler.map if hasattr( styler, 'map' ) else styler.applymap
+    df_stats = styler_map(lambda x: 'background-color: Navy; color: White', subset = ['min', 'max'])
     # display statatistics
     display( df_stats )
 
@@ -84,11 +240,439 @@ def summary_statistics( dataframe ):
 
 
 
-def check_dataframe( dataframe, head = True, head_size = 5, sample_size = 5 ):
+def summary_statistics( dataframe, n_jobs = None, backend = 'threads' ):
+    '''
+    It displays statistics for numerical features of the dataframe.
+    Displayed statistics are: mean, median, std, min, max, range, skew, kurtosis and iqr.
+    Use compute_summary_statistics to get the statistics as data.
+    
+    Args
+        dataframe: the dataframe that the user wants to check statistics
+        n_jobs: number of workers the features are split on (None or 1 -> current thread, -1 -> all cores)
+        backend: 'threads' or 'processes' (see compute_summary_statistics)
+
+    Return
+        None: a None type object
+    '''
+
+    # import required libraries
+    from a3data_case.instrumentation import stage
+
+    # ======= STATISTICS =======
+    
+    # calculate statistics for numerical data
+    df_stats = compute_summary_statistics( dataframe, n_jobs = n_jobs, backend = backend )
+        
+    # display statistics
+    with stage( 'summary_statistics.render' ):
+        render_summary_statistics( df_stats )
+
+
+    return None
+
+
+
+def _statistics_from_sketches( columns, moments, quantiles ):
+    '''
+    It builds the statistics table from mergeable sketches.
+
+    Args
+        columns: list with the names of the numerical features
+        moments: a sketches.MomentSketch object with the moments of every feature
+        quantiles: list with one sketches.QuantileSketch object per feature
+
+    Return
+        df_stats: a pandas dataframe with the same columns as compute_summary_statistics
+    '''
+
+    # import required libraris
+    import pandas as pd
+    import numpy  as np
+
+    # estimate Q1, median and Q3 of each feature
+    quartiles = np.array( [ sketch.quantile( [0.25, 0.5, 0.75] ) for sketch in quantiles ] ).reshape( -1, 3 )
+
+    # deviation statistics
+    moment_stats = _moment_statistics( moments.count,
+                                       np.fmax( np.abs( moments.min ), np.abs( moments.max ) ),
+                                       moments.m2, moments.m3, moments.m4 )
+
+    # gather statistics
+    dict_stats = {'attribute': np.asarray( columns, dtype = 'object' ),
+                  'mean': np.where( moments.count > 0, moments.mean, np.nan ),
+                  'median': quartiles[:, 1],
+                  'std': moment_stats['std'],
+                  'iqr': quartiles[:, 2] - quartiles[:, 0],
+                  'min': moments.min,
+                  'max': moments.max,
+                  'range': moments.max - moments.min,
+                  'skew': moment_stats['skew'],
+                  'kurtosis': moment_stats['kurtosis'] }
+
+
+    return pd.DataFrame( dict_stats, columns = STATISTICS_COLUMNS )
+
+
+
+def _numeric_values( series, na_values = ('***',) ):
+    '''
+    It gets the values of a feature of a chunk as floats, if they are numbers.
+
+    Args
+        series: a pandas series (a column of a chunk)
+        na_values: placeholders of missing data on text columns (e.g. '***')
+
+    Return
+        values: float64 numpy array with missing values as nan
+            (None if the feature has values that can't be parsed as numbers)
+    '''
+
+    # import required libraries
+    import pandas as pd
+    import numpy  as np
+
+    # numerical features (booleans are not numerical)
+    if pd.api.types.is_numeric_dtype( series.dtype ) and not pd.api.types.is_bool_dtype( series.dtype ):
+        return series.to_numpy( dtype = 'float64', na_value = np.nan )
+
+    # only text columns may hold numbers (e.g. a chunk where the feature has placeholders)
+    if not ( series.dtype == object or isinstance( series.dtype, pd.StringDtype ) ):
+        return None
+
+    # placeholders are missing values
+    if na_values:
+        series = series.mask( series.isin( list( na_values ) ) )
+
+    # parse values -> any value that isn't a number makes the feature non-numerical
+    numbers = pd.to_numeric( series, errors = 'coerce' )
+    if numbers.isna().sum() > series.isna().sum():
+        return None
+
+
+    return numbers.to_numpy( dtype = 'float64', na_value = np.nan )
+
+
+
+def stream_summary_statistics( filepath_or_chunks, chunksize = 100_000, sep = ';', encoding = 'latin-1',
+                               sketch_size = 2048, seed = None, na_values = ('***',), **read_csv_kwargs ):
+    '''
+    It calculates statistics for numerical features of a CSV file reading it in chunks,
+    so memory stays flat regardless of file size.
+    Mean, std, skew and kurtosis are exact (mergeable moments) and
+    median and IQR come from a bounded-memory quantile sketch.
+
+    Args
+        filepath_or_chunks: path to a CSV file or an iterable of pandas dataframes (chunks).
+            Numerical features are the features whose values are numbers (or missing) on every chunk,
+            so the result doesn't depend on which chunk has the first placeholder.
+        chunksize: number of rows of each chunk read from the CSV file
+        sep: CSV separator
+        encoding: CSV encoding
+        sketch_size: number of items kept on each level of the quantile sketches.
+            Median and IQR are exact while a feature has fewer valid values than this.
+        seed: seed for the quantile sketches
+        na_values: placeholders of missing data (e.g. '***' on CENIPA files),
+            missing values on every chunk
+        read_csv_kwargs: other keyword arguments for pd.read_csv
+
+    Return
+        df_stats: a pandas dataframe with the same columns as compute_summary_statistics
+    '''
+
+    # import required libraris
+    import os
+    import pandas as pd
+    import numpy  as np
+    from a3data_case.sketches import MomentSketch, QuantileSketch
+    from a3data_case.instrumentation import stage
+
+    # check if user gave a file path
+    if isinstance( filepath_or_chunks, (str, os.PathLike) ):
+        # read CSV file in chunks
+        chunks = pd.read_csv( filepath_or_chunks, chunksize = chunksize, sep = sep,
+                              encoding = encoding, **read_csv_kwargs )
+    # user gave chunks
+    else:
+        chunks = filepath_or_chunks
+
+    # create empty sketches -> they are created on the first chunk
+    columns, moments, quantiles = None, None, None
+
+    # iterate over chunks
+    for chunk in chunks:
+
+        # every feature of the first chunk may be numerical -> create its sketches
+        if columns is None:
+            columns = list( chunk.columns )
+            moments = MomentSketch( len( columns ) )
+            quantiles = [ QuantileSketch( sketch_size, seed ) for _ in columns ]
+
+        with stage( 'stream_summary_statistics.chunk', rows = len( chunk ) ):
+            # get values of the features as floats (None for features with values that aren't numbers)
+            arrays = [ _numeric_values( chunk[ column ], na_values ) for column in columns ]
+
+            # features with text on this chunk are not numerical -> drop their sketches
+            keep = [ index for index, values in enumerate( arrays ) if values is not None ]
+            if len( keep ) < len( columns ):
+                moments = MomentSketch.from_dict( { name: values[ keep ] for name, values in moments.to_dict().items() } )
+                columns, quantiles, arrays = [ [ items[ index ] for index in keep ] for items in (columns, quantiles, arrays) ]
+
+            # get a contiguous float block with one row per feature
+            block = np.vstack( arrays ) if arrays else np.empty( ( 0, len( chunk ) ), dtype = 'float64' )
+
+            # update sketches
+            moments.update( block )
+            for sketch, values in zip( quantiles, block ):
+                sketch.update( values )
+
+    # no chunks -> no statistics
+    if columns is None:
+        return pd.DataFrame( columns = STATISTICS_COLUMNS )
+
+
+    return _statistics_from_sketches( columns, moments, quantiles )
+
+
+
+def _display( obj ):
+    '''
+    It displays an object with IPython display, or prints it outside IPython.
+    
+    Args
+        obj: the object to display
+
+    Return
+        None: a None type object
+    '''
+
+    # check if IPython display is available
+    try:
+        from IPython.display import display
+    # no IPython -> print object
+    except ImportError:
+        print( obj )
+        return None
+
+    # display object
+    display( obj )
+
+
+    return None
+
+
+
+def _approx_unique( series, precision = 14, sample_size = 10_000, min_rows = 2**21 ):
+    '''
+    It estimates the number of unique values of a column on the cheapest path.
+    An exact count builds a hash table of the distinct values, so it is cheap unless there are
+    millions of them. Only tall numerical columns whose sampled values are (almost) all distinct
+    are hashed into a HyperLogLog sketch, which costs the same per row whatever the number of
+    distinct values. Other columns are counted exactly (hashing strings costs about as much
+    as counting them).
+
+    Args
+        series: a pandas series
+        precision: HyperLogLog precision
+        sample_size: number of rows (spread over the whole column) used to check if values are distinct
+        min_rows: minimum number of rows to use a HyperLogLog sketch
+
+    Return
+        n_unique: the exact number of unique values or its estimate
+        n_unique_error: 95% error bound of n_unique (0 when it is exact)
+    '''
+
+    # import required libraries
+    import numpy  as np
+    from a3data_case.sketches import HyperLogLog
+
+    # short columns or values that are not cheap to hash -> exact count
+    dtype = series.dtype
+    if len( series ) < min_rows or not ( isinstance( dtype, np.dtype ) and dtype.kind in 'biufcmM' ):
+        return int( series.nunique() ), 0
+
+    # check if values are (almost) all distinct on rows sampled over the whole column
+    positions = np.unique( np.random.default_rng( 0 ).integers( 0, len( series ), sample_size ) )
+    sample = series.iloc[ positions ].dropna()
+    if sample.nunique() < 0.95 * len( sample ):
+        return int( series.nunique() ), 0
+
+    # millions of distinct numbers -> estimate with a HyperLogLog sketch
+    sketch = HyperLogLog( precision ).update( series )
+
+
+    return round( sketch.count() ), round( 1.96 * sketch.standard_error * sketch.count() )
+
+
+
+def _describe_columns( dataframe, mode = 'exact', precision = 14 ):
+    '''
+    It calculates the per-column figures of compute_dataframe_description for a group of columns.
+
+    Args
+        dataframe: a pandas dataframe (a group of columns)
+        mode: 'exact' or 'approx' (see compute_dataframe_description)
+        precision: HyperLogLog precision ('approx' mode)
+
+    Return
+        columns_info: list with one tuple per column with the number of NAs, the number of unique values
+            (a tuple with the estimate and its 95% error bound on 'approx' mode, see _approx_unique)
+            and the deep memory usage in MB (None for columns of python objects on 'approx' mode)
+    '''
+
+    # import required libraris
+    from a3data_case.instrumentation import stage
+
+    # iterate over columns
+    n_rows = len( dataframe )
+    columns_info = []
+    for column, series in dataframe.items():
+
+        # count missing values
+        with stage( 'compute_dataframe_description.missing_values', rows = n_rows, column = column ):
+            na_count = int( series.isna().sum() )
+
+        # count unique values (or estimate them on the cheapest path)
+        with stage( 'compute_dataframe_description.unique_values', rows = n_rows, column = column ):
+            n_unique = series.nunique() if mode == 'exact' else _approx_unique( series, precision )
+
+        # deep memory usage (left to a sample of rows on 'approx' mode for columns of python objects,
+        # whose values have variable sizes; arrow-backed strings report their exact size without a deep scan)
+        memory = None
+        if mode == 'exact' or not ( series.dtype == 'object' or getattr( series.dtype, 'storage', None ) == 'python' ):
+            with stage( 'compute_dataframe_description.memory_usage', rows = n_rows, column = column ):
+                memory = series.memory_usage( index = False, deep = True ) / (10**6)
+
+        # save column figures
+        columns_info.append( ( na_count, n_unique, memory ) )
+
+
+    return columns_info
+
+
+
+def compute_dataframe_description( dataframe, mode = 'exact', sample_rows = 100_000, precision = 14, seed = None,
+                                   n_jobs = None, backend = 'threads' ):
+    '''
+    It calculates the number of NAs, the percentage of NA, the number of unique values,
+    the data type and the memory usage of each column without displaying anything.
+    
+    Args
+        dataframe: the pandas dataframe that the user wants to check
+        mode: 'exact' to get exact values (the NA mask is calculated only once) or
+            'approx' to estimate the number of unique values of tall, distinct numerical columns
+            with a HyperLogLog sketch (other columns are counted exactly, see _approx_unique)
+            and the memory usage of string columns from a sample of rows.
+            Approximate estimates come with columns of 95% error bounds.
+        sample_rows: number of rows sampled to estimate memory usage ('approx' mode)
+        precision: HyperLogLog precision ('approx' mode) -> relative error of about 1.04 / sqrt(2**precision)
+        seed: seed for the row sample ('approx' mode)
+        n_jobs: number of workers the columns are split on (None or 1 -> current thread, -1 -> all cores)
+        backend: 'threads' or 'processes' (numpy-typed columns reach processes through shared memory, object and extension columns are pickled, i.e. copied)
+
+    Return
+        df_description: a pandas dataframe with one row per column.
+            Total memory usage (index included) in MB is stored in df_description.attrs['memory_mb']
+            (and its error bound in df_description.attrs['memory_mb_error'] on 'approx' mode).
+    '''
+
+    # import required libraris
+    import pandas as pd
+    import numpy  as np
+    from a3data_case.parallel import map_column_groups
+    from a3data_case.instrumentation import stage
+
+    # check mode
+    if mode not in ('exact', 'approx'):
+        raise ValueError( f"mode must be 'exact' or 'approx', got {mode!r}" )
+
+    # ======= PER-COLUMN FIGURES =======
+
+    # count NAs and unique values (and get memory usage on 'exact' mode) of groups of columns
+    n_rows = len( dataframe )
+    columns_info = map_column_groups( _describe_columns, dataframe, n_jobs = n_jobs, backend = backend,
+                                      mode = mode, precision = precision )
+    na_count = pd.Series( [ info[0] for info in columns_info ], index = dataframe.columns, dtype = 'int64' )
+
+    # create dictionary with descriptive information
+    dict_data = {'Num NAs': na_count,
+                 'Percent NAs': ( na_count / max( n_rows, 1 ) * 100 ).round( decimals = 2 ),
+                 'Num unique': None,
+                 'Data Type': dataframe.dtypes,
+                 'Memory MB': None }
+
+    # ======= EXACT MODE =======
+
+    if mode == 'exact':
+
+        # unique values and deep memory usage of each column
+        memory = [ info[2] for info in columns_info ]
+        dict_data['Num unique'] = pd.Series( [ info[1] for info in columns_info ], index = dataframe.columns, dtype = 'int64' )
+        dict_data['Memory MB'] = pd.Series( memory, index = dataframe.columns, dtype = 'float64' )
+
+        # create descriptive dataframe (total memory includes the index)
+        df_description = pd.DataFrame( dict_data )
+        df_description.attrs['memory_mb'] = float( sum( memory ) + dataframe.index.memory_usage( deep = True ) / (10**6) )
+
+
+        return df_description
+
+    # ======= APPROXIMATE MODE =======
+
+    # unique values (estimated or exact) and their error bounds
+    dict_data['Num unique'] = pd.Series( [ info[1][0] for info in columns_info ], index = dataframe.columns )
+    dict_data['Num unique error'] = pd.Series( [ info[1][1] for info in columns_info ], index = dataframe.columns )
+
+    with stage( 'compute_dataframe_description.memory_usage', rows = min( n_rows, sample_rows ) ):
+        # memory usage of columns with fixed size values is exact and cheap (calculated per column)
+        memory = pd.Series( [ info[2] for info in columns_info ], index = dataframe.columns, dtype = 'float64' )
+        memory_error = pd.Series( 0.0, index = dataframe.columns )
+
+        # get columns of python objects, whose memory usage is left to a sample of rows
+        variable_columns = list( dataframe.columns[ memory.isna().to_numpy() ] )
+
+        # estimate memory of variable size columns from a sample of rows
+        if variable_columns and n_rows > sample_rows:
+
+            # sample rows and split the sample in groups
+            sample = dataframe[ variable_columns ].sample( sample_rows, random_state = seed )
+            groups = np.array_split( np.arange( sample_rows ), 20 )
+
+            # get the mean memory per row of each group
+            group_bytes = np.array( [ sample.iloc[ group ].memory_usage( index = False, deep = True ).to_numpy() / len( group ) 
+                                      for group in groups ] )
+
+            # scale the mean bytes per row up to all rows
+            memory[ variable_columns ] = group_bytes.mean( axis = 0 ) * n_rows / (10**6)
+            # 95% error bound from the variation among groups (finite population corrected)
+            finite_correction = np.sqrt( 1 - sample_rows / n_rows )
+            memory_error[ variable_columns ] = 1.96 * group_bytes.std( axis = 0, ddof = 1 ) / np.sqrt( len( groups ) ) \
+                                               * finite_correction * n_rows / (10**6)
+
+        # small dataframes -> exact memory
+        elif variable_columns:
+            memory[ variable_columns ] = dataframe[ variable_columns ].memory_usage( index = False, deep = True ) / (10**6)
+
+    # save memory estimates
+    dict_data['Memory MB'] = memory
+    dict_data['Memory MB error'] = memory_error
+
+    # create descriptive dataframe (total memory includes the index)
+    df_description = pd.DataFrame( dict_data )
+    df_description.attrs['memory_mb'] = float( memory.sum() + dataframe.index.memory_usage( deep = True ) / (10**6) )
+    df_description.attrs['memory_mb_error'] = float( np.sqrt( ( memory_error**2 ).sum() ) )
+
+
+    return df_description
+
+
+
+def check_dataframe( dataframe, head = True, head_size = 5, sample_size = 5, mode = 'exact', sample_rows = 100_000, seed = None,
+                     n_jobs = None, backend = 'threads' ):
     '''
     It prints the number of NAs, the percentage of NA, the number of unique values and the data type for each column.
     It prints dataframe shape and also displays statistics for numerical variables.
-    Finally, it displays the dataframe head or a random sample of dataframe according to user choice
+    Finally, it displays the dataframe head or a random sample of dataframe according to user choice.
+    Use compute_dataframe_description to get the descriptive table as data.
     
     Args
         dataframe: the pandas dataframe that the user wants to check
@@ -97,57 +681,63 @@ def check_dataframe( dataframe, head = True, head_size = 5, sample_size = 5 ):
             a sample of the dataframe (False)
         head_size: size of the dataframe.head() function 
         sample_size: size of the dataframe.sample() function 
+        mode: 'exact' for exact values or 'approx' for estimates on wide, tall dataframes
+            (see compute_dataframe_description). On 'approx' mode, numerical statistics
+            are calculated on a sample of sample_rows rows.
+        sample_rows: number of rows sampled on 'approx' mode
+        seed: seed for the row sample on 'approx' mode
+        n_jobs: number of workers the columns are split on (None or 1 -> current thread, -1 -> all cores)
+        backend: 'threads' or 'processes' (see compute_dataframe_description)
 
     Return
         None: a none type object
     '''
 
-    # import required libraris
-    import pandas as pd
-    import numpy  as np
+    # import required libraries
+    from a3data_case.instrumentation import stage
 
-    #########################################################
-    # This function requires that Jinja2 library is installed,
-    # but it doesn't need to be imported 
-    # -> pip install Jinja2
-    #########################################################
+    # ======= DESCRIPTIVE INFORMATION =======
 
-    # ======= MEMORY USAGE INFORMATION =======
+    # create descriptive table
+    with stage( 'check_dataframe.description', rows = len( dataframe ) ):
+        df_description = compute_dataframe_description( dataframe, mode = mode, sample_rows = sample_rows, seed = seed,
+                                                        n_jobs = n_jobs, backend = backend )
 
-    df_size_in_memory = dataframe.memory_usage(index = True, deep = True).sum() / (10**6)
-    print(f"Dataframe size in memory: {df_size_in_memory:,.3f} MB", "\n")
+    # ======= MEMORY USAGE INFORMATION =======
 
-    # ======= DESCRIPTIVE INFORMATION =======
-        
-    # create dictionary with descriptive information
-    dict_data = {'Num NAs': dataframe.isna().sum(axis=0),
-                 'Percent NAs': (dataframe.isna().mean(axis=0) * 100).round(decimals = 2),
-                 'Num unique': dataframe.nunique(),
-                 'Data Type': dataframe.dtypes }    
+    # check if memory is an estimate
+    if mode == 'approx':
+        print(f"Dataframe size in memory: {df_description.attrs['memory_mb']:,.3f} "
+              f"± {df_description.attrs['memory_mb_error']:,.3f} MB (95%)", "\n")
+    else:
+        print(f"Dataframe size in memory: {df_description.attrs['memory_mb']:,.3f} MB", "\n")
 
-    
     # ======= SHAPE INFORMATION =======
     
     # print descriptive data
-    display( pd.DataFrame( dict_data ) )
+    _display( df_description )
     # print dataframe shape
     print( f'Dataframe shape is {dataframe.shape}', '\n' )  
 
     # ======= STATISTICS =======
     
-    # use summary_statistics function of this same module
-    summary_statistics( dataframe )
+    # use summary_statistics function of this same module (on a sample of rows on 'approx' mode)
+    with stage( 'check_dataframe.summary_statistics', rows = min( len( dataframe ), sample_rows ) if mode == 'approx' else len( dataframe ) ):
+        if mode == 'approx' and len( dataframe ) > sample_rows:
+            summary_statistics( dataframe.sample( sample_rows, random_state = seed ), n_jobs = n_jobs, backend = backend )
+        else:
+            summary_statistics( dataframe, n_jobs = n_jobs, backend = backend )
 
     # ======= DATAFRAME INSTANCES =======
     # check if user wants df.head()
     if head:
         print( '\n\nDataframe head:' )
-        display( dataframe.head( head_size ) )
+        _display( dataframe.head( head_size ) )
 
     # user wants df.sample()
     else:
         print( '\n\nDataframe sample:' )
-        display( dataframe.sample( sample_size ) )
+        _display( dataframe.sample( sample_size ) )
 
 
     return None
@@ -180,4 +770,82 @@ def clean_lat_long( array, regex_pattern = "-?\d+(\.?|\,?)\d+"):
                                                                      else np.nan
                                                                      for x        in regex_array ])
     
-    return cleaned_array
\ No newline at end of file
+    return cleaned_array
+
+
+# decimal coordinates, e.g. "-22.7336", "-22,7336", "22.7336 S" or "S22.7336"
+LAT_LONG_DECIMAL_PATTERN = ( r"(?:(?<![A-Za-z])(?P<prefix>[NSEWLO])\s*)?"
+                             r"(?P<value>-?\d+(?:[.,]\d+)?)\s*[°º]?\s*(?P<hemisphere>[NSEWLO])?" )
+
+# degree-minute-second coordinates, e.g. "22°54'10\"S", "-22 54 10.5", "S 22:54:10" or "22°54.5'S"
+LAT_LONG_DMS_PATTERN = ( r"(?P<prefix>[NSEWLO])?\s*(?P<sign>-)?\s*"
+                         r"(?P<degrees>\d{1,3})\s*(?:[°º:]|\s)\s*"
+                         r"(?P<minutes>\d{1,2}(?:[.,]\d+)?)\s*(?:['’′:]|\s)?\s*"
+                         r"(?:(?P<seconds>\d{1,2}(?:[.,]\d+)?)\s*(?:\"|''|”|″)?)?\s*"
+                         r"(?P<hemisphere>[NSEWLO])?" )
+
+
+
+def parse_lat_long( array ):
+    """
+    Get a pandas series with lat/long information and parse it into float coordinates.
+    Each distinct string is parsed only once (the column is factorized first) with vectorized
+    regex extraction and results are broadcast back through the codes.
+    Decimal (dot or comma) and degree-minute-second strings are recognized.
+    Hemisphere letters S, W and O (oeste) make the coordinate negative.
+    
+    Args
+        array: a pandas series object with the column to extract lat/long information
+        
+    Return
+        cleaned_array: a numpy array with parsed lat/long (np.nan when nothing could be parsed)
+    """
+
+    # import required libraries
+    import numpy  as np
+    import pandas as pd
+
+    # factorize column -> each distinct string is parsed once (missing values get code -1)
+    codes, uniques = pd.factorize( pd.Series( array ) )
+    uniques = pd.Series( np.asarray( uniques, dtype = 'object' ) ).astype( str ).str.strip()
+
+    # ======= DEGREE-MINUTE-SECOND =======
+
+    # extract degree-minute-second parts
+    dms = uniques.str.fullmatch( LAT_LONG_DMS_PATTERN ) & uniques.str.contains( r"\d[°º:'’′\s]+\d" )
+    dms_parts = uniques[ dms ].str.extract( LAT_LONG_DMS_PATTERN )
+
+    # convert parts to float
+    degrees, minutes, seconds = [ pd.to_numeric( dms_parts[ part ].str.replace( ',', '.', regex = False ) ).fillna( 0 ).to_numpy()
+                                  for part in ['degrees', 'minutes', 'seconds'] ]
+    dms_values = degrees + minutes / 60 + seconds / 3600
+
+    # get negative coordinates -> minus sign or south/west hemisphere
+    dms_negative = dms_parts['sign'].notna() | dms_parts['hemisphere'].isin( ['S', 'W', 'O'] ) | \
+                   dms_parts['prefix'].isin( ['S', 'W', 'O'] )
+    dms_values = np.where( dms_negative, -dms_values, dms_values )
+
+    # ======= DECIMAL =======
+
+    # extract decimal parts of the other strings
+    decimal_parts = uniques.str.extract( LAT_LONG_DECIMAL_PATTERN )
+
+    # convert value to float
+    decimal_values = pd.to_numeric( decimal_parts['value'].str.replace( ',', '.', regex = False ) ).to_numpy( dtype = 'float64' )
+
+    # south/west hemisphere (before or after the value) makes positive values negative
+    decimal_hemisphere = decimal_parts['hemisphere'].isin( ['S', 'W', 'O'] ) | decimal_parts['prefix'].isin( ['S', 'W', 'O'] )
+    decimal_negative = decimal_hemisphere.to_numpy() & ( decimal_values > 0 )
+    decimal_values = np.where( decimal_negative, -decimal_values, decimal_values )
+
+    # ======= BROADCAST =======
+
+    # gather parsed distinct values and add a missing value at the end for code -1
+    parsed_uniques = np.append( decimal_values, np.nan )
+    parsed_uniques[ np.flatnonzero( dms.to_numpy() ) ] = dms_values
+
+    # broadcast parsed values back to the original rows
+    cleaned_array = parsed_uniques[ codes ]
+
+
+    return cleaned_array
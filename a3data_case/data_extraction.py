@@ -1,45 +1,308 @@
-def downcast_dataframe(df, verbose=True):
-    """Try to downcast numeric columns of the dataframe so as to use less memory.
+def _smallest_integer_dtype(min_value, max_value, unsigned=False):
+    """Get the smallest integer dtype that holds the given range.
+
+    Args
+        min_value: minimum value of the column (a python int or float)
+        max_value: maximum value of the column (a python int or float)
+        unsigned: a boolean to check if unsigned types are tried instead of signed ones
+
+    Return
+        dtype: a string with the numpy integer dtype name ('float64' if no type holds the range)"""
+    # import required libraries
+    import numpy as np
+
+    # iterate from the smallest to the largest integer type
+    for dtype in (["uint8", "uint16", "uint32", "uint64"] if unsigned else ["int8", "int16", "int32", "int64"]):
+        # check if range fits the given type
+        # (python ints and floats compare exactly, so large values are not rounded into range)
+        if int(np.iinfo(dtype).min) <= min_value and max_value <= int(np.iinfo(dtype).max):
+            return dtype
+
+
+    return "float64"
+
+
+
+def _nullable_dtype_name(dtype_name):
+    """Get the pandas nullable extension dtype name of a numpy dtype name (e.g. 'uint8' -> 'UInt8').
+
+    Args
+        dtype_name: a string with a numpy integer or float dtype name
+
+    Return
+        dtype_name: a string with the nullable dtype name"""
+
+
+    return dtype_name.replace("uint", "UInt").replace("int", "Int").replace("float", "Float")
+
+
+
+def _plan_column_dtype(series, categories=True, max_category_ratio=0.5):
+    """Plan the smallest dtype a single column can be stored with (see plan_downcast).
+
+    Args
+        series: a pd.Series object
+        categories: a boolean to check if user wants low-cardinality string columns as 'category'
+        max_category_ratio: maximum ratio between unique values and non-missing values
+            for a string column to become 'category'
+
+    Return
+        new_dtype: a string with the planned dtype (the current dtype if it is kept)"""
+    # import required libraries
+    import numpy as np
+    import pandas as pd
+
+    # get column dtype
+    dtype = series.dtype
+    # nullable extension dtypes (e.g. Int64) are planned as nullable dtypes too
+    nullable = isinstance(dtype, pd.api.extensions.ExtensionDtype)
+
+    # ======= INTEGER COLUMNS =======
+
+    # check if column is integer
+    if pd.api.types.is_integer_dtype(dtype):
+
+        # get valid values in the column's own integer type (no rounding through float64)
+        values = series.dropna().to_numpy(dtype=np.dtype(getattr(dtype, "numpy_dtype", dtype)))
+
+        # columns without valid values are kept
+        if len(values) == 0:
+            return str(dtype)
+
+        # smallest type of the same kind (unsigned columns stay unsigned)
+        new_dtype = _smallest_integer_dtype(int(values.min()), int(values.max()), unsigned=values.dtype.kind == "u")
+        new_dtype = _nullable_dtype_name(new_dtype) if nullable else new_dtype
+
+    # ======= FLOAT COLUMNS =======
+
+    # check if column is float (booleans are kept)
+    elif pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype):
+
+        # get column values as floats with nan for missing values
+        values = series.to_numpy(dtype="float64", na_value=np.nan)
+
+        # scan column values
+        finite = np.isfinite(values)
+        all_finite = bool(finite.all())
+        # ignore warnings of all-nan columns and float32 overflows
+        with np.errstate(invalid="ignore", over="ignore"):
+            min_value = float(values.min(initial=np.inf, where=finite))
+            max_value = float(values.max(initial=-np.inf, where=finite))
+            fits_float32 = np.allclose(values.astype("float32"), values, equal_nan=True, rtol=0.0, atol=5e-4)
+        integral = all_finite and bool((values == np.round(values)).all())
+
+        # integral values without missing values -> smallest integer type
+        if integral and len(values) > 0:
+            new_dtype = _smallest_integer_dtype(min_value, max_value)
+        # float values -> float32 if values are kept within 7 digits (overflows are not kept)
+        elif fits_float32:
+            new_dtype = "float32"
+        # keep column as it is
+        else:
+            new_dtype = str(dtype)
+
+        # nullable columns keep a nullable dtype
+        if nullable and new_dtype != str(dtype):
+            new_dtype = _nullable_dtype_name(new_dtype)
+
+    # ======= STRING COLUMNS =======
+
+    # check if column is a string column
+    elif categories and (pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype)) \
+            and not isinstance(dtype, pd.CategoricalDtype):
+
+        # get number of unique and non-missing values
+        n_unique = series.nunique(dropna=True)
+        n_values = series.notna().sum()
+
+        # low cardinality -> category
+        new_dtype = "category" if 0 < n_values and n_unique <= max_category_ratio * n_values else str(dtype)
+
+    # other dtypes are kept
+    else:
+        new_dtype = str(dtype)
+
+
+    return new_dtype
+
+
+
+def _plan_columns(df, categories=True, max_category_ratio=0.5):
+    """Plan the dtype of every column of a group of columns (see plan_downcast).
+
+    Args
+        df: a pd.DataFrame object (a group of columns)
+        categories: a boolean to check if user wants low-cardinality string columns as 'category'
+        max_category_ratio: maximum ratio between unique values and non-missing values
+            for a string column to become 'category'
+
+    Return
+        dtypes: list with the planned dtype of each column"""
+    # import required libraries
+    from a3data_case.instrumentation import stage
+
+    # create empty list of dtypes
+    dtypes = []
+
+    # iterate over columns
+    for col, series in df.items():
+
+        # plan column dtype
+        with stage("plan_downcast.column", rows=len(df), column=col):
+            dtypes.append(_plan_column_dtype(series, categories=categories, max_category_ratio=max_category_ratio))
+
+
+    return dtypes
+
+
+
+def plan_downcast(df, categories=True, max_category_ratio=0.5, n_jobs=None, backend="threads"):
+    """Scan each column once and plan the smallest dtype it can be stored with.
+
+    Integer columns are planned as the smallest integer type of the same kind (unsigned
+    columns stay unsigned and nullable Int*/UInt* columns get the smallest nullable type).
+    Float columns are planned as the smallest signed integer type when all values
+    are integral (and not missing), otherwise as float32 when values are kept within
+    7 digits (same tolerance as pd.to_numeric downcast). Object/string columns become
+    'category' when the number of unique values is low compared to the number of values.
+
+    Args
+        df: a pd.DataFrame object
+        categories: a boolean to check if user wants low-cardinality string columns as 'category'
+        max_category_ratio: maximum ratio between unique values and non-missing values
+            for a string column to become 'category'
+        n_jobs: number of workers the columns are split on (None or 1 -> current thread, -1 -> all cores)
+        backend: 'threads' or 'processes' (numpy-typed columns reach processes through shared memory, object and extension columns are pickled, i.e. copied)
+
+    Return
+        plan: a dictionary with column names as keys and dtype names as values.
+            Only columns whose dtype changes are in the plan, so it can be saved with
+            save_dtype_plan and given as dtype= to future pd.read_csv calls."""
+    # import required libraries
+    from a3data_case.parallel import map_column_groups
+
+    # plan the dtype of groups of columns
+    new_dtypes = map_column_groups(_plan_columns, df, n_jobs=n_jobs, backend=backend,
+                                   categories=categories, max_category_ratio=max_category_ratio)
+
+    # save only columns whose dtype changes
+    plan = {col: new_dtype for col, dtype, new_dtype in zip(df.columns, df.dtypes, new_dtypes) if new_dtype != str(dtype)}
+
+
+    return plan
+
+
+
+def apply_dtype_plan(df, plan):
+    """Convert the columns of a dataframe according to a dtype plan without changing the input.
+
+    Args
+        df: a pd.DataFrame object
+        plan: a dictionary with column names as keys and dtype names as values
+
+    Return
+        dataframe: a new pd.DataFrame object with converted columns"""
+    # import required libraries
+    from a3data_case.instrumentation import stage
+
+    # shallow copy -> converted columns replace columns of the copy only
+    df = df.copy(deep=False)
+
+    # convert each column of the plan
+    for col, dtype in plan.items():
+        if col in df.columns:
+            with stage("apply_dtype_plan.column", rows=len(df), column=col):
+                df[col] = df[col].astype(dtype)
+
+
+    return df
+
+
+
+def save_dtype_plan(plan, filepath):
+    """Save a dtype plan as a JSON file.
+
+    Args
+        plan: a dictionary with column names as keys and dtype names as values
+        filepath: path of the JSON file
+
+    Return
+        None: a None type object"""
+    # import required libraries
+    import json
+
+    # write plan
+    with open(filepath, "w", encoding="utf-8") as file:
+        json.dump(plan, file, indent=4, ensure_ascii=False)
+
+
+    return None
+
+
+
+def load_dtype_plan(filepath):
+    """Load a dtype plan saved with save_dtype_plan.
+    It can be given as dtype= to pd.read_csv so the next load never allocates wide dtypes.
+
+    Args
+        filepath: path of the JSON file
+
+    Return
+        plan: a dictionary with column names as keys and dtype names as values"""
+    # import required libraries
+    import json
+
+    # read plan
+    with open(filepath, encoding="utf-8") as file:
+        plan = json.load(file)
+
+
+    return plan
+
+
+
+def downcast_dataframe(df, verbose=True, categories=True, max_category_ratio=0.5, plan=None, n_jobs=None, backend="threads"):
+    """Try to downcast numeric columns (and convert low-cardinality string columns to
+    category) so as to use less memory. Each column is scanned only once by plan_downcast
+    and converted only once. The input dataframe is not changed.
 
     Args
         df: a pd.DataFrame object
         verbose: a boolean to check if user wants to see downcast report
+        categories: a boolean to check if user wants low-cardinality string columns as 'category'
+        max_category_ratio: maximum ratio between unique values and non-missing values
+            for a string column to become 'category'
+        plan: a dtype plan (see plan_downcast) to use instead of scanning the dataframe
+        n_jobs: number of workers the column scans are split on (None or 1 -> current thread, -1 -> all cores)
+        backend: 'threads' or 'processes' (see plan_downcast)
 
     Return
-        dataframe: a pd.DataFrame object with downcasted columns if it was possible; 
+        dataframe: a pd.DataFrame object with downcasted columns if it was possible;
             otherwise, it will just return the original dataframe columns"""
     # import required libraries
-    import pandas as pd
+    from a3data_case.instrumentation import stage
 
     # get total dataframe input size in bytes
     # the size will include the index size
-    input_size = df.memory_usage(index=True, deep = True).sum()
-
-    # iterate over numeric columns types
-    for type in ["float", "integer"]:
+    with stage("downcast_dataframe.memory_usage", rows=len(df)):
+        input_size = df.memory_usage(index=True, deep = True).sum()
 
-        # get the column names whose type is the given type iteration
-        list_cols = list( df.select_dtypes( include=type ) )
+    # scan columns and plan their dtypes
+    if plan is None:
+        plan = plan_downcast(df, categories=categories, max_category_ratio=max_category_ratio, n_jobs=n_jobs, backend=backend)
 
-        # iterate over the columns with the selected types
-        for col in list_cols:
-            
-            # downcast the given column to the smallest numerical dtype possible
-            df[col] = pd.to_numeric( df[col], downcast=type )
-            
-            # check if column is float
-            if type == "float":
-                # try to convert float column to integer column and downcast
-                df[col] = pd.to_numeric(df[col], downcast="integer")
+    # convert columns according to plan
+    df = apply_dtype_plan(df, plan)
 
     # check if user wants a quick report of the results
     if verbose:
 
         # get total dataframe output size in bytes
         # the size will include the index size
-        output_size = df.memory_usage( index=True, deep = True ).sum()
+        with stage("downcast_dataframe.memory_usage", rows=len(df)):
+            output_size = df.memory_usage( index=True, deep = True ).sum()
         # get the percentage size that was reduced
-        ratio = (1 - round(output_size / input_size, 2) ) * 100   
+        ratio = (1 - round(output_size / input_size, 2) ) * 100
 
         # print report
         print(f"Dataframe size was reduced to {ratio:.2f}% of its original size.",
@@ -47,4 +310,410 @@ def downcast_dataframe(df, verbose=True):
               f"\nFinal dataframe size: {output_size / 1000000:,.2f} MB")
 
 
-    return df
\ No newline at end of file
+    return df
+
+
+
+def _hash_files(filepaths, block_size=2**20):
+    """Get a content hash of the given files.
+
+    Args
+        filepaths: list of file paths
+        block_size: number of bytes read at a time
+
+    Return
+        digest: a string with the sha256 hex digest of file names and contents"""
+    # import required libraries
+    import os
+    import hashlib
+
+    # create hash object
+    digest = hashlib.sha256()
+
+    # iterate over files
+    for filepath in filepaths:
+        # hash file name so swapping files changes the hash
+        digest.update(os.path.basename(filepath).encode("utf-8"))
+        # hash file content block by block
+        with open(filepath, "rb") as file:
+            for block in iter(lambda: file.read(block_size), b""):
+                digest.update(block)
+
+
+    return digest.hexdigest()
+
+
+
+def load_cached_table(filepaths, build=None, columns=None, cache_dir="cache", name=None,
+                      sep=";", encoding="latin-1", downcast=True, params=None, verbose=True):
+    """Load cleaned, downcast (and merged) tables from a columnar on-disk cache.
+
+    The cache key is a hash of the transformation parameters plus a content hash of the
+    source files, so the table is rebuilt automatically when a source file changes.
+    Only older versions built with the same parameters are removed from the cache.
+    Tables are stored as uncompressed Feather (Arrow IPC) files, which are memory-mapped
+    on later loads and only the requested columns are read.
+
+    Args
+        filepaths: a CSV file path or a list of CSV file paths
+        build: a function that gets the dataframes read from filepaths (in order) and
+            returns a single dataframe, e.g. a merge of the CENIPA tables.
+            If None, a single file is just read.
+        columns: list with the columns to load (None loads all columns)
+        cache_dir: directory where cached tables are stored
+        name: name of the cached table (defaults to the name of the first file)
+        sep: CSV separator
+        encoding: CSV encoding
+        downcast: a boolean to check if user wants the table downcast before caching
+        params: a dictionary with other parameters that change the table
+            (e.g. a version of the build function). They are part of the cache key.
+        verbose: a boolean to check if user wants to know if the cache was used
+
+    Return
+        dataframe: a pd.DataFrame object with the requested columns"""
+    # import required libraries
+    import os
+    import json
+    import hashlib
+    import pandas as pd
+    from a3data_case.instrumentation import stage
+
+    #########################################################
+    # This function requires that pyarrow library is installed
+    # -> pip install pyarrow
+    #########################################################
+    try:
+        from pyarrow import feather
+    except ImportError as error:
+        raise ImportError("load_cached_table requires pyarrow -> pip install pyarrow") from error
+
+    # ensure file paths are a list
+    if isinstance(filepaths, (str, os.PathLike)):
+        filepaths = [filepaths]
+    filepaths = [os.fspath(filepath) for filepath in filepaths]
+
+    # get table name
+    if name is None:
+        name = os.path.splitext(os.path.basename(filepaths[0]))[0]
+
+    # ======= CACHE KEY =======
+
+    # gather every parameter that changes the cached table
+    key_params = {"build": None if build is None else f"{build.__module__}.{build.__qualname__}",
+                  "sep": sep,
+                  "encoding": encoding,
+                  "downcast": downcast,
+                  "params": params}
+
+    # hash parameters and source files apart, so a table only replaces versions built with the same parameters
+    params_key = hashlib.sha256(json.dumps(key_params, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+    with stage("load_cached_table.hash"):
+        source_key = _hash_files(filepaths)[:16]
+    cache_path = os.path.join(cache_dir, f"{name}-{params_key}-{source_key}.feather")
+
+    # ======= CACHED TABLE =======
+
+    # check if table is already cached
+    if os.path.isfile(cache_path):
+
+        # read only the requested columns from the memory-mapped file
+        with stage("load_cached_table.read_cache"):
+            df = feather.read_table(cache_path, columns=columns, memory_map=True).to_pandas()
+
+        # check if user wants a quick report
+        if verbose:
+            print(f"Table loaded from cache: {cache_path}")
+
+
+        return df
+
+    # ======= BUILD TABLE =======
+
+    # read source files
+    dataframes = []
+    for filepath in filepaths:
+        with stage("load_cached_table.read_csv"):
+            dataframes.append(pd.read_csv(filepath, sep=sep, encoding=encoding, low_memory=False))
+
+    # build table
+    with stage("load_cached_table.build"):
+        df = dataframes[0] if build is None else build(*dataframes)
+
+    # downcast table
+    if downcast:
+        df = downcast_dataframe(df, verbose=False)
+
+    # feather requires a default index
+    df = df.reset_index(drop=True)
+
+    # write table to a temporary file and move it, so a failed write never leaves a broken cache
+    os.makedirs(cache_dir, exist_ok=True)
+    with stage("load_cached_table.write_cache", rows=len(df)):
+        feather.write_feather(df, cache_path + ".tmp", compression="uncompressed")
+    os.replace(cache_path + ".tmp", cache_path)
+
+    # remove stale versions of the same table: same parameters but older source files
+    # (tables built with other parameters are kept, so callers with different options don't evict each other)
+    for filename in os.listdir(cache_dir):
+        if filename.startswith(f"{name}-{params_key}-") and filename.endswith(".feather") \
+                and filename != os.path.basename(cache_path) and len(filename) == len(os.path.basename(cache_path)):
+            os.remove(os.path.join(cache_dir, filename))
+
+    # check if user wants a quick report
+    if verbose:
+        print(f"Table built and cached: {cache_path}")
+
+
+    return df if columns is None else df[columns]
+
+
+
+def build_key_index(*keys):
+    """Encode the join keys of several tables as integer codes of a shared key index.
+
+    Args
+        keys: pd.Series objects with the keys of each table (e.g. occurrence codes)
+
+    Return
+        codes: list with one int64 numpy array of codes per given key (-1 for missing keys)
+        uniques: a pd.Index with the distinct keys (position = code)"""
+    # import required libraries
+    import numpy as np
+    import pandas as pd
+
+    # factorize all keys at once so equal keys get equal codes on every table
+    all_codes, uniques = pd.factorize(pd.concat([pd.Series(np.asarray(key)) for key in keys], ignore_index=True))
+    all_codes = np.asarray(all_codes, dtype="int64")
+
+    # split codes back per table
+    bounds = np.cumsum([0] + [len(key) for key in keys])
+    codes = [all_codes[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+    return codes, pd.Index(uniques)
+
+
+
+def _fan_out(left_codes, right_codes, n_keys, how):
+    """Get how many rows each left row turns into on a join.
+
+    Args
+        left_codes: int64 numpy array with left key codes
+        right_codes: int64 numpy array with right key codes
+        n_keys: number of distinct keys
+        how: 'left' or 'inner'
+
+    Return
+        right_counts: numpy array with the number of right rows of each key
+        matches: numpy array with the number of right rows each left row matches
+        repeats: numpy array with the number of output rows of each left row"""
+    # import required libraries
+    import numpy as np
+
+    # count right rows per key (missing keys never match)
+    right_counts = np.bincount(right_codes[right_codes >= 0], minlength=n_keys)
+
+    # count matches of each left row
+    matches = np.where(left_codes >= 0, right_counts[left_codes.clip(min=0)], 0)
+
+    # left join keeps unmatched rows once
+    repeats = np.maximum(matches, 1) if how == "left" else matches
+
+
+    return right_counts, matches, repeats
+
+
+
+def fan_out_report(left, right, left_on, right_on, how="left"):
+    """Report how a join would multiply rows before materializing anything.
+
+    Args
+        left: a pd.DataFrame object (e.g. occurrences)
+        right: a pd.DataFrame object (e.g. contributing factors)
+        left_on: name of the key column on the left dataframe
+        right_on: name of the key column on the right dataframe
+        how: 'left' or 'inner'
+
+    Return
+        report: a pd.Series object with row counts and fan-out statistics"""
+    # import required libraries
+    import pandas as pd
+
+    # encode keys
+    (left_codes, right_codes), uniques = build_key_index(left[left_on], right[right_on])
+
+    # count matches of each left row
+    right_counts, matches, repeats = _fan_out(left_codes, right_codes, len(uniques), how)
+
+    # gather fan-out statistics
+    matched = matches > 0
+    report = pd.Series({"left_rows": len(left),
+                        "right_rows": len(right),
+                        "matched_left_rows": int(matched.sum()),
+                        "unmatched_left_rows": int((~matched).sum()),
+                        "right_keys": int((right_counts > 0).sum()),
+                        "max_fan_out": int(matches.max(initial=0)),
+                        "mean_fan_out": float(matches[matched].mean()) if matched.any() else 0.0,
+                        "result_rows": int(repeats.sum())}, dtype="object")
+
+
+    return report
+
+
+
+def aggregate_by_key(df, key, how="count", columns=None, prefix=None):
+    """Pre-aggregate the many side of a one-to-many relationship to one row per key.
+
+    Args
+        df: a pd.DataFrame object with many rows per key (e.g. contributing factors)
+        key: name of the key column
+        how: 'count' (number of rows per key), 'first' (first value of the given columns)
+            or 'multi_hot' (one boolean column per level of the given columns)
+        columns: list with the columns to aggregate ('first' and 'multi_hot')
+        prefix: prefix for the new column names (defaults to the column name on 'multi_hot'
+            and to the key name on 'count')
+
+    Return
+        dataframe: a pd.DataFrame object with the key column and one row per key"""
+    # import required libraries
+    import numpy as np
+    import pandas as pd
+
+    # encode keys (rows with missing keys are ignored)
+    codes, uniques = pd.factorize(df[key])
+    codes = np.asarray(codes, dtype="int64")
+    valid = codes >= 0
+
+    # columns to aggregate
+    columns = [] if columns is None else list(columns)
+
+    # one row per key
+    aggregated = pd.DataFrame({key: np.asarray(uniques)})
+
+    # ======= COUNT =======
+    if how == "count":
+        aggregated[f"{key if prefix is None else prefix}_count"] = np.bincount(codes[valid], minlength=len(uniques))
+
+    # ======= FIRST VALUE =======
+    elif how == "first":
+        # get the position of the first row of each key (every code from 0 to len(uniques) - 1 is present)
+        _, first_valid = np.unique(codes[valid], return_index=True)
+        first_rows = np.flatnonzero(valid)[first_valid]
+        # take first values
+        for col in columns:
+            aggregated[col if prefix is None else f"{prefix}_{col}"] = df[col].iloc[first_rows].to_numpy()
+
+    # ======= MULTI-HOT =======
+    elif how == "multi_hot":
+        # iterate over columns to encode
+        for col in columns:
+            # encode column levels (missing values are ignored)
+            level_codes, levels = pd.factorize(df[col], sort=True)
+            level_codes = np.asarray(level_codes, dtype="int64")
+            both = valid & (level_codes >= 0)
+            # mark every (key, level) pair seen
+            matrix = np.zeros((len(uniques), len(levels)), dtype="bool")
+            matrix[codes[both], level_codes[both]] = True
+            # add one boolean column per level
+            names = [f"{col if prefix is None else prefix}_{level}" for level in levels]
+            aggregated = pd.concat([aggregated, pd.DataFrame(matrix, columns=names)], axis=1)
+
+    # unknown aggregation
+    else:
+        raise ValueError(f"how must be 'count', 'first' or 'multi_hot', got {how!r}")
+
+
+    return aggregated
+
+
+
+def join_tables(left, right, left_on, right_on, how="left", aggregate=None, columns=None,
+                max_fan_out=None, suffixes=("_x", "_y"), verbose=True):
+    """Join two tables on integer codes of a shared key index, reporting fan-out first.
+
+    Missing keys never match (unlike pd.merge, which matches missing to missing).
+
+    Args
+        left: a pd.DataFrame object (e.g. occurrences)
+        right: a pd.DataFrame object (e.g. aircraft or contributing factors)
+        left_on: name of the key column on the left dataframe
+        right_on: name of the key column on the right dataframe
+        how: 'left' or 'inner'
+        aggregate: None to join every right row, or 'count', 'first' or 'multi_hot'
+            to pre-aggregate the right table to one row per key (see aggregate_by_key)
+        columns: list with the right columns to aggregate ('first' and 'multi_hot')
+        max_fan_out: maximum number of right rows a left row may match.
+            A ValueError is raised before materializing the join if it is exceeded.
+        suffixes: suffixes for overlapping column names (left, right)
+        verbose: a boolean to check if user wants to see the fan-out report
+
+    Return
+        dataframe: a pd.DataFrame object with the joined tables"""
+    # import required libraries
+    import numpy as np
+    import pandas as pd
+    from a3data_case.instrumentation import stage
+
+    # check join type
+    if how not in ("left", "inner"):
+        raise ValueError(f"how must be 'left' or 'inner', got {how!r}")
+
+    # pre-aggregate the many side
+    if aggregate is not None:
+        with stage("join_tables.aggregate", rows=len(right)):
+            right = aggregate_by_key(right, right_on, how=aggregate, columns=columns)
+
+    # ======= FAN-OUT =======
+
+    with stage("join_tables.fan_out", rows=len(left) + len(right)):
+        # encode keys
+        (left_codes, right_codes), uniques = build_key_index(left[left_on], right[right_on])
+
+        # count matches of each left row
+        right_counts, matches, repeats = _fan_out(left_codes, right_codes, len(uniques), how)
+
+    # check if user wants the fan-out report
+    if verbose:
+        print(f"Join fan-out: max {matches.max(initial=0)} right rows per left row,",
+              f"\nLeft rows: {len(left):,} -> result rows: {repeats.sum():,}")
+
+    # stop before materializing an exploding join
+    if max_fan_out is not None and matches.max(initial=0) > max_fan_out:
+        raise ValueError(f"Join fan-out {matches.max(initial=0)} is larger than max_fan_out={max_fan_out}. "
+                         "Pre-aggregate the right table with aggregate=.")
+
+    # ======= ROW POSITIONS =======
+
+    # right rows sorted by key code (missing keys removed)
+    valid_right = np.flatnonzero(right_codes >= 0)
+    right_sorted = valid_right[np.argsort(right_codes[valid_right], kind="stable")]
+    # position of the first right row of each key on right_sorted
+    key_offsets = np.cumsum(right_counts) - right_counts
+
+    # repeat left rows by their number of output rows
+    left_take = np.repeat(np.arange(len(left)), repeats)
+    # get the position of each output row within its left row
+    within = np.arange(len(left_take)) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+    # get matching right rows (-1 for unmatched left rows)
+    right_take = np.full(len(left_take), -1, dtype="int64")
+    matched = matches[left_take] > 0
+    right_take[matched] = right_sorted[key_offsets[left_codes[left_take][matched]] + within[matched]]
+
+    # ======= MATERIALIZE =======
+
+    # drop right key if it has the same name as the left key
+    right_columns = [col for col in right.columns if not (col == right_on and right_on == left_on)]
+
+    # rename overlapping columns
+    overlap = set(left.columns) & set(right_columns)
+    left_part = left.rename(columns={col: f"{col}{suffixes[0]}" for col in overlap})
+    right_part = right[right_columns].rename(columns={col: f"{col}{suffixes[1]}" for col in overlap})
+
+    # take rows (unmatched rows are filled with missing values)
+    with stage("join_tables.materialize", rows=len(left_take)):
+        left_part = left_part.iloc[left_take].reset_index(drop=True)
+        right_part = right_part.reset_index(drop=True).reindex(right_take).reset_index(drop=True)
+        df = pd.concat([left_part, right_part], axis=1)
+
+
+    return df
@@ -1,59 +1,286 @@
-def numerical_plot( dataframe, column, figsize = (8, 7), hist = True ):
+def _numerical_aggregates( values, bins = 50, grid_size = 512, max_fliers = 1000 ):
     '''
-    Plot histogram (or kde) on the hist_axs and boxplot on the box_axs
+    Reduce a numerical column to what its plots need: histogram bin counts, a KDE evaluated
+    on a grid (Gaussian kernel convolved with a fine histogram) and box-plot statistics.
     
     Args
+        values: numpy array or pandas series with numerical values (missing values are ignored)
+        bins: number of histogram bins
+        grid_size: number of points of the KDE grid
+        max_fliers: maximum number of outliers kept for the box plot (evenly spaced in rank)
+    
+    Return
+        aggregates: a dictionary with 'count', 'edges', 'counts', 'kde_x', 'kde_y'
+                    (density scaled to histogram counts) and 'box' (statistics for Axes.bxp)
+    '''
+
+    # import required libraries
+    import numpy as np
+
+    # keep only finite values
+    values = np.asarray( values, dtype = 'float64' )
+    values = values[ np.isfinite( values ) ]
+    count = len( values )
+
+    # no values -> nothing to plot
+    if count == 0:
+        return {'count': 0, 'edges': np.array([0.0, 1.0]), 'counts': np.array([0]),
+                'kde_x': np.array([]), 'kde_y': np.array([]), 'box': None}
+
+    # ======= HISTOGRAM =======
+
+    # histogram bin counts
+    counts, edges = np.histogram( values, bins = bins )
+
+    # ======= KDE =======
+
+    # Scott's rule bandwidth with the sample std (same rule used by seaborn/scipy; a single value has no spread)
+    bandwidth = values.std( ddof = 1 ) * count ** (-1 / 5) if count > 1 else 0.0
+
+    # constant values have no density curve
+    if bandwidth > 0:
+        # bin values on a fine grid that covers the kernel tails
+        grid_edges = np.linspace( values.min() - 3 * bandwidth, values.max() + 3 * bandwidth, grid_size + 1 )
+        grid_counts, _ = np.histogram( values, bins = grid_edges )
+        step = grid_edges[1] - grid_edges[0]
+        kde_x = ( grid_edges[:-1] + grid_edges[1:] ) / 2
+
+        # convolve binned values with a gaussian kernel
+        kernel_x = np.arange( -int( 4 * bandwidth / step ) - 1, int( 4 * bandwidth / step ) + 2 ) * step
+        kernel = np.exp( -0.5 * ( kernel_x / bandwidth ) ** 2 ) / ( bandwidth * np.sqrt( 2 * np.pi ) )
+        density = np.convolve( grid_counts, kernel, mode = 'same' )[ : grid_size ] / count
+
+        # scale density to histogram counts (as histplot(kde = True) does)
+        kde_y = density * count * ( edges[1] - edges[0] )
+    else:
+        kde_x, kde_y = np.array([]), np.array([])
+
+    # ======= BOX PLOT =======
+
+    # quartiles in a single call
+    q1, median, q3 = np.quantile( values, [0.25, 0.5, 0.75] )
+    iqr = q3 - q1
+
+    # whiskers go up to the last values within 1.5 IQR
+    inside = values[ ( values >= q1 - 1.5 * iqr ) & ( values <= q3 + 1.5 * iqr ) ]
+    fliers = values[ ( values < q1 - 1.5 * iqr ) | ( values > q3 + 1.5 * iqr ) ]
+
+    # keep a bounded number of outliers
+    if len( fliers ) > max_fliers:
+        fliers = np.sort( fliers )[ np.linspace( 0, len( fliers ) - 1, max_fliers ).astype( 'int64' ) ]
+
+    # box-plot statistics
+    box = {'med': median, 'q1': q1, 'q3': q3, 
+           'whislo': inside.min(), 'whishi': inside.max(), 
+           'fliers': fliers}
+
+
+    return {'count': count, 'edges': edges, 'counts': counts, 'kde_x': kde_x, 'kde_y': kde_y, 'box': box}
+
+
+
+def _categorical_aggregates( series, top_k = 20, other_label = 'other' ):
+    '''
+    Reduce a categorical column to the counts of its top_k most frequent levels
+    plus one level with the count of all remaining levels.
+    
+    Args
+        series: pandas series with categorical values (missing values are ignored)
+        top_k: maximum number of levels kept
+        other_label: label of the level with the remaining counts
+    
+    Return
+        counts: a pandas series with counts indexed by level
+    '''
+
+    # import required libraries
+    import pandas as pd
+
+    # count levels
+    counts = series.value_counts( dropna = True )
+    counts.index = counts.index.astype( str )
+
+    # cap the number of levels
+    if len( counts ) > top_k:
+        counts = pd.concat( [ counts.iloc[ :top_k ], pd.Series( {other_label: counts.iloc[ top_k: ].sum()} ) ] )
+
+
+    return counts
+
+
+
+def _draw_numerical( fig, dataframe, column, hist = True, aggregate = False, bins = 50 ):
+    '''
+    Draw histogram (or kde) and boxplot of a numerical feature on the given figure
+    
+    Args
+        fig: a matplotlib figure object
         dataframe: datataframe with numerical features
         column: numerical feature to be plotted
-        figsize: tuple with figsize (width, height) in inches
-        hist: boolean to indicate if user wants a histplot or a kdeplot.
-            This may be useful when histplot is too slow.
+        hist: boolean to indicate if user wants a histplot or a kdeplot
+        aggregate: boolean to indicate if data is reduced with numpy before plotting
+        bins: number of histogram bins (aggregated path)
     
     Return
         None: a None Type object
     '''
 
     # import required libraries
-    import matplotlib.pyplot as     plt
+    import inspect
     from   matplotlib        import gridspec 
     import seaborn           as     sns
-       
-    # create a figure object
-    fig = plt.figure( figsize = (8, 7), constrained_layout = True );
 
     # create a grid for plotting
-    specs = gridspec.GridSpec( ncols = 1, nrows = 2, figure = fig);
+    specs = gridspec.GridSpec( ncols = 1, nrows = 2, figure = fig );
 
     # check sales distribution
     hist_axs = fig.add_subplot( specs[ 0, 0 ] )
     box_axs = fig.add_subplot( specs[ 1, 0 ] )
 
+    # set titles
+    hist_axs.set_title( column.upper() )
+    box_axs.set_title( column.upper() )
+
+    # check if user wants plots drawn from pre-aggregated data
+    if aggregate:
+
+        # reduce data -> drawing cost doesn't depend on the number of rows
+        aggregates = _numerical_aggregates( dataframe[ column ], bins = bins )
+        edges = aggregates['edges']
+
+        # check if user wants histplot
+        if hist:
+            # plot histogram from bin counts and the kde on top of it
+            hist_axs.bar( edges[:-1], aggregates['counts'], width = edges[1:] - edges[:-1], align = 'edge', alpha = 0.75 )
+            hist_axs.plot( aggregates['kde_x'], aggregates['kde_y'] )
+            hist_axs.set_ylabel( 'Count' )
+        # in case user want kdeplot instead of histplot
+        else:
+            # plot density from the kde grid
+            density = aggregates['kde_y'] / ( aggregates['count'] * ( edges[1] - edges[0] ) ) if aggregates['count'] else aggregates['kde_y']
+            hist_axs.fill_between( aggregates['kde_x'], density, alpha = 0.25 )
+            hist_axs.plot( aggregates['kde_x'], density )
+            hist_axs.set_ylabel( 'Density' )
+        hist_axs.set_xlabel( column )
+
+        # plot boxplot from precomputed statistics
+        if aggregates['box'] is not None:
+            # horizontal boxes ('vert' was replaced by 'orientation' on newer matplotlib versions)
+            horizontal = {'orientation': 'horizontal'} if 'orientation' in inspect.signature( box_axs.bxp ).parameters \
+                         else {'vert': False}
+            box_axs.bxp( [ aggregates['box'] ], **horizontal )
+            box_axs.set_yticks( [] )
+        box_axs.set_xlabel( column )
+
+        return None
+
     # check if user wants histplot
     if hist:
-        # set title
-        hist_axs.set_title( column.upper() )
         # plot histogram
         sns.histplot( x = column, data = dataframe, ax = hist_axs, kde = True )
 
     # in case user want kdeplot instead of histplot
     else:
-        # set title
-        hist_axs.set_title( column.upper() )
         # plot kdeplot
         sns.kdeplot( x = column, data = dataframe, ax = hist_axs, fill = True )
 
-    # set title
-    box_axs.set_title( column.upper() )
-
     # plot boxplot
     sns.boxplot(  x = column, data = dataframe, ax = box_axs )
 
+
+    return None
+
+
+
+def _draw_categorical( ax, df_cat, column, countplot = True, aggregate = False, top_k = 20 ):
+    '''
+    Draw the counts of a categorical feature on the given axes
+    
+    Args
+        ax: a matplotlib axes object
+        df_cat: datataframe with categorical features
+        column: categorical feature to be plotted
+        countplot: a boolean to indicate if user wants to plot a countplot (count = True)
+            or a histplot (countplot = False)
+        aggregate: boolean to indicate if data is reduced with value_counts before plotting
+        top_k: maximum number of levels plotted (aggregated path); the remaining levels are summed as 'other'
     
+    Return
+        None
+    '''
+
+    # import required libraries
+    import numpy   as np
+    import seaborn as sns
+
+    # set the title for the subplot
+    ax.set_title( column.upper() )
+
+    # check if user wants plots drawn from pre-aggregated data
+    if aggregate:
+        # count top_k levels
+        counts = _categorical_aggregates( df_cat[ column ], top_k = top_k )
+        # plot bars on positions -> string levels never go through matplotlib's unit converters
+        # (levels such as '3,5572685896' would be parsed as dates)
+        positions = np.arange( len( counts ) )
+        ax.bar( positions, counts.to_numpy() )
+        ax.set_xticks( positions )
+        ax.set_xticklabels( counts.index.astype( str ) )
+        ax.set_xlabel( column )
+        ax.set_ylabel( 'count' )
+    # check if user wants a countplot
+    elif countplot:
+        # plot countplot
+        sns.countplot( x = column, data = df_cat, ax = ax )
+    # user wants a histplot
+    else:
+        # plot histplot
+        sns.histplot( x = column, data = df_cat, ax = ax )
+
+    # rotate x ticks
+    ax.tick_params( axis = 'x', labelrotation = 90 )
+
+
     return None
 
 
 
-def categorical_plot( df_cat, n_cols = 3, countplot = True, figsize = None ):
+def numerical_plot( dataframe, column, figsize = (8, 7), hist = True, aggregate = False, bins = 50 ):
+    '''
+    Plot histogram (or kde) on the hist_axs and boxplot on the box_axs
+    
+    Args
+        dataframe: datataframe with numerical features
+        column: numerical feature to be plotted
+        figsize: tuple with figsize (width, height) in inches
+        hist: boolean to indicate if user wants a histplot or a kdeplot.
+            This may be useful when histplot is too slow.
+        aggregate: boolean to indicate if data is reduced with numpy first
+            (histogram bin counts, a gridded KDE and box-plot quantiles),
+            so drawing time doesn't grow with the number of rows
+        bins: number of histogram bins when aggregate is True
+    
+    Return
+        None: a None Type object
+    '''
+
+    # import required libraries
+    import matplotlib.pyplot as     plt
+    from a3data_case.instrumentation import stage
+       
+    # create a figure object
+    fig = plt.figure( figsize = figsize, constrained_layout = True );
+
+    # draw plots on the figure
+    with stage( 'numerical_plot.draw', rows = len( dataframe ), column = column ):
+        _draw_numerical( fig, dataframe, column, hist = hist, aggregate = aggregate, bins = bins )
+
+    
+    return None
+
+
+
+def categorical_plot( df_cat, n_cols = 3, countplot = True, figsize = None, aggregate = False, top_k = 20 ):
     '''
     Plot histogram for all features in the dataframe. 
     Dataframe is supposed to have only categorical features.
@@ -64,6 +291,10 @@ def categorical_plot( df_cat, n_cols = 3, countplot = True, figsize = None ):
         countplot: a boolean to indicate if user wants to plot a countplot (count = True)
             or a histplot (countplot = False)
         figsize: tuple with figsize (width, height) in inches       
+        aggregate: a boolean to indicate if data is reduced with value_counts first,
+            so drawing time doesn't grow with the number of rows
+        top_k: maximum number of levels plotted per feature when aggregate is True;
+            the remaining levels are summed as 'other'
     
     Return
         None
@@ -72,7 +303,7 @@ def categorical_plot( df_cat, n_cols = 3, countplot = True, figsize = None ):
     # import required libraries
     import matplotlib.pyplot as plt
     from matplotlib import gridspec
-    import seaborn as sns
+    from a3data_case.instrumentation import stage
 
     # define number of rows
     n_rows = df_cat.shape[1] // n_cols + 1
@@ -92,24 +323,239 @@ def categorical_plot( df_cat, n_cols = 3, countplot = True, figsize = None ):
     for index, column in enumerate( df_cat.columns ):
         # create a subplot to plot the given feature
         ax1 = fig.add_subplot( specs[index // n_cols, index % n_cols] )
-        # set the title for the subplot
-        ax1.set_title( column.upper() )
-        # check if user wants a countplot
-        if countplot:
-            # plot countplot
-            sns.countplot( x = column, data = df_cat, ax = ax1 )
-        # user wants a histplot
-        else:
-            # plot histplot
-            sns.histplot( x = column, data = df_cat, ax = ax1 )
-        # rotate x ticks
-        plt.xticks( rotation = 90 );
+        # draw the feature counts
+        with stage( 'categorical_plot.draw', rows = len( df_cat ), column = column ):
+            _draw_categorical( ax1, df_cat, column, countplot = countplot, aggregate = aggregate, top_k = top_k )
         
     
     return None
 
 
 
+def _init_figure_worker():
+    '''
+    Set the non-interactive Agg backend on a figure export worker process
+    (stage records are not sent from workers)
+    
+    Args
+        None
+    
+    Return
+        None: a None Type object
+    '''
+
+    # import required libraries
+    import matplotlib
+    from a3data_case.instrumentation import disable_worker_instrumentation
+
+    # worker processes don't send stage records (the pool is timed as a whole)
+    disable_worker_instrumentation()
+
+    # render without a display
+    matplotlib.use( 'Agg' )
+
+
+    return None
+
+
+
+def _export_column_figure( kind, data, column, file_name, output_dir, formats, figsize, dpi, options ):
+    '''
+    Render the figure of a single column and save it to files
+    
+    Args
+        kind: 'numerical' or 'categorical'
+        data: datataframe with the column to be plotted
+        column: feature to be plotted
+        file_name: base name of the files (see _figure_file_names)
+        output_dir: directory where files are saved
+        formats: list of file formats (e.g. ['png', 'svg'])
+        figsize: tuple with figsize (width, height) in inches
+        dpi: resolution of raster files
+        options: dictionary with keyword arguments for _draw_numerical or _draw_categorical
+    
+    Return
+        entry: a dictionary with the column, the kind of plot, saved files, 
+               render time in seconds and the error message (if any)
+    '''
+
+    # import required libraries
+    import os
+    import time
+    from matplotlib.figure import Figure
+
+    # start timer
+    start = time.perf_counter()
+    entry = {'column': column, 'kind': kind, 'files': [], 'seconds': None, 'error': None}
+
+    try:
+        # create a figure outside pyplot -> it is never registered on global state
+        fig = Figure( figsize = figsize, constrained_layout = True )
+
+        # draw figure
+        if kind == 'numerical':
+            _draw_numerical( fig, data, column, **options )
+        else:
+            _draw_categorical( fig.add_subplot(), data, column, **options )
+
+        # save figure in every format
+        for file_format in formats:
+            file_path = os.path.join( output_dir, f'{file_name}.{file_format}' )
+            fig.savefig( file_path, dpi = dpi )
+            entry['files'].append( file_path )
+
+    # keep exporting other columns if one of them fails
+    except Exception as error:
+        entry['error'] = f'{type( error ).__name__}: {error}'
+
+    # stop timer
+    entry['seconds'] = time.perf_counter() - start
+
+
+    return entry
+
+
+
+def _figure_file_names( kinds, columns ):
+    '''
+    Get a distinct, file-system safe base name for the figure of every column.
+    Characters other than letters, digits, '.', '-' and '_' become '_', so different
+    columns may get the same name (e.g. 'a b' and 'a_b'): later ones get a numeric suffix.
+    
+    Args
+        kinds: list with 'numerical' or 'categorical' for each column
+        columns: list of features
+    
+    Return
+        file_names: list with one base name per column (e.g. 'categorical_a_b_2')
+    '''
+
+    # import required libraries
+    import re
+
+    # create list of names and set of names in use (case-insensitive file systems included)
+    file_names, used = [], set()
+
+    # iterate over columns
+    for kind, column in zip( kinds, columns ):
+
+        # sanitize column name
+        base_name = kind + '_' + re.sub( r'[^\w.-]+', '_', str( column ) )
+
+        # add a suffix until the name is free
+        file_name, suffix = base_name, 1
+        while file_name.lower() in used:
+            suffix += 1
+            file_name = f'{base_name}_{suffix}'
+
+        # save name
+        used.add( file_name.lower() )
+        file_names.append( file_name )
+
+
+    return file_names
+
+
+
+def export_figures( dataframe, output_dir, numerical_columns = None, categorical_columns = None, formats = ('png',),
+                    n_jobs = -1, aggregate = True, hist = True, countplot = True, bins = 50, top_k = 20,
+                    numerical_figsize = (8, 7), categorical_figsize = (6, 5), dpi = 100 ):
+    '''
+    Render one numerical_plot per numerical feature and one categorical plot per categorical feature
+    on worker processes (Agg backend, no display needed) and save them to files with a manifest.json.
+    Figures are created outside pyplot, so nothing is left open after the export.
+    Columns whose sanitized names clash get a numeric suffix, so no figure overwrites another.
+    Figures that fail are reported on the output and on the manifest, and the export goes on.
+    
+    Args
+        dataframe: datataframe with the features to be plotted
+        output_dir: directory where files are saved (created if needed)
+        numerical_columns: list of numerical features (None -> all numerical features)
+        categorical_columns: list of categorical features (None -> all non-numerical features)
+        formats: list of file formats (e.g. ['png', 'svg'])
+        n_jobs: number of worker processes. -1 uses all cores and None or 1 renders on the current process.
+        aggregate: boolean to indicate if data is reduced before plotting (see numerical_plot)
+        hist: boolean to indicate if user wants a histplot or a kdeplot
+        countplot: a boolean to indicate if user wants a countplot or a histplot (not aggregated)
+        bins: number of histogram bins (aggregated path)
+        top_k: maximum number of levels per categorical feature (aggregated path)
+        numerical_figsize: figsize of numerical figures
+        categorical_figsize: figsize of categorical figures
+        dpi: resolution of raster files
+    
+    Return
+        manifest: a dictionary with export settings and one entry per figure
+                  (also saved as manifest.json on output_dir)
+    '''
+
+    # import required libraries
+    import os
+    import json
+    import time
+    from concurrent.futures import ProcessPoolExecutor
+    from a3data_case.instrumentation import stage
+
+    # get features to be plotted
+    if numerical_columns is None:
+        numerical_columns = list( dataframe.select_dtypes( include = 'number' ).columns )
+    if categorical_columns is None:
+        categorical_columns = list( dataframe.select_dtypes( exclude = 'number' ).columns )
+
+    # create output directory
+    os.makedirs( output_dir, exist_ok = True )
+
+    # create one task per feature -> only the feature column is sent to workers
+    numerical_options = {'hist': hist, 'aggregate': aggregate, 'bins': bins}
+    categorical_options = {'countplot': countplot, 'aggregate': aggregate, 'top_k': top_k}
+    kinds = [ 'numerical' ] * len( numerical_columns ) + [ 'categorical' ] * len( categorical_columns )
+    columns = list( numerical_columns ) + list( categorical_columns )
+    tasks = [ ( kind, dataframe[ [ column ] ], column, file_name, output_dir, list( formats ),
+                numerical_figsize if kind == 'numerical' else categorical_figsize, dpi,
+                numerical_options if kind == 'numerical' else categorical_options )
+              for kind, column, file_name in zip( kinds, columns, _figure_file_names( kinds, columns ) ) ]
+
+    # check the number of workers the user wants
+    if n_jobs == -1:
+        n_jobs = os.cpu_count()
+
+    # start timer
+    start = time.perf_counter()
+
+    # render on the current process
+    if n_jobs is None or n_jobs <= 1 or len( tasks ) <= 1:
+        entries = []
+        for task in tasks:
+            with stage( 'export_figures.figure', rows = len( dataframe ), column = task[2] ):
+                entries.append( _export_column_figure( *task ) )
+
+    # render on worker processes
+    else:
+        with stage( 'export_figures.figures', rows = len( dataframe ) ), \
+             ProcessPoolExecutor( max_workers = n_jobs, initializer = _init_figure_worker ) as executor:
+            entries = list( executor.map( _export_column_figure, *zip( *tasks ) ) )
+
+    # create manifest
+    manifest = {'output_dir': os.path.abspath( output_dir ),
+                'formats': list( formats ),
+                'aggregate': aggregate,
+                'n_jobs': n_jobs,
+                'seconds': time.perf_counter() - start,
+                'figures': entries }
+
+    # save manifest
+    with open( os.path.join( output_dir, 'manifest.json' ), 'w', encoding = 'utf-8' ) as file:
+        json.dump( manifest, file, indent = 4, ensure_ascii = False, default = str )
+
+    # report figures that could not be exported (errors are also kept on the manifest)
+    for entry in entries:
+        if entry['error'] is not None:
+            print( f"Figure of {entry['column']!r} ({entry['kind']}) was not exported: {entry['error']}" )
+
+
+    return manifest
+
+
+
 def cramer_v_corrected_stat( series_one, series_two ):
     '''
     Calculate crame v statistics for two categorical series 
@@ -153,32 +599,886 @@ def cramer_v_corrected_stat( series_one, series_two ):
 
 
 
-def create_cramer_v_dataframe( categ_features_analysis_dataframe ):
+def _encode_categorical_columns( dataframe, dropna = True ):
+    '''
+    Factorize every column of the dataframe into sorted integer codes only once
+    
+    Args:
+        dataframe: dataframe with only categorical features
+        dropna: boolean to indicate if missing values are coded as -1 (True)
+                or if they are encoded as a level of their own (False)
+    
+    Return:
+        codes: list with one int64 numpy array of codes for each column
+        n_levels: list with the number of levels of each column'''
+    # import required libraries
+    import numpy as np
+    import pandas as pd
+    from a3data_case.instrumentation import stage
+
+    # create lists to store codes and number of levels
+    codes, n_levels = [], []
+
+    # iterate over columns and factorize them
+    for column in dataframe.columns:
+        # factorize column with sorted levels (same level order as pd.crosstab)
+        # missing values are coded as -1
+        with stage( '_encode_categorical_columns.column', rows = len( dataframe ), column = column ):
+            column_codes, uniques = pd.factorize( dataframe[ column ], sort = True )
+        # ensure codes are int64 so they can be safely combined in bincounts
+        column_codes = np.asarray( column_codes, dtype = np.int64 )
+        # get the number of levels of the column
+        column_levels = len( uniques )
+
+        # check if user wants missing values as a level of their own
+        if not dropna and ( column_codes == -1 ).any():
+            # assign missing values to a new level after the observed ones
+            column_codes[ column_codes == -1 ] = column_levels
+            column_levels += 1
+
+        # save column results
+        codes.append( column_codes )
+        n_levels.append( column_levels )
+
+
+    return codes, n_levels
+
+
+
+def _contingency_table( codes_one, n_levels_one, codes_two, n_levels_two ):
+    '''
+    Build the contingency table of two encoded columns with an integer bincount
+    
+    Args:
+        codes_one: int64 numpy array with codes of the first column (-1 for missing values)
+        n_levels_one: number of levels of the first column
+        codes_two: int64 numpy array with codes of the second column (-1 for missing values)
+        n_levels_two: number of levels of the second column
+    
+    Return:
+        table: 2D numpy array with counts for every observed level pair.
+               As with pd.crosstab, rows with missing values and unobserved levels are dropped.'''
+    # import required libraries
+    import numpy as np
+
+    # get rows where both columns have valid codes
+    valid = ( codes_one >= 0 ) & ( codes_two >= 0 )
+    # remove rows with missing values only if there are any
+    if not valid.all():
+        codes_one = codes_one[ valid ]
+        codes_two = codes_two[ valid ]
+
+    # count every level pair at once
+    table = np.bincount( codes_one * n_levels_two + codes_two, 
+                         minlength = n_levels_one * n_levels_two ).reshape( n_levels_one, n_levels_two )
+
+    # remove levels that were not observed for this pair
+    table = table[ table.sum( axis = 1 ) > 0 ][ :, table.sum( axis = 0 ) > 0 ]
+
+
+    return table
+
+
+
+def _cramer_v_from_table( table, correction = True ):
+    '''
+    Calculate corrected Cramer-V statistic from a contingency table
+    
+    Args:
+        table: 2D numpy array with counts for every level pair
+        correction: boolean to apply Yates' continuity correction to the chi-squared
+                    statistic of 2x2 tables (as chi2_contingency does by default)
+    
+    Return:
+        corr_cramer_v: corrected Cramer-V statistic
+
+    NOTE: It uses the same calculation as cramer_v_corrected_stat.'''
+    # import required libraries
+    import numpy as np
+    from scipy.stats import chi2_contingency
+
+    # calculate the sum along all dimensions
+    n = table.sum()
+    # calculate number of row and columns of contingency table
+    r, k = table.shape
+
+    # calculate chi_squared statistics
+    chi2 = chi2_contingency( table, correction = correction )[0]
+
+    # calculate chi_squared correction
+    chi2corr = max( 0, chi2 - (k-1)*(r-1)/(n-1) )
+    # calculate k correction
+    kcorr = k - (k-1)**2/(n-1)
+    # calculate r correction
+    rcorr = r - (r-1)**2/(n-1)
+
+    # calculate corrected cramer-v
+    corr_cramer_v = np.sqrt( (chi2corr/n) / ( min( kcorr-1, rcorr-1 ) ) )
+
+
+    return corr_cramer_v
+
+
+
+# encoded columns shared with process pool workers (set by _init_cramer_v_worker)
+_WORKER_CODES = None
+_WORKER_N_LEVELS = None
+
+
+
+def _init_cramer_v_worker( codes, n_levels ):
     '''
-    Create a correlation matrix for features on categorical dataframe
+    Store encoded columns on the worker process so they are sent only once per worker
+    
+    Args:
+        codes: list with one int64 numpy array of codes for each column
+        n_levels: list with the number of levels of each column
+    
+    Return:
+        None: a None type object'''
+    # import required libraries
+    from a3data_case.instrumentation import disable_worker_instrumentation
+
+    # worker processes don't send stage records (the pool is timed as a whole)
+    disable_worker_instrumentation()
+
+    # make encoded columns available to _cramer_v_pairs
+    global _WORKER_CODES, _WORKER_N_LEVELS
+    _WORKER_CODES, _WORKER_N_LEVELS = codes, n_levels
+
+
+    return None
+
+
+
+def _cramer_v_pairs( pairs, codes = None, n_levels = None ):
+    '''
+    Calculate corrected Cramer-V statistic for a list of column pairs
+    
+    Args:
+        pairs: list of (row, column) tuples with column positions
+        codes: list with one int64 numpy array of codes for each column.
+               If None, the codes stored by _init_cramer_v_worker are used.
+        n_levels: list with the number of levels of each column
+    
+    Return:
+        list with corrected Cramer-V statistic for every pair'''
+    # check if codes were stored on a worker process
+    if codes is None:
+        codes, n_levels = _WORKER_CODES, _WORKER_N_LEVELS
+
+
+    return [ float( _cramer_v_from_table( _contingency_table( codes[ i ], n_levels[ i ], 
+                                                               codes[ j ], n_levels[ j ] ) ) ) 
+             for i, j in pairs ]
+
+
+
+def create_cramer_v_dataframe( categ_features_analysis_dataframe, n_jobs = None ):
+    '''
+    Create a correlation matrix for features on categorical dataframe.
+    Columns are factorized only once and contingency tables are built with integer bincounts.
+    Only the upper triangle is calculated since the matrix is symmetric.
     
     Args:
         categ_features_analysis_dataframe: dataframe with only categorical features
+        n_jobs: number of worker processes to spread column pairs on.
+                None or 1 runs on the current process and -1 uses all cores.
     
     Return:
         categ_corr_matrix: dataframe with cramer-v for every row-column pair 
                            in the input dataframe'''
     # import required libraries
+    import os
     import numpy as np
     import pandas as pd
-    
-    # create final dataframe skeleton
-    df_cramer_v = pd.DataFrame( columns = categ_features_analysis_dataframe.columns, 
-                                index = categ_features_analysis_dataframe.columns )
+    from concurrent.futures import ProcessPoolExecutor
+    from a3data_case.instrumentation import stage
+
+    # factorize every column only once
+    codes, n_levels = _encode_categorical_columns( categ_features_analysis_dataframe )
+
+    # get the column pairs of the upper triangle (diagonal included)
+    n_features = len( codes )
+    pairs = [ (i, j) for i in range( n_features ) for j in range( i, n_features ) ]
+
+    # check the number of workers the user wants
+    if n_jobs == -1:
+        n_jobs = os.cpu_count()
+
+    # calculate cramer-v on the current process
+    if n_jobs is None or n_jobs <= 1 or len( pairs ) <= 1:
+        with stage( 'create_cramer_v_dataframe.pairs', rows = len( categ_features_analysis_dataframe ) * len( pairs ) ):
+            values = _cramer_v_pairs( pairs, codes, n_levels )
+
+    # spread column pairs across a process pool
+    else:
+        # split pairs in a few chunks per worker to balance the load
+        n_chunks = min( len( pairs ), n_jobs * 4 )
+        chunks = [ pairs[ index::n_chunks ] for index in range( n_chunks ) ]
 
-    # fill final dataframe with cramer-v statistics for every row-column pair
-    for row in df_cramer_v:
-        for column in df_cramer_v:   
-            df_cramer_v.loc[row, column] = float( cramer_v_corrected_stat( categ_features_analysis_dataframe[ row ],
-                                                                           categ_features_analysis_dataframe[ column] ) )
+        # send encoded columns once per worker and calculate chunks
+        with stage( 'create_cramer_v_dataframe.pairs', rows = len( categ_features_analysis_dataframe ) * len( pairs ) ), \
+             ProcessPoolExecutor( max_workers = n_jobs, 
+                                  initializer = _init_cramer_v_worker, 
+                                  initargs = ( codes, n_levels ) ) as executor:
+            chunk_values = list( executor.map( _cramer_v_pairs, chunks ) )
 
-    # ensure cramer-v is float
-    categ_corr_matrix = df_cramer_v.astype( 'float' )
+        # put values back on the same order as pairs
+        values = [ None ] * len( pairs )
+        for index, chunk in enumerate( chunk_values ):
+            values[ index::n_chunks ] = chunk
+
+    # fill both triangles of the matrix
+    matrix = np.empty( ( n_features, n_features ), dtype = 'float' )
+    for (i, j), value in zip( pairs, values ):
+        matrix[ i, j ] = matrix[ j, i ] = value
+
+    # create final dataframe
+    categ_corr_matrix = pd.DataFrame( matrix, 
+                                      columns = categ_features_analysis_dataframe.columns, 
+                                      index = categ_features_analysis_dataframe.columns )
         
         
-    return categ_corr_matrix
\ No newline at end of file
+    return categ_corr_matrix
+
+
+
+# number of codes counted per numpy call of the permutation tests (about 4 million)
+_PERMUTATION_CALL_CODES = 2**22
+
+
+
+def _permutation_test_pair( codes_one, codes_two, n_permutations, batch_size, alpha, confidence, seed ):
+    '''
+    Permutation test of the association between two encoded columns.
+    The second column is shuffled many times per numpy call: each batch of shuffles
+    is counted with a single bincount into one contingency table per shuffle.
+    Shuffles keep both margins of the table, so the Pearson chi-squared statistic
+    (and the corrected Cramer-V, which only grows with it) is compared on
+    sum( table**2 / ( row_total * column_total ) ). The reported Cramer-V uses the
+    same uncorrected Pearson chi-squared (no Yates' correction on 2x2 tables).
+    On tall columns, the rows of each batch are counted in chunks, so memory stays
+    bounded while every batch keeps a minimum number of shuffles.
+    
+    Args:
+        codes_one: int64 numpy array with codes of the first column (-1 for missing values)
+        codes_two: int64 numpy array with codes of the second column (-1 for missing values)
+        n_permutations: maximum number of shuffles
+        batch_size: number of shuffles per batch (None -> about 4 million codes per call, at least 16 shuffles)
+        alpha: significance level used to stop early
+        confidence: confidence of the Clopper-Pearson interval of the p-value used to stop early
+                    (None -> always run every shuffle)
+        seed: seed (or numpy SeedSequence) of the shuffles
+    
+    Return:
+        result: dictionary with cramer_v, p_value, n_permutations (shuffles run) and n_rows'''
+    # import required libraries
+    import numpy as np
+    from scipy.stats import beta
+
+    # remove rows with missing values
+    valid = ( codes_one >= 0 ) & ( codes_two >= 0 )
+    if not valid.all():
+        codes_one, codes_two = codes_one[ valid ], codes_two[ valid ]
+    n = len( codes_one )
+
+    # keep only observed levels so tables are as small as possible
+    codes_one = np.unique( codes_one, return_inverse = True )[1].reshape( -1 )
+    codes_two = np.unique( codes_two, return_inverse = True )[1].reshape( -1 )
+    r, k = ( codes_one.max() + 1, codes_two.max() + 1 ) if n > 0 else ( 0, 0 )
+
+    # there is no association to test with a single level
+    if r < 2 or k < 2:
+        return {'cramer_v': np.nan, 'p_value': np.nan, 'n_permutations': 0, 'n_rows': n}
+
+    # observed table and statistic
+    table = np.bincount( codes_one * k + codes_two, minlength = r * k ).reshape( r, k )
+    weights = 1 / np.outer( table.sum( axis = 1 ), table.sum( axis = 0 ) )
+    observed = ( table**2 * weights ).sum()
+    # tolerance against floating point errors of equal tables
+    observed -= 1e-12 * observed
+
+    # get number of shuffles per batch (tall columns are chunked over rows instead of shrinking batches)
+    if batch_size is None:
+        batch_size = max( 16, min( _PERMUTATION_CALL_CODES // n, 2**24 // ( r * k ) ) )
+    batch_size = int( max( 1, min( batch_size, n_permutations ) ) )
+    # get number of rows counted per numpy call
+    chunk_rows = max( 1, _PERMUTATION_CALL_CODES // batch_size )
+
+    # offsets that send each shuffle of a batch to its own table
+    rng = np.random.default_rng( seed )
+    base = codes_one * k
+    offsets = ( np.arange( batch_size ) * ( r * k ) )[ :, None ]
+    # shuffle the smallest integer type that holds the codes
+    codes_two = codes_two.astype( np.min_scalar_type( k - 1 ) )
+
+    # shuffle in batches
+    n_extreme, n_done = 0, 0
+    while n_done < n_permutations:
+        size = min( batch_size, n_permutations - n_done )
+
+        # shuffle every row of the batch independently
+        shuffled = rng.permuted( np.broadcast_to( codes_two, ( size, n ) ), axis = 1 )
+
+        # count the tables of the whole batch, one chunk of rows at a time
+        tables = np.zeros( size * r * k, dtype = 'int64' )
+        for start in range( 0, n, chunk_rows ):
+            stop = min( start + chunk_rows, n )
+            tables += np.bincount( ( base[ start:stop ] + shuffled[ :, start:stop ] + offsets[ :size ] ).reshape( -1 ),
+                                   minlength = size * r * k )
+        tables = tables.reshape( size, r, k )
+
+        # count shuffles at least as extreme as the observed table
+        n_extreme += int( ( ( tables**2 * weights ).sum( axis = ( 1, 2 ) ) >= observed ).sum() )
+        n_done += size
+
+        # stop once the p-value is clearly below or above alpha
+        if confidence is not None and n_done < n_permutations:
+            tail = ( 1 - confidence ) / 2
+            lower = beta.ppf( tail, n_extreme, n_done - n_extreme + 1 ) if n_extreme > 0 else 0.0
+            upper = beta.ppf( 1 - tail, n_extreme + 1, n_done - n_extreme ) if n_extreme < n_done else 1.0
+            if upper < alpha or lower > alpha:
+                break
+
+
+    return {'cramer_v': float( _cramer_v_from_table( table, correction = False ) ),
+            'p_value': ( n_extreme + 1 ) / ( n_done + 1 ),
+            'n_permutations': n_done,
+            'n_rows': n}
+
+
+
+def _permutation_test_pairs( pairs, seeds, options, codes = None ):
+    '''
+    Run permutation tests for a list of column pairs
+    
+    Args:
+        pairs: list of (row, column) tuples with column positions
+        seeds: list with one numpy SeedSequence for each pair
+        options: dictionary with other arguments of _permutation_test_pair
+        codes: list with one int64 numpy array of codes for each column.
+               If None, the codes stored by _init_cramer_v_worker are used.
+    
+    Return:
+        list with the result dictionary of every pair'''
+    # check if codes were stored on a worker process
+    if codes is None:
+        codes = _WORKER_CODES
+
+
+    return [ _permutation_test_pair( codes[ i ], codes[ j ], seed = seed, **options )
+             for (i, j), seed in zip( pairs, seeds ) ]
+
+
+
+def cramer_v_significance( categ_features_analysis_dataframe, n_permutations = 999, nan_policy = 'drop',
+                           alpha = 0.05, confidence = 0.999, batch_size = None, seed = None, n_jobs = None ):
+    '''
+    Corrected Cramer-V and permutation p-value for every pair of categorical features.
+    Columns are factorized only once, and each pair runs many shuffles per numpy call
+    (see _permutation_test_pair). A pair stops early once its p-value is clearly
+    below or above alpha, so only pairs close to alpha run every shuffle.
+    Cramer-V uses the uncorrected Pearson chi-squared (the tested statistic), so on
+    2x2 tables it can differ from create_cramer_v_dataframe, which applies Yates' correction.
+    
+    Args:
+        categ_features_analysis_dataframe: dataframe with only categorical features
+        n_permutations: maximum number of shuffles per pair
+        nan_policy: 'drop' to remove rows with missing values of each pair
+                    or 'level' to count missing values as a level of their own
+        alpha: significance level used to stop early
+        confidence: confidence of the p-value interval used to stop early
+                    (None -> run every shuffle on every pair)
+        batch_size: number of shuffles per batch (None -> chosen from the number of rows and levels)
+        seed: seed of the shuffles (results do not depend on n_jobs)
+        n_jobs: number of worker processes to spread column pairs on.
+                None or 1 runs on the current process and -1 uses all cores.
+    
+    Return:
+        df_significance: dataframe with one row per pair of features (feature_one, feature_two,
+                         cramer_v, p_value, n_permutations, n_rows), strongest associations first'''
+    # import required libraries
+    import os
+    import numpy as np
+    import pandas as pd
+    from concurrent.futures import ProcessPoolExecutor
+    from a3data_case.instrumentation import stage
+
+    # check nan policy
+    if nan_policy not in ('drop', 'level'):
+        raise ValueError( f"nan_policy must be 'drop' or 'level', got {nan_policy!r}" )
+
+    # factorize every column only once
+    codes, _ = _encode_categorical_columns( categ_features_analysis_dataframe, dropna = nan_policy == 'drop' )
+
+    # get the column pairs of the upper triangle (diagonal excluded)
+    n_features = len( codes )
+    pairs = [ (i, j) for i in range( n_features ) for j in range( i + 1, n_features ) ]
+    # one independent stream of shuffles per pair
+    seeds = np.random.SeedSequence( seed ).spawn( len( pairs ) )
+    options = {'n_permutations': n_permutations, 'batch_size': batch_size, 'alpha': alpha, 'confidence': confidence}
+
+    # check the number of workers the user wants
+    if n_jobs == -1:
+        n_jobs = os.cpu_count()
+
+    # run tests on the current process
+    if n_jobs is None or n_jobs <= 1 or len( pairs ) <= 1:
+        with stage( 'cramer_v_significance.pairs', rows = len( categ_features_analysis_dataframe ) * len( pairs ) ):
+            results = _permutation_test_pairs( pairs, seeds, options, codes )
+
+    # spread column pairs across a process pool
+    else:
+        # split pairs in a few chunks per worker to balance the load
+        n_chunks = min( len( pairs ), n_jobs * 4 )
+        chunks = [ pairs[ index::n_chunks ] for index in range( n_chunks ) ]
+        chunk_seeds = [ seeds[ index::n_chunks ] for index in range( n_chunks ) ]
+
+        # send encoded columns once per worker and run chunks
+        with stage( 'cramer_v_significance.pairs', rows = len( categ_features_analysis_dataframe ) * len( pairs ) ), \
+             ProcessPoolExecutor( max_workers = n_jobs,
+                                  initializer = _init_cramer_v_worker,
+                                  initargs = ( codes, None ) ) as executor:
+            chunk_results = list( executor.map( _permutation_test_pairs, chunks, chunk_seeds, [ options ] * n_chunks ) )
+
+        # put results back on the same order as pairs
+        results = [ None ] * len( pairs )
+        for index, chunk in enumerate( chunk_results ):
+            results[ index::n_chunks ] = chunk
+
+    # create final dataframe
+    columns = categ_features_analysis_dataframe.columns
+    df_significance = pd.DataFrame( results, columns = ['cramer_v', 'p_value', 'n_permutations', 'n_rows'] )
+    df_significance.insert( 0, 'feature_one', [ columns[ i ] for i, _ in pairs ] )
+    df_significance.insert( 1, 'feature_two', [ columns[ j ] for _, j in pairs ] )
+    df_significance = df_significance.sort_values( ['p_value', 'cramer_v'], ascending = [True, False],
+                                                   ignore_index = True )
+
+
+    return df_significance
+
+
+
+def season_from_date( dates, dayfirst = True, hemisphere = 'south' ):
+    '''
+    Get the season of each date (astronomical seasons: they start on
+    Mar 20, Jun 21, Sep 22 and Dec 21)
+    
+    Args
+        dates: pandas series with dates or date strings (e.g. ocorrencia_dia)
+        dayfirst: boolean to indicate if date strings start with the day (dd/mm/yyyy)
+        hemisphere: 'south' (summer starts on Dec 21) or 'north' (winter starts on Dec 21)
+    
+    Return
+        seasons: pandas series with 'summer', 'autumn', 'winter' or 'spring' (missing for missing dates)
+    '''
+
+    # import required libraries
+    import numpy  as np
+    import pandas as pd
+
+    # check hemisphere
+    if hemisphere not in ('south', 'north'):
+        raise ValueError( f"hemisphere must be 'south' or 'north', got {hemisphere!r}" )
+
+    # factorize dates -> each distinct date is parsed only once (missing values get code -1)
+    dates = pd.Series( dates )
+    codes, uniques = pd.factorize( dates )
+    uniques = pd.Series( uniques )
+
+    # parse dates only if needed
+    if not pd.api.types.is_datetime64_any_dtype( uniques.dtype ):
+        uniques = pd.to_datetime( uniques, dayfirst = dayfirst, errors = 'coerce' )
+
+    # get month and day as a single number (e.g. Dec 21 -> 1221) with a missing value at the end for code -1
+    month_day = np.append( uniques.dt.month.to_numpy( dtype = 'float64', na_value = np.nan ) * 100
+                           + uniques.dt.day.to_numpy( dtype = 'float64', na_value = np.nan ), np.nan )
+
+    # seasons of the southern hemisphere -> swapped on the northern one
+    names = ['summer', 'autumn', 'winter', 'spring'] if hemisphere == 'south' else ['winter', 'spring', 'summer', 'autumn']
+
+    # choose season from the date of the year
+    seasons = np.select( [ np.isnan( month_day ),
+                           ( month_day >= 1221 ) | ( month_day < 320 ),
+                           month_day < 621,
+                           month_day < 922 ],
+                         [ None ] + names[:3], default = names[3] )
+
+
+    return pd.Series( seasons[ codes ], index = dates.index, dtype = 'object' )
+
+
+
+class AggregationCube:
+    '''
+    Dense cube of counts (and sums of measures) for every combination of levels of a few
+    dimensions, built once by build_aggregation_cube. Slices, roll-ups and ratios are
+    answered from the cube without reading the dataframe again:
+
+        cube = build_aggregation_cube( df, ['ocorrencia_uf', 'season', 'aeronave_tipo_operacao'] )
+        cube.query( by = 'season' )                                     # accidents per season
+        cube.query( by = 'ocorrencia_uf', filters = {'season': 'summer'} )
+        cube.ratio_vs_others( 'ocorrencia_uf', 'SP' )                    # SP vs. mean of other states
+    
+    Args
+        dimensions: list with the names of the dimensions
+        levels: list with one pandas index of levels per dimension (position = code)
+        counts: numpy array of counts with one axis per dimension
+        measures: dictionary with measure names as keys and arrays of sums (same shape as counts) as values
+    '''
+
+    def __init__( self, dimensions, levels, counts, measures = None ):
+
+        # cube data
+        self.dimensions = list( dimensions )
+        self.levels = list( levels )
+        self.counts = counts
+        self.measures = {} if measures is None else dict( measures )
+
+
+    def _values( self, measure ):
+        '''
+        Get the array of a measure ('count' for the number of rows)
+
+        Args
+            measure: 'count' or the name of a measure
+
+        Return
+            values: numpy array with one axis per dimension
+        '''
+
+        # number of rows
+        if measure == 'count':
+            return self.counts
+
+        # check if measure exists
+        if measure not in self.measures:
+            raise KeyError( f"unknown measure {measure!r}; available: {['count'] + list( self.measures )}" )
+
+
+        return self.measures[ measure ]
+
+
+    def _slice( self, values, filters ):
+        '''
+        Keep only the chosen levels of the filtered dimensions
+
+        Args
+            values: numpy array with one axis per dimension
+            filters: dictionary with dimension names as keys and a level or a list of levels as values
+
+        Return
+            values: the sliced numpy array
+            levels: list with the pandas index of the kept levels of each dimension
+        '''
+
+        # import required libraries
+        import numpy  as np
+        import pandas as pd
+
+        # iterate over filtered dimensions
+        levels = list( self.levels )
+        for dimension, chosen in ( filters or {} ).items():
+
+            # get dimension axis
+            if dimension not in self.dimensions:
+                raise KeyError( f"unknown dimension {dimension!r}; available: {self.dimensions}" )
+            axis = self.dimensions.index( dimension )
+
+            # get the codes of the chosen levels
+            chosen = list( chosen ) if isinstance( chosen, (list, tuple, set, np.ndarray, pd.Index) ) else [ chosen ]
+            positions = levels[ axis ].get_indexer( pd.Index( chosen, dtype = 'object' ) )
+            if ( positions == -1 ).any():
+                missing = [ level for level, position in zip( chosen, positions ) if position == -1 ]
+                raise KeyError( f"unknown levels {missing} of dimension {dimension!r}" )
+
+            # keep only the chosen levels
+            values = values.take( positions, axis = axis )
+            levels[ axis ] = levels[ axis ][ positions ]
+
+
+        return values, levels
+
+
+    def query( self, by = None, filters = None, measure = 'count' ):
+        '''
+        Slice the cube and roll it up to the given dimensions
+
+        Args
+            by: a dimension name or a list of dimension names to group by (None sums everything)
+            filters: dictionary with dimension names as keys and a level or a list of levels as values
+            measure: 'count' (number of rows) or the name of a measure given to build_aggregation_cube
+
+        Return
+            result: a pandas series indexed by the levels of the 'by' dimensions
+                (or a single number when by is None)
+        '''
+
+        # import required libraries
+        import numpy  as np
+        import pandas as pd
+
+        # slice cube
+        values, levels = self._slice( self._values( measure ), filters )
+
+        # no grouping -> grand total
+        if by is None:
+            return values.sum().item()
+
+        # get axes of the grouping dimensions
+        by = [ by ] if isinstance( by, str ) else list( by )
+        axes = [ self.dimensions.index( dimension ) for dimension in by ]
+
+        # roll up the other dimensions and put grouping axes in the requested order
+        other_axes = tuple( axis for axis in range( len( self.dimensions ) ) if axis not in axes )
+        values = np.transpose( values.sum( axis = other_axes ), np.argsort( np.argsort( axes ) ) )
+
+        # create result index
+        if len( by ) == 1:
+            index = pd.Index( levels[ axes[0] ], name = by[0] )
+        else:
+            index = pd.MultiIndex.from_product( [ levels[ axis ] for axis in axes ], names = by )
+
+
+        return pd.Series( values.ravel(), index = index, name = measure )
+
+
+    def ratio_vs_others( self, dimension, level, filters = None, measure = 'count', exclude = None ):
+        '''
+        Compare a level of a dimension with the other levels
+        (e.g. 'SP vs. mean of other states' or 'summer vs. other seasons')
+
+        Args
+            dimension: name of the dimension
+            level: level to compare
+            filters: dictionary with filters of other dimensions (see query)
+            measure: 'count' (number of rows) or the name of a measure
+            exclude: list of levels left out of the other levels (e.g. ['***']).
+                Missing values are always left out.
+
+        Return
+            comparison: a pandas series with the value of the level, the mean of the other levels,
+                the ratio between them, the total and the share of the level on the total
+        '''
+
+        # import required libraries
+        import pandas as pd
+
+        # get totals of every level
+        totals = self.query( by = dimension, filters = filters, measure = measure )
+        if level not in totals.index:
+            raise KeyError( f"unknown level {level!r} of dimension {dimension!r}" )
+
+        # get the other levels
+        others = totals.drop( index = [ level ] + [ other for other in ( exclude or [] ) if other in totals.index ] )
+        others = others[ others.index.notna() ]
+
+        # compare level with the other levels
+        value = totals[ level ]
+        others_mean = others.mean() if len( others ) > 0 else float( 'nan' )
+        total = totals.sum()
+
+
+        return pd.Series({'value': value,
+                          'others_mean': others_mean,
+                          'ratio': value / others_mean if others_mean else float( 'nan' ),
+                          'total': total,
+                          'share': value / total if total else float( 'nan' ) }, name = f'{dimension}={level}' )
+
+
+    def save( self, filepath ):
+        '''
+        Save the cube to a .npz file (arrays) with its dimensions and levels as JSON.
+        Levels must be JSON values (strings, numbers, booleans or missing values).
+
+        Args
+            filepath: path of the .npz file
+
+        Return
+            None: a None type object
+        '''
+
+        # import required libraries
+        import json
+        import numpy as np
+
+        # gather dimensions and levels (numpy scalars are converted to python values)
+        meta = {'dimensions': self.dimensions,
+                'levels': [ [ level.item() if isinstance( level, np.generic ) else level for level in levels ]
+                            for levels in self.levels ],
+                'measures': list( self.measures ) }
+
+        # write arrays and parameters to a single file
+        with open( filepath, 'wb' ) as file:
+            np.savez( file, meta = np.array( json.dumps( meta, ensure_ascii = False ) ), counts = self.counts,
+                      **{ f'measure_{index}': values for index, values in enumerate( self.measures.values() ) } )
+
+
+        return None
+
+
+    @classmethod
+    def load( cls, filepath ):
+        '''
+        Load a cube saved with save
+
+        Args
+            filepath: path of the .npz file
+
+        Return
+            cube: an AggregationCube object
+        '''
+
+        # import required libraries
+        import json
+        import numpy  as np
+        import pandas as pd
+
+        # read arrays and parameters
+        with np.load( filepath, allow_pickle = False ) as arrays:
+            arrays = dict( arrays )
+        meta = json.loads( str( arrays['meta'] ) )
+
+        # restore measures in their original order
+        measures = { name: arrays[ f'measure_{index}' ] for index, name in enumerate( meta['measures'] ) }
+
+
+        return cls( meta['dimensions'], [ pd.Index( levels, dtype = 'object' ) for levels in meta['levels'] ],
+                    arrays['counts'], measures )
+
+
+
+def build_aggregation_cube( dataframe, dimensions, measures = None, dropna = False ):
+    '''
+    Encode the chosen dimensions as integer codes and count the rows of every combination
+    of their levels in a single vectorized pass (optionally also summing numerical measures).
+    The cube has one cell per combination of levels, so dimensions should have few levels
+    (e.g. state, season, year, operation type) rather than ids.
+    
+    Args
+        dataframe: dataframe with the dimensions (e.g. with a season column from season_from_date)
+        dimensions: list of column names used as dimensions
+        measures: list of numerical columns summed on every cell (e.g. ['aeronave_fatalidades_total'])
+        dropna: boolean to indicate if rows with missing dimensions are dropped (True)
+            or if missing values are a level of their own (False)
+    
+    Return
+        cube: an AggregationCube object
+    '''
+
+    # import required libraries
+    import numpy  as np
+    import pandas as pd
+    from a3data_case.instrumentation import stage
+
+    # ======= ENCODE DIMENSIONS =======
+
+    # factorize every dimension with sorted levels
+    codes, levels = [], []
+    for dimension in dimensions:
+        with stage( 'build_aggregation_cube.encode', rows = len( dataframe ), column = dimension ):
+            dimension_codes, uniques = pd.factorize( dataframe[ dimension ], sort = True )
+            dimension_codes = np.asarray( dimension_codes, dtype = 'int64' )
+            uniques = pd.Index( np.asarray( uniques, dtype = 'object' ), dtype = 'object' )
+
+            # missing values as a level of their own (after the observed ones)
+            if not dropna and ( dimension_codes == -1 ).any():
+                dimension_codes[ dimension_codes == -1 ] = len( uniques )
+                uniques = uniques.append( pd.Index( [ np.nan ], dtype = 'object' ) )
+
+        codes.append( dimension_codes )
+        levels.append( uniques )
+
+    # ======= COUNT =======
+
+    with stage( 'build_aggregation_cube.count', rows = len( dataframe ) ):
+        # keep rows without missing codes
+        shape = tuple( len( dimension_levels ) for dimension_levels in levels )
+        valid = np.logical_and.reduce( [ dimension_codes >= 0 for dimension_codes in codes ] ) if codes \
+                else np.ones( len( dataframe ), dtype = 'bool' )
+
+        # get the cell of every row
+        cells = np.ravel_multi_index( [ dimension_codes[ valid ] for dimension_codes in codes ], shape ) if codes \
+                else np.zeros( int( valid.sum() ), dtype = 'int64' )
+        n_cells = int( np.prod( shape ) )
+
+        # count rows of every cell
+        counts = np.bincount( cells, minlength = n_cells ).reshape( shape )
+
+        # sum measures of every cell (missing values are skipped)
+        cube_measures = {}
+        for measure in ( measures or [] ):
+            weights = pd.to_numeric( dataframe[ measure ], errors = 'coerce' ).to_numpy( dtype = 'float64', na_value = np.nan )[ valid ]
+            cube_measures[ measure ] = np.bincount( cells, weights = np.nan_to_num( weights, nan = 0.0 ), minlength = n_cells ).reshape( shape )
+
+
+    return AggregationCube( dimensions, levels, counts, cube_measures )
+
+
+
+def spatial_heatmap_plot( dataframe, latitude_column, longitude_column, cell_size = 0.25, bounds = None,
+                          log_scale = True, figsize = (8, 8), cmap = 'inferno' ):
+    '''
+    Plot the number of points per grid cell as a raster image (e.g. accident hotspots).
+    Points are binned once with spatial.GridIndex, so drawing time depends only on
+    the number of cells, not on the number of points.
+    
+    Args
+        dataframe: dataframe with latitude and longitude columns
+            (strings are parsed with data_description.parse_lat_long)
+        latitude_column: name of the latitude column
+        longitude_column: name of the longitude column
+        cell_size: size of the grid cells in degrees
+        bounds: tuple (longitude_min, longitude_max, latitude_min, latitude_max) of the plot
+            (None -> bounds of the non-empty cells)
+        log_scale: boolean to indicate if colors follow the log of the counts
+        figsize: tuple with figsize (width, height) in inches
+        cmap: name of the matplotlib colormap
+    
+    Return
+        fig: the matplotlib figure object (close it with plt.close( fig ) once it is shown or saved)
+        grid: the spatial.GridIndex object (for hotspot and radius queries)
+    '''
+
+    # import required libraries
+    import numpy  as np
+    import pandas as pd
+    import matplotlib.pyplot as plt
+    from matplotlib.colors import LogNorm
+    from a3data_case.spatial import GridIndex
+    from a3data_case.data_description import parse_lat_long
+    from a3data_case.instrumentation import stage
+
+    # get coordinates as floats (raw coordinate strings are parsed first)
+    coordinates = []
+    for column in (latitude_column, longitude_column):
+        values = dataframe[ column ]
+        if not pd.api.types.is_numeric_dtype( values.dtype ):
+            values = parse_lat_long( values )
+        coordinates.append( np.asarray( values, dtype = 'float64' ) )
+
+    # bin points on the grid
+    grid = GridIndex( coordinates[0], coordinates[1], cell_size = cell_size )
+
+    with stage( 'spatial_heatmap_plot.draw', rows = len( dataframe ) ):
+        # get counts per cell as an image (empty cells are transparent)
+        raster, extent = grid.to_raster( bounds )
+        image = np.ma.masked_equal( raster, 0 )
+
+        # create a figure object
+        fig, ax = plt.subplots( figsize = figsize, constrained_layout = True )
+
+        # draw raster
+        norm = LogNorm( vmin = 1, vmax = max( raster.max(), 1 ) ) if log_scale else None
+        mappable = ax.imshow( image, origin = 'lower', extent = extent, cmap = cmap, norm = norm,
+                              interpolation = 'nearest', aspect = 'equal' )
+        fig.colorbar( mappable, ax = ax, label = f'points per {cell_size}° cell', shrink = 0.8 )
+
+        # set labels
+        ax.set_xlabel( 'longitude' )
+        ax.set_ylabel( 'latitude' )
+        ax.set_title( f'Density of {len( grid.point_ids ):,} points' )
+
+
+    return fig, grid
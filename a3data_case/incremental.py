@@ -0,0 +1,421 @@
+def _cramer_v_from_sparse_table( rows, cols, counts ):
+    '''
+    Calculate corrected Cramer-V statistic from the observed cells of a contingency table,
+    without building the dense table (same values as eda._cramer_v_from_table)
+
+    Args
+        rows: int64 numpy array with the row level of each observed cell
+        cols: int64 numpy array with the column level of each observed cell
+        counts: int64 numpy array with the count of each observed cell
+
+    Return
+        corr_cramer_v: corrected Cramer-V statistic
+    '''
+
+    # import required libraries
+    import numpy as np
+    from a3data_case.eda import _cramer_v_from_table
+
+    # get observed levels and their totals
+    row_levels, row_codes = np.unique( rows, return_inverse = True )
+    col_levels, col_codes = np.unique( cols, return_inverse = True )
+    row_totals = np.bincount( row_codes.reshape( -1 ), weights = counts )
+    col_totals = np.bincount( col_codes.reshape( -1 ), weights = counts )
+    r, k = len( row_levels ), len( col_levels )
+
+    # tables with at most 2 levels on a side are tiny -> dense calculation
+    # (same Yates correction of 2x2 tables and same handling of degenerate tables)
+    if r <= 2 or k <= 2:
+        table = np.zeros( ( r, k ), dtype = 'int64' )
+        table[ row_codes.reshape( -1 ), col_codes.reshape( -1 ) ] = counts
+        return _cramer_v_from_table( table )
+
+    # Pearson chi-squared statistic from the observed cells only
+    n = counts.sum()
+    chi2 = n * ( ( counts**2 / ( row_totals[ row_codes.reshape( -1 ) ] * col_totals[ col_codes.reshape( -1 ) ] ) ).sum() - 1 )
+
+    # calculate chi_squared correction
+    chi2corr = max( 0, chi2 - (k-1)*(r-1)/(n-1) )
+    # calculate k correction
+    kcorr = k - (k-1)**2/(n-1)
+    # calculate r correction
+    rcorr = r - (r-1)**2/(n-1)
+
+
+    return np.sqrt( (chi2corr/n) / ( min( kcorr-1, rcorr-1 ) ) )
+
+
+
+class ProfileState:
+    '''
+    Persisted, incrementally updated profile of a table that grows by appended rows
+    (e.g. monthly CENIPA exports).
+    It keeps mergeable moments and quantile sketches of numerical features, the levels
+    seen on every categorical feature and the sparse contingency table of every pair
+    of categorical features. Feeding only the new rows to update costs time proportional
+    to the new rows, and statistics and Cramer-V values are then calculated from the state
+    without reading older rows again:
+
+        state = ProfileState.load( 'profile.npz' )     # or ProfileState() on the first release
+        state.update( df_new_rows )
+        state.save( 'profile.npz' )
+        state.cramer_v_dataframe()
+
+    Rows must be fed only once (the state can't tell an updated row from a new one).
+    Contingency tables are sparse (only observed level pairs are kept), and when features
+    are not given, id-like columns (too many levels) are left out of the categorical features.
+
+    Args
+        numerical_columns: list of numerical features (None -> numerical columns of the first update)
+        categorical_columns: list of categorical features (None -> non-numerical columns of the first update
+            with at most max_levels levels and at most one level per two valid values)
+        sketch_size: number of items kept on each level of the quantile sketches
+        seed: seed for the quantile sketches
+        max_levels: maximum number of levels of the categorical features chosen on the first update
+    '''
+
+    def __init__( self, numerical_columns = None, categorical_columns = None, sketch_size = 2048, seed = None,
+                  max_levels = 1000 ):
+
+        # state parameters
+        self.numerical_columns = None if numerical_columns is None else list( numerical_columns )
+        self.categorical_columns = None if categorical_columns is None else list( categorical_columns )
+        self.sketch_size = sketch_size
+        self.seed = seed
+        self.max_levels = max_levels
+        # number of rows seen
+        self.n_rows = 0
+        # sketches of numerical features -> created on the first update
+        self.moments = None
+        self.quantiles = None
+        # levels seen on each categorical feature (position = code) -> created on the first update
+        self.vocabularies = None
+        # number of valid values of each level of each categorical feature
+        self.level_counts = None
+        # sparse contingency table of each pair (i, j) of categorical features, with i < j:
+        # a tuple of sorted keys ( code_i << 32 | code_j ) and counts of the observed level pairs
+        self.tables = None
+
+
+    def _create_sketches( self, dataframe ):
+        '''
+        Choose features (if the user didn't) and create empty sketches and tables
+
+        Args
+            dataframe: a pandas dataframe with the first rows
+
+        Return
+            None: a None type object
+        '''
+
+        # import required libraries
+        import numpy  as np
+        import pandas as pd
+        from a3data_case.sketches import MomentSketch, QuantileSketch
+
+        # choose features
+        if self.numerical_columns is None:
+            self.numerical_columns = list( dataframe.select_dtypes( include = 'number' ).columns )
+        if self.categorical_columns is None:
+            # leave id-like columns out (e.g. coordinates, dates, free text)
+            self.categorical_columns = []
+            for column, series in dataframe.select_dtypes( exclude = 'number' ).items():
+                n_unique = series.nunique( dropna = True )
+                if n_unique <= self.max_levels and n_unique <= 0.5 * series.notna().sum():
+                    self.categorical_columns.append( column )
+
+        # create numerical sketches
+        self.moments = MomentSketch( len( self.numerical_columns ) )
+        self.quantiles = [ QuantileSketch( self.sketch_size, self.seed ) for _ in self.numerical_columns ]
+
+        # create empty vocabularies, counts and sparse contingency tables
+        n_features = len( self.categorical_columns )
+        self.vocabularies = [ pd.Index( [], dtype = 'object' ) for _ in range( n_features ) ]
+        self.level_counts = [ np.zeros( 0, dtype = 'int64' ) for _ in range( n_features ) ]
+        self.tables = { (i, j): ( np.zeros( 0, dtype = 'int64' ), np.zeros( 0, dtype = 'int64' ) )
+                        for i in range( n_features ) for j in range( i + 1, n_features ) }
+
+
+        return None
+
+
+    def _encode( self, index, series ):
+        '''
+        Encode a categorical feature with the codes of its vocabulary,
+        adding levels that were not seen before at the end
+
+        Args
+            index: position of the feature on categorical_columns
+            series: a pandas series with the new values of the feature
+
+        Return
+            codes: int64 numpy array of codes (-1 for missing values)
+        '''
+
+        # import required libraries
+        import numpy  as np
+        import pandas as pd
+
+        # factorize new values -> each distinct value is looked up only once
+        column_codes, uniques = pd.factorize( series )
+        column_codes = np.asarray( column_codes, dtype = 'int64' )
+        uniques = pd.Index( np.asarray( uniques, dtype = 'object' ), dtype = 'object' )
+
+        # get the code of each distinct value on the vocabulary (-1 for new levels)
+        vocabulary = self.vocabularies[ index ]
+        positions = np.asarray( vocabulary.get_indexer( uniques ), dtype = 'int64' )
+
+        # add new levels at the end of the vocabulary
+        new_levels = positions == -1
+        if new_levels.any():
+            positions[ new_levels ] = len( vocabulary ) + np.arange( new_levels.sum() )
+            self.vocabularies[ index ] = vocabulary.append( uniques[ new_levels ] )
+
+
+        return np.where( column_codes >= 0, positions[ column_codes.clip( min = 0 ) ], -1 )
+
+
+    def update( self, dataframe ):
+        '''
+        Add new rows to the state
+
+        Args
+            dataframe: a pandas dataframe with only the new rows
+                (it must have every feature of the state)
+
+        Return
+            self: the updated state
+        '''
+
+        # import required libraries
+        import numpy  as np
+        import pandas as pd
+        from a3data_case.instrumentation import stage
+
+        # create sketches on the first update
+        if self.moments is None:
+            self._create_sketches( dataframe )
+
+        # ======= NUMERICAL FEATURES =======
+
+        with stage( 'ProfileState.update.numerical', rows = len( dataframe ) ):
+            # get numerical features -> values that can't be parsed as numbers are missing
+            df_numeric = dataframe[ self.numerical_columns ].apply( pd.to_numeric, errors = 'coerce' )
+
+            # get a contiguous float block with one row per feature
+            block = np.ascontiguousarray( df_numeric.to_numpy( dtype = 'float64', na_value = np.nan ).T )
+
+            # update sketches
+            self.moments.update( block )
+            for sketch, values in zip( self.quantiles, block ):
+                sketch.update( values )
+
+        # ======= CATEGORICAL FEATURES =======
+
+        # encode features with the codes of their vocabularies and count levels
+        codes = []
+        for index, column in enumerate( self.categorical_columns ):
+            with stage( 'ProfileState.update.encode', rows = len( dataframe ), column = column ):
+                column_codes = self._encode( index, dataframe[ column ] )
+                n_levels = len( self.vocabularies[ index ] )
+                counts = np.bincount( column_codes[ column_codes >= 0 ], minlength = n_levels )
+                self.level_counts[ index ] = np.pad( self.level_counts[ index ], (0, n_levels - len( self.level_counts[ index ] )) ) + counts
+                codes.append( column_codes )
+
+        # add counts of new rows to the sparse contingency table of every pair
+        # (only the level pairs of the new rows are touched)
+        with stage( 'ProfileState.update.tables', rows = len( dataframe ) * len( self.tables ) ):
+            for (i, j), (keys, counts) in self.tables.items():
+
+                # count level pairs of new rows where both features have valid values
+                valid = ( codes[ i ] >= 0 ) & ( codes[ j ] >= 0 )
+                new_keys, new_counts = np.unique( ( codes[ i ][ valid ] << 32 ) | codes[ j ][ valid ], return_counts = True )
+
+                # add counts of level pairs already in the table
+                positions = np.searchsorted( keys, new_keys )
+                found = positions < len( keys )
+                found[ found ] = keys[ positions[ found ] ] == new_keys[ found ]
+                counts[ positions[ found ] ] += new_counts[ found ]
+
+                # insert level pairs seen for the first time (keys stay sorted)
+                if not found.all():
+                    keys = np.insert( keys, positions[ ~found ], new_keys[ ~found ] )
+                    counts = np.insert( counts, positions[ ~found ], new_counts[ ~found ] )
+                    self.tables[ (i, j) ] = ( keys, counts )
+
+        # count rows
+        self.n_rows += len( dataframe )
+
+
+        return self
+
+
+    def summary_statistics( self ):
+        '''
+        Statistics of numerical features of every row seen so far
+        (see data_description.stream_summary_statistics: median and IQR are estimates)
+
+        Args
+            None
+
+        Return
+            df_stats: a pandas dataframe with the same columns as compute_summary_statistics
+        '''
+
+        # import required libraries
+        import pandas as pd
+        from a3data_case.data_description import STATISTICS_COLUMNS, _statistics_from_sketches
+
+        # no rows -> no statistics
+        if self.moments is None:
+            return pd.DataFrame( columns = STATISTICS_COLUMNS )
+
+
+        return _statistics_from_sketches( self.numerical_columns, self.moments, self.quantiles )
+
+
+    def cramer_v_dataframe( self ):
+        '''
+        Corrected Cramer-V matrix of categorical features of every row seen so far,
+        calculated from the contingency tables (same values as create_cramer_v_dataframe)
+
+        Args
+            None
+
+        Return
+            categ_corr_matrix: dataframe with cramer-v for every pair of categorical features
+        '''
+
+        # import required libraries
+        import numpy  as np
+        import pandas as pd
+
+        # no rows -> empty matrix
+        columns = [] if self.categorical_columns is None else self.categorical_columns
+        matrix = np.empty( ( len( columns ), len( columns ) ), dtype = 'float' )
+
+        # diagonal -> a feature against itself (only observed levels)
+        for i, counts in enumerate( self.level_counts or [] ):
+            observed = np.flatnonzero( counts )
+            matrix[ i, i ] = _cramer_v_from_sparse_table( observed, observed, counts[ observed ] )
+
+        # fill both triangles of the matrix
+        for (i, j), (keys, counts) in ( self.tables or {} ).items():
+            matrix[ i, j ] = matrix[ j, i ] = _cramer_v_from_sparse_table( keys >> 32, keys & 0xffffffff, counts )
+
+
+        return pd.DataFrame( matrix, columns = columns, index = columns )
+
+
+    def save( self, filepath ):
+        '''
+        Save the state to a .npz file (arrays) with its parameters and vocabularies as JSON.
+        Levels and feature names must be JSON values (strings, numbers, booleans).
+
+        Args
+            filepath: path of the .npz file
+
+        Return
+            None: a None type object
+        '''
+
+        # import required libraries
+        import json
+        import numpy as np
+
+        # gather parameters
+        meta = {'numerical_columns': self.numerical_columns,
+                'categorical_columns': self.categorical_columns,
+                'sketch_size': self.sketch_size,
+                'seed': self.seed,
+                'max_levels': self.max_levels,
+                'n_rows': self.n_rows,
+                'vocabularies': None,
+                'quantiles': None }
+        arrays = {}
+
+        # check if the state has rows
+        if self.moments is not None:
+
+            # save moments
+            for name, values in self.moments.to_dict().items():
+                arrays[ f'moments_{name}' ] = values
+
+            # save quantile sketches -> parameters as JSON and items of each level as arrays
+            meta['quantiles'] = []
+            for index, sketch in enumerate( self.quantiles ):
+                sketch_state = sketch.to_dict()
+                for level, items in enumerate( sketch_state.pop( 'levels' ) ):
+                    arrays[ f'quantiles_{index}_{level}' ] = items
+                sketch_state['n_levels'] = len( sketch.levels )
+                meta['quantiles'].append( sketch_state )
+
+            # save vocabularies, level counts and contingency tables
+            # (numpy scalars are converted to python values so they can be saved as JSON)
+            meta['vocabularies'] = [ [ level.item() if isinstance( level, np.generic ) else level for level in vocabulary ]
+                                     for vocabulary in self.vocabularies ]
+            for index, counts in enumerate( self.level_counts ):
+                arrays[ f'level_counts_{index}' ] = counts
+            for (i, j), (keys, counts) in self.tables.items():
+                arrays[ f'table_{i}_{j}_keys' ] = keys
+                arrays[ f'table_{i}_{j}_counts' ] = counts
+
+        # write arrays and parameters to a single compressed file
+        with open( filepath, 'wb' ) as file:
+            np.savez_compressed( file, meta = np.array( json.dumps( meta, ensure_ascii = False ) ), **arrays )
+
+
+        return None
+
+
+    @classmethod
+    def load( cls, filepath ):
+        '''
+        Load a state saved with save
+
+        Args
+            filepath: path of the .npz file
+
+        Return
+            state: a ProfileState object
+        '''
+
+        # import required libraries
+        import json
+        import numpy  as np
+        import pandas as pd
+        from a3data_case.sketches import MomentSketch, QuantileSketch
+
+        # read arrays and parameters
+        with np.load( filepath, allow_pickle = False ) as arrays:
+            arrays = dict( arrays )
+        meta = json.loads( str( arrays.pop( 'meta' ) ) )
+
+        # create empty state
+        state = cls( meta['numerical_columns'], meta['categorical_columns'], meta['sketch_size'], meta['seed'],
+                     meta['max_levels'] )
+        state.n_rows = meta['n_rows']
+
+        # state without rows
+        if meta['vocabularies'] is None:
+            return state
+
+        # restore numerical sketches
+        state.moments = MomentSketch.from_dict( { name[ len( 'moments_' ): ]: values
+                                                  for name, values in arrays.items() if name.startswith( 'moments_' ) } )
+        state.quantiles = []
+        for index, sketch_state in enumerate( meta['quantiles'] ):
+            sketch_state['levels'] = [ arrays[ f'quantiles_{index}_{level}' ] for level in range( sketch_state.pop( 'n_levels' ) ) ]
+            state.quantiles.append( QuantileSketch.from_dict( sketch_state ) )
+
+        # restore vocabularies, level counts and contingency tables
+        n_features = len( state.categorical_columns )
+        state.vocabularies = [ pd.Index( levels, dtype = 'object' ) for levels in meta['vocabularies'] ]
+        state.level_counts = [ arrays[ f'level_counts_{index}' ] for index in range( n_features ) ]
+        state.tables = {}
+        for i in range( n_features ):
+            for j in range( i + 1, n_features ):
+                state.tables[ (i, j) ] = ( arrays[ f'table_{i}_{j}_keys' ], arrays[ f'table_{i}_{j}_counts' ] )
+
+
+        return state
@@ -1,6 +1,7 @@
 def initial_settings():
     '''
     Set initial settings for dataframes and plotting diplays.
+    Outside a notebook (or without IPython), notebook cell settings are skipped.
 
     Args
         None
@@ -12,8 +13,6 @@ def initial_settings():
     # import required libraries
     import pandas as pd
     import matplotlib.pyplot as plt
-    import seaborn as sns
-    from IPython.display import display, HTML
 
     # set cientific notation for pandas
     pd.set_option('display.float_format', '{:,.3f}'.format)
@@ -23,11 +22,20 @@ def initial_settings():
     # set default plt font size
     plt.rcParams['font.size'] = 24
 
+    # check if code is running on a notebook kernel
+    try:
+        from IPython import get_ipython
+        from IPython.display import display, HTML
+        in_notebook = getattr(get_ipython(), 'kernel', None) is not None
+    except ImportError:
+        in_notebook = False
+
     # set cell size to be expanded
-    display( HTML( '<style>.container { width:100% !important; }</style>') )
+    if in_notebook:
+        display( HTML( '<style>.container { width:100% !important; }</style>') )
 
     # set figures to seaborn style
     plt.style.use('ggplot')
 
 
-    return None
\ No newline at end of file
+    return None
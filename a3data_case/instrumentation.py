@@ -0,0 +1,468 @@
+'''
+Opt-in timing and memory instrumentation of the a3data_case functions.
+
+Functions of data_description, data_extraction and eda wrap their steps in
+stage( name, rows, column ) blocks. While instrumentation is disabled (the default),
+stage returns a shared do-nothing context manager, so the overhead is a global lookup.
+Once enabled, every stage sends a record with its wall time, CPU time, rows processed
+and (optionally) peak allocated bytes to a sink:
+
+    from a3data_case.instrumentation import MemoryCollector, instrumented
+
+    collector = MemoryCollector()
+    with instrumented( collector, track_memory = True ):
+        check_dataframe( df )
+    collector.to_dataframe()
+
+Work done on worker processes (n_jobs > 1) is only timed as a whole, by the stage
+that starts the workers: every process pool is started with disable_worker_instrumentation.
+'''
+
+# import required libraries
+import contextlib
+import threading
+
+
+# fields of every stage record
+RECORD_FIELDS = ['stage', 'column', 'rows', 'wall_seconds', 'cpu_seconds', 'peak_bytes', 'parent', 'depth']
+# sink that receives stage records (None -> instrumentation disabled)
+_SINK = None
+# check if peak allocated bytes are tracked with tracemalloc
+_TRACK_MEMORY = False
+# check if tracemalloc was started by enable_instrumentation
+_STARTED_TRACEMALLOC = False
+# stack of open stages of each thread
+_LOCAL = threading.local()
+# shared do-nothing context manager for disabled instrumentation
+_NULL_STAGE = contextlib.nullcontext()
+
+
+
+class MemoryCollector:
+    '''
+    Sink that keeps stage records in a list (see to_dataframe)
+    '''
+
+    def __init__( self ):
+
+        # collected records
+        self.records = []
+
+
+    def emit( self, record ):
+        '''
+        Keep a stage record
+
+        Args
+            record: a dictionary with stage measurements
+
+        Return
+            None: a None type object
+        '''
+
+        # save record
+        self.records.append( record )
+
+
+        return None
+
+
+    def clear( self ):
+        '''
+        Remove every collected record
+
+        Args
+            None
+
+        Return
+            None: a None type object
+        '''
+
+        # remove records
+        self.records = []
+
+
+        return None
+
+
+    def to_dataframe( self ):
+        '''
+        Get collected records as a dataframe (one row per stage, in the order stages finished)
+
+        Args
+            None
+
+        Return
+            df_records: a pandas dataframe with the columns of the stage records
+        '''
+
+        # import required libraries
+        import pandas as pd
+
+
+        return pd.DataFrame( self.records, columns = RECORD_FIELDS )
+
+
+
+class JSONLinesSink:
+    '''
+    Sink that appends one JSON object per stage to a file
+
+    Args
+        filepath: path of the JSON-lines file
+        mode: 'a' to append to an existing file or 'w' to overwrite it
+    '''
+
+    def __init__( self, filepath, mode = 'a' ):
+
+        # sink parameters
+        self.filepath = filepath
+        self.mode = mode
+        # file is opened on the first record
+        self._file = None
+        self._lock = threading.Lock()
+
+
+    def emit( self, record ):
+        '''
+        Write a stage record as a JSON line
+
+        Args
+            record: a dictionary with stage measurements
+
+        Return
+            None: a None type object
+        '''
+
+        # import required libraries
+        import json
+
+        # records may come from several threads
+        with self._lock:
+            # open file on the first record
+            if self._file is None:
+                self._file = open( self.filepath, self.mode, encoding = 'utf-8' )
+
+            # write record
+            self._file.write( json.dumps( record, ensure_ascii = False, default = str ) + '\n' )
+            self._file.flush()
+
+
+        return None
+
+
+    def close( self ):
+        '''
+        Close the JSON-lines file (it is opened again on the next record)
+
+        Args
+            None
+
+        Return
+            None: a None type object
+        '''
+
+        # close file
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+        return None
+
+
+
+class LoggingSink:
+    '''
+    Sink that sends one message per stage to the standard logging module.
+    The full record is attached to the log record as record.stage_record.
+
+    Args
+        logger: a logging.Logger object or the name of a logger
+        level: logging level of the messages
+    '''
+
+    def __init__( self, logger = 'a3data_case', level = 20 ):
+
+        # import required libraries
+        import logging
+
+        # sink parameters
+        self.logger = logging.getLogger( logger ) if isinstance( logger, str ) else logger
+        self.level = level
+
+
+    def emit( self, record ):
+        '''
+        Log a stage record
+
+        Args
+            record: a dictionary with stage measurements
+
+        Return
+            None: a None type object
+        '''
+
+        # format message
+        column = '' if record['column'] is None else f" [{record['column']}]"
+        rows = '' if record['rows'] is None else f" {record['rows']:,} rows"
+        memory = '' if record['peak_bytes'] is None else f", peak {record['peak_bytes'] / 10**6:,.2f} MB"
+
+        # log message
+        self.logger.log( self.level, f"{record['stage']}{column}:{rows} in {record['wall_seconds']:.4f} s "
+                                     f"(cpu {record['cpu_seconds']:.4f} s{memory})",
+                         extra = {'stage_record': record} )
+
+
+        return None
+
+
+
+class _Stage:
+    '''
+    Context manager that measures a single stage and sends its record to the sink
+
+    Args
+        name: name of the stage
+        rows: number of rows processed on the stage
+        column: column processed on the stage (None for whole-dataframe stages)
+    '''
+
+    def __init__( self, name, rows, column ):
+
+        # stage parameters
+        self.name = name
+        self.rows = rows
+        self.column = column
+        # highest absolute traced memory of finished child stages
+        self.child_peak = 0
+
+
+    def __enter__( self ):
+
+        # import required libraries
+        import time
+        import tracemalloc
+
+        # get stack of open stages of this thread
+        stack = getattr( _LOCAL, 'stack', None )
+        if stack is None:
+            stack = _LOCAL.stack = []
+        self.parent = stack[-1] if stack else None
+
+        # start memory tracking of the stage
+        self.track_memory = _TRACK_MEMORY and tracemalloc.is_tracing()
+        if self.track_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            # keep the peak reached so far by the parent stage before resetting it
+            if self.parent is not None:
+                self.parent.child_peak = max( self.parent.child_peak, peak )
+            # python < 3.9 has no reset_peak -> peaks are measured since tracking started
+            if hasattr( tracemalloc, 'reset_peak' ):
+                tracemalloc.reset_peak()
+            self.start_memory = current
+
+        # start timers
+        stack.append( self )
+        self.start_cpu = time.process_time()
+        self.start_wall = time.perf_counter()
+
+
+        return self
+
+
+    def __exit__( self, exc_type, exc_value, traceback ):
+
+        # import required libraries
+        import time
+        import tracemalloc
+
+        # stop timers
+        wall_seconds = time.perf_counter() - self.start_wall
+        cpu_seconds = time.process_time() - self.start_cpu
+        _LOCAL.stack.pop()
+
+        # get peak allocated bytes above the memory in use when the stage started
+        peak_bytes = None
+        if self.track_memory and tracemalloc.is_tracing():
+            peak = max( tracemalloc.get_traced_memory()[1], self.child_peak )
+            peak_bytes = max( peak - self.start_memory, 0 )
+            # parent stage keeps measuring its own peak
+            if self.parent is not None:
+                self.parent.child_peak = max( self.parent.child_peak, peak )
+
+        # send record to sink (sink may have been disabled meanwhile)
+        sink = _SINK
+        if sink is not None:
+            record = {'stage': self.name,
+                      'column': self.column,
+                      'rows': self.rows,
+                      'wall_seconds': wall_seconds,
+                      'cpu_seconds': cpu_seconds,
+                      'peak_bytes': peak_bytes,
+                      'parent': None if self.parent is None else self.parent.name,
+                      'depth': len( _LOCAL.stack ) }
+            getattr( sink, 'emit', sink )( record )
+
+
+        return False
+
+
+
+def stage( name, rows = None, column = None ):
+    '''
+    Measure a block of code as a named stage:
+
+        with stage( 'downcast_dataframe.plan', rows = len( df ) ):
+            ...
+
+    Args
+        name: name of the stage (dotted, starting with the function name)
+        rows: number of rows processed on the stage
+        column: column processed on the stage (None for whole-dataframe stages)
+
+    Return
+        context_manager: a do-nothing context manager when instrumentation is disabled
+    '''
+
+    # instrumentation disabled -> nothing to measure
+    if _SINK is None:
+        return _NULL_STAGE
+
+
+    return _Stage( name, rows, column )
+
+
+
+def is_instrumentation_enabled():
+    '''
+    Check if stages are being measured
+
+    Args
+        None
+
+    Return
+        enabled: a boolean
+    '''
+
+
+    return _SINK is not None
+
+
+
+def enable_instrumentation( sink, track_memory = False ):
+    '''
+    Start measuring stages and sending their records to a sink
+
+    Args
+        sink: a MemoryCollector, JSONLinesSink or LoggingSink object
+            (or any object with an emit( record ) method, or a function of the record)
+        track_memory: a boolean to check if peak allocated bytes are measured with tracemalloc.
+            Tracing allocations slows python code down, so it is off by default.
+
+    Return
+        None: a None type object
+    '''
+
+    # import required libraries
+    import tracemalloc
+
+    global _SINK, _TRACK_MEMORY, _STARTED_TRACEMALLOC
+
+    # start tracing allocations if needed
+    if track_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _STARTED_TRACEMALLOC = True
+
+    # set sink
+    _TRACK_MEMORY = track_memory
+    _SINK = sink
+
+
+    return None
+
+
+
+def disable_instrumentation():
+    '''
+    Stop measuring stages (tracemalloc is stopped if enable_instrumentation started it)
+
+    Args
+        None
+
+    Return
+        None: a None type object
+    '''
+
+    # import required libraries
+    import tracemalloc
+
+    global _SINK, _TRACK_MEMORY, _STARTED_TRACEMALLOC
+
+    # remove sink
+    _SINK = None
+    _TRACK_MEMORY = False
+
+    # stop tracing allocations
+    if _STARTED_TRACEMALLOC:
+        tracemalloc.stop()
+        _STARTED_TRACEMALLOC = False
+
+
+    return None
+
+
+
+def disable_worker_instrumentation():
+    '''
+    Stop measuring stages on a worker process (initializer of every process pool).
+    Forked workers inherit the sink of the parent process, so their records would be
+    written to the parent's file or kept on a copy of its collector that is never read.
+
+    Args
+        None
+
+    Return
+        None: a None type object
+    '''
+
+    # remove sink (and stop tracemalloc if the parent process started it)
+    disable_instrumentation()
+
+    # forget stages that were open on the parent process when the worker was forked
+    _LOCAL.stack = []
+
+
+    return None
+
+
+
+@contextlib.contextmanager
+def instrumented( sink, track_memory = False ):
+    '''
+    Measure stages only inside a with block, then restore the previous settings
+
+    Args
+        sink: a sink object (see enable_instrumentation)
+        track_memory: a boolean to check if peak allocated bytes are measured
+
+    Return
+        sink: the given sink
+    '''
+
+    global _SINK, _TRACK_MEMORY
+
+    # save previous settings
+    previous_sink, previous_track_memory = _SINK, _TRACK_MEMORY
+
+    # start measuring
+    enable_instrumentation( sink, track_memory = track_memory )
+    try:
+        yield sink
+    # restore previous settings
+    finally:
+        if previous_sink is None:
+            disable_instrumentation()
+        else:
+            _SINK, _TRACK_MEMORY = previous_sink, previous_track_memory
@@ -0,0 +1,368 @@
+'''
+Column-parallel execution shared by the profiling functions (n_jobs= and backend= options).
+
+Dataframes are split into groups of columns that run on a thread pool (numpy and pandas
+release the GIL on most numerical work) or on a process pool. On the process pool,
+numpy-typed columns (numbers, booleans, datetimes) and float blocks are placed once on
+shared memory and each worker copies its part from it, while object and extension columns
+(strings, categories, nullable types) are pickled to the workers. Results always come
+back in the original column order.
+'''
+
+
+
+def resolve_n_jobs( n_jobs ):
+    '''
+    Get the number of workers from an n_jobs option
+
+    Args
+        n_jobs: None or 1 for a single worker (no pool), -1 for all cores
+            or -k for all cores but k - 1
+
+    Return
+        n_workers: an integer with the number of workers (at least 1)
+    '''
+
+    # import required libraries
+    import os
+
+    # single worker
+    if n_jobs is None:
+        return 1
+
+    # count cores backwards from all cores
+    if n_jobs < 0:
+        n_jobs = ( os.cpu_count() or 1 ) + 1 + n_jobs
+
+
+    return max( int( n_jobs ), 1 )
+
+
+
+def _check_backend( backend ):
+    '''
+    Check the backend option
+
+    Args
+        backend: 'threads' or 'processes'
+
+    Return
+        None: a None type object
+    '''
+
+    # check backend
+    if backend not in ('threads', 'processes'):
+        raise ValueError( f"backend must be 'threads' or 'processes', got {backend!r}" )
+
+
+    return None
+
+
+
+def _create_executor( n_workers, backend ):
+    '''
+    Create a thread or process pool
+
+    Args
+        n_workers: number of workers
+        backend: 'threads' or 'processes'
+
+    Return
+        executor: a concurrent.futures executor
+    '''
+
+    # import required libraries
+    from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+    from a3data_case.instrumentation import disable_worker_instrumentation
+
+    # threads share the dataframe without copies
+    if backend == 'threads':
+        return ThreadPoolExecutor( max_workers = n_workers )
+
+
+    # worker processes don't send stage records (the pool is timed as a whole)
+    return ProcessPoolExecutor( max_workers = n_workers, initializer = disable_worker_instrumentation )
+
+
+
+def _run_column_group( function, dataframe, kwargs ):
+    '''
+    Run a function on a group of columns (on a worker)
+
+    Args
+        function: a function of a dataframe that returns one item per column
+        dataframe: a pandas dataframe with the columns of the group
+        kwargs: dictionary with other keyword arguments of the function
+
+    Return
+        items: list with one item per column of the group
+    '''
+
+    # run function
+    items = list( function( dataframe, **kwargs ) )
+
+    # check that there is one item per column
+    if len( items ) != dataframe.shape[1]:
+        raise ValueError( f'{function.__name__} returned {len( items )} items for {dataframe.shape[1]} columns' )
+
+
+    return items
+
+
+
+def _share_columns( dataframe, positions ):
+    '''
+    Copy some numpy-typed columns of a dataframe to one shared memory block
+
+    Args
+        dataframe: a pandas dataframe
+        positions: list with the positions of the columns to share
+
+    Return
+        shared: the SharedMemory object (to be closed and unlinked by the caller)
+        offsets: dictionary with the (byte offset, dtype string) of every shared column position
+    '''
+
+    # import required libraries
+    import numpy as np
+    from multiprocessing import shared_memory
+
+    # columns start on 8-byte boundaries
+    offsets, size = {}, 0
+    for position in positions:
+        dtype = dataframe.dtypes.iloc[ position ]
+        offsets[ position ] = ( size, dtype.str )
+        size += -( -len( dataframe ) * dtype.itemsize // 8 ) * 8
+
+    # copy columns to the shared block
+    shared = shared_memory.SharedMemory( create = True, size = max( size, 1 ) )
+    for position, ( offset, dtype ) in offsets.items():
+        np.ndarray( len( dataframe ), dtype = dtype, buffer = shared.buf, offset = offset )[:] = dataframe.iloc[ :, position ].to_numpy()
+
+
+    return shared, offsets
+
+
+
+def _run_shared_column_group( function, shared_name, offsets, others, columns, index, kwargs ):
+    '''
+    Rebuild a group of columns from shared memory and run a function on it (on a worker process)
+
+    Args
+        function: a function of a dataframe that returns one item per column
+        shared_name: name of the shared memory block
+        offsets: list with the (byte offset, dtype string) of every column of the group, or None for pickled columns
+        others: a pandas dataframe with the pickled columns of the group (in group order)
+        columns: labels of the columns of the group
+        index: index of the dataframe
+        kwargs: dictionary with other keyword arguments of the function
+
+    Return
+        items: list with one item per column of the group
+    '''
+
+    # import required libraries
+    import numpy as np
+    import pandas as pd
+    from multiprocessing import shared_memory
+
+    # attach to the shared block
+    shared = shared_memory.SharedMemory( name = shared_name )
+    try:
+        # copy shared columns out of the block and take pickled columns in order
+        data, other_position = {}, 0
+        for position, offset in enumerate( offsets ):
+            if offset is None:
+                data[ position ] = others.iloc[ :, other_position ].array
+                other_position += 1
+            else:
+                data[ position ] = np.ndarray( len( index ), dtype = offset[1], buffer = shared.buf, offset = offset[0] ).copy()
+    finally:
+        shared.close()
+
+    # rebuild group dataframe with the original labels
+    dataframe = pd.DataFrame( data, index = index )
+    dataframe.columns = columns
+
+
+    return _run_column_group( function, dataframe, kwargs )
+
+
+
+def map_column_groups( function, dataframe, n_jobs = None, backend = 'threads', **kwargs ):
+    '''
+    Run a per-column function over groups of columns of a dataframe in parallel.
+    Columns are dealt to a few groups per worker (every n-th column to the same group),
+    so slow columns of a kind are spread over workers.
+
+    Args
+        function: a function of a dataframe (and kwargs) that returns a list with one item per column.
+            It must be defined at module level on the 'processes' backend.
+        dataframe: a pandas dataframe
+        n_jobs: number of workers (see resolve_n_jobs). None or 1 runs on the current thread.
+        backend: 'threads' or 'processes'. Processes get numpy-typed columns through shared memory,
+            but object and extension columns (strings, categories, nullable types) are pickled,
+            i.e. copied to every worker.
+        kwargs: other keyword arguments of the function
+
+    Return
+        items: list with one item per column, in the original column order
+    '''
+
+    # import required libraries
+    import numpy as np
+    from a3data_case.instrumentation import stage
+
+    # check options
+    _check_backend( backend )
+    n_workers = min( resolve_n_jobs( n_jobs ), dataframe.shape[1] )
+
+    # single worker -> run on the whole dataframe
+    if n_workers <= 1:
+        return _run_column_group( function, dataframe, kwargs )
+
+    # deal column positions to a few groups per worker
+    n_columns = dataframe.shape[1]
+    n_groups = min( n_columns, n_workers * 4 )
+    groups = [ list( range( index, n_columns, n_groups ) ) for index in range( n_groups ) ]
+
+    # numpy-typed columns can go to processes through shared memory
+    shared_positions = []
+    if backend == 'processes':
+        shared_positions = [ position for position, dtype in enumerate( dataframe.dtypes )
+                             if isinstance( dtype, np.dtype ) and dtype.kind in 'biufcmM' ]
+
+    # run groups on the pool
+    with stage( f'map_column_groups.{function.__name__}', rows = len( dataframe ) ), \
+         _create_executor( n_workers, backend ) as executor:
+
+        # threads read the dataframe directly and processes without numpy-typed columns get pickled groups
+        if not shared_positions:
+            group_items = list( executor.map( _run_column_group,
+                                              [ function ] * n_groups,
+                                              [ dataframe.iloc[ :, group ] for group in groups ],
+                                              [ kwargs ] * n_groups ) )
+
+        # processes copy numpy-typed columns from a shared block
+        else:
+            shared, offsets = _share_columns( dataframe, shared_positions )
+            try:
+                group_offsets = [ [ offsets.get( position ) for position in group ] for group in groups ]
+                others = [ dataframe.iloc[ :, [ position for position in group if position not in offsets ] ] for group in groups ]
+                group_items = list( executor.map( _run_shared_column_group,
+                                                  [ function ] * n_groups,
+                                                  [ shared.name ] * n_groups,
+                                                  group_offsets,
+                                                  others,
+                                                  [ dataframe.columns[ group ] for group in groups ],
+                                                  [ dataframe.index ] * n_groups,
+                                                  [ kwargs ] * n_groups ) )
+            finally:
+                shared.close()
+                shared.unlink()
+
+    # put items back on the original column order
+    items = [ None ] * n_columns
+    for group, group_item in zip( groups, group_items ):
+        for position, item in zip( group, group_item ):
+            items[ position ] = item
+
+
+    return items
+
+
+
+def _run_block_rows( function, shared_name, shape, dtype, start, stop ):
+    '''
+    Run a function on some rows of a float block stored on shared memory (on a worker process)
+
+    Args
+        function: a function of a 2D numpy array that returns a dictionary of arrays (one value per row)
+        shared_name: name of the shared memory block
+        shape: shape of the float block
+        dtype: dtype of the float block
+        start: first row of the worker
+        stop: row after the last row of the worker
+
+    Return
+        result: the dictionary returned by the function
+    '''
+
+    # import required libraries
+    import numpy as np
+    from multiprocessing import shared_memory
+
+    # attach to the shared block without copying it
+    shared = shared_memory.SharedMemory( name = shared_name )
+    try:
+        block = np.ndarray( shape, dtype = dtype, buffer = shared.buf )
+        # copy results so nothing points to the shared block once it is closed
+        result = { key: np.array( value ) for key, value in function( block[ start:stop ] ).items() }
+        del block
+    finally:
+        shared.close()
+
+
+    return result
+
+
+
+def map_block_rows( function, block, n_jobs = None, backend = 'threads' ):
+    '''
+    Run a per-row function over contiguous groups of rows of a 2D float block in parallel
+    (e.g. one row per numerical feature). On the 'processes' backend, the block is copied
+    once to shared memory and workers read their rows from it.
+
+    Args
+        function: a function of a 2D numpy array that returns a dictionary of arrays with one value per row.
+            It must be defined at module level on the 'processes' backend.
+        block: a 2D numpy array
+        n_jobs: number of workers (see resolve_n_jobs). None or 1 runs on the current thread.
+        backend: 'threads' or 'processes'
+
+    Return
+        result: dictionary with the arrays of every group of rows concatenated in the original row order
+    '''
+
+    # import required libraries
+    import numpy as np
+    from multiprocessing import shared_memory
+    from a3data_case.instrumentation import stage
+
+    # check options
+    _check_backend( backend )
+    n_workers = min( resolve_n_jobs( n_jobs ), block.shape[0] )
+
+    # single worker -> run on the whole block
+    if n_workers <= 1:
+        return function( block )
+
+    # split rows in one contiguous group per worker (rows have the same cost)
+    bounds = np.linspace( 0, block.shape[0], n_workers + 1 ).astype( 'int64' )
+
+    with stage( f'map_block_rows.{function.__name__}', rows = block.shape[1] ), \
+         _create_executor( n_workers, backend ) as executor:
+
+        # threads read the block directly
+        if backend == 'threads':
+            results = list( executor.map( function, [ block[ start:stop ] for start, stop in zip( bounds[:-1], bounds[1:] ) ] ) )
+
+        # processes attach to a shared copy of the block
+        else:
+            shared = shared_memory.SharedMemory( create = True, size = max( block.nbytes, 1 ) )
+            try:
+                shared_block = np.ndarray( block.shape, dtype = block.dtype, buffer = shared.buf )
+                shared_block[:] = block
+                results = list( executor.map( _run_block_rows,
+                                              [ function ] * n_workers,
+                                              [ shared.name ] * n_workers,
+                                              [ block.shape ] * n_workers,
+                                              [ block.dtype.str ] * n_workers,
+                                              bounds[:-1].tolist(), bounds[1:].tolist() ) )
+                del shared_block
+            finally:
+                shared.close()
+                shared.unlink()
+
+
+    return { key: np.concatenate( [ result[ key ] for result in results ] ) for key in results[0] }
@@ -0,0 +1,516 @@
+class MomentSketch:
+    '''
+    Mergeable sufficient statistics for a group of numerical columns.
+    It keeps counts, missing value counts, min/max and the mean plus the sums of
+    central powers (2nd to 4th) of every column. Chunks are combined with the
+    pairwise update formulas of Welford and Pébay, so the result does not depend
+    on how the data was split.
+
+    Args
+        n_columns: number of columns to keep statistics for
+    '''
+
+    def __init__( self, n_columns ):
+
+        # import required libraries
+        import numpy as np
+
+        # number of valid and missing values
+        self.count = np.zeros( n_columns, dtype = 'float64' )
+        self.na_count = np.zeros( n_columns, dtype = 'float64' )
+        # extreme values
+        self.min = np.full( n_columns, np.nan )
+        self.max = np.full( n_columns, np.nan )
+        # mean and sums of central powers
+        self.mean = np.zeros( n_columns, dtype = 'float64' )
+        self.m2 = np.zeros( n_columns, dtype = 'float64' )
+        self.m3 = np.zeros( n_columns, dtype = 'float64' )
+        self.m4 = np.zeros( n_columns, dtype = 'float64' )
+
+
+    def update( self, block ):
+        '''
+        Add a chunk of data to the sketch
+
+        Args
+            block: a 2D float numpy array with one row per column of the sketch
+
+        Return
+            self: the updated sketch
+        '''
+
+        # import required libraries
+        import numpy as np
+
+        # create a sketch for the chunk alone
+        chunk = MomentSketch( block.shape[0] )
+
+        # get missing values mask and number of valid values
+        na_mask = np.isnan( block )
+        chunk.na_count = na_mask.sum( axis = 1 ).astype( 'float64' )
+        chunk.count = block.shape[1] - chunk.na_count
+
+        with np.errstate( invalid = 'ignore', divide = 'ignore' ):
+            # zero out missing values so they don't change sums
+            values = np.where( na_mask, 0, block )
+            # calculate chunk mean (0 for columns without valid values)
+            chunk.mean = np.where( chunk.count > 0, values.sum( axis = 1 ) / chunk.count, 0 )
+            # calculate chunk sums of central powers
+            deviations = np.where( na_mask, 0, values - chunk.mean[:, None] )
+            deviations2 = deviations**2
+            chunk.m2 = deviations2.sum( axis = 1 )
+            chunk.m3 = ( deviations2 * deviations ).sum( axis = 1 )
+            chunk.m4 = ( deviations2**2 ).sum( axis = 1 )
+
+        # calculate chunk extreme values (nan for columns without valid values)
+        chunk.min = np.where( chunk.count > 0, np.where( na_mask, np.inf, block ).min( axis = 1, initial = np.inf ), np.nan )
+        chunk.max = np.where( chunk.count > 0, np.where( na_mask, -np.inf, block ).max( axis = 1, initial = -np.inf ), np.nan )
+
+
+        return self.merge( chunk )
+
+
+    def merge( self, other ):
+        '''
+        Combine the statistics of another sketch into this sketch
+
+        Args
+            other: a MomentSketch object with the same number of columns
+
+        Return
+            self: the updated sketch
+        '''
+
+        # import required libraries
+        import numpy as np
+
+        # get counts of both sketches
+        n_a, n_b = self.count, other.count
+        n = n_a + n_b
+
+        with np.errstate( invalid = 'ignore', divide = 'ignore' ):
+            # difference between means
+            delta = other.mean - self.mean
+            # combine mean
+            mean = np.where( n > 0, self.mean + delta * n_b / n, 0 )
+            # combine sums of central powers
+            m2 = self.m2 + other.m2 + delta**2 * n_a * n_b / n
+            m3 = self.m3 + other.m3 + delta**3 * n_a * n_b * (n_a - n_b) / n**2 \
+                 + 3 * delta * (n_a * other.m2 - n_b * self.m2) / n
+            m4 = self.m4 + other.m4 + delta**4 * n_a * n_b * (n_a**2 - n_a * n_b + n_b**2) / n**3 \
+                 + 6 * delta**2 * (n_a**2 * other.m2 + n_b**2 * self.m2) / n**2 \
+                 + 4 * delta * (n_a * other.m3 - n_b * self.m3) / n
+
+        # columns without valid values keep zeroed sums
+        self.m2, self.m3, self.m4 = [ np.where( n > 0, m, 0 ) for m in (m2, m3, m4) ]
+        self.mean = mean
+        # combine extreme values
+        self.min = np.fmin( self.min, other.min )
+        self.max = np.fmax( self.max, other.max )
+        # combine counts
+        self.count = n
+        self.na_count = self.na_count + other.na_count
+
+
+        return self
+
+
+    def to_dict( self ):
+        '''
+        Get the statistics of the sketch as numpy arrays (see from_dict)
+
+        Args
+            None
+
+        Return
+            state: a dictionary with one numpy array per statistic
+        '''
+
+
+        return { name: getattr( self, name ) for name in ('count', 'na_count', 'min', 'max', 'mean', 'm2', 'm3', 'm4') }
+
+
+    @classmethod
+    def from_dict( cls, state ):
+        '''
+        Create a sketch from statistics saved with to_dict
+
+        Args
+            state: a dictionary with one numpy array per statistic
+
+        Return
+            sketch: a MomentSketch object
+        '''
+
+        # import required libraries
+        import numpy as np
+
+        # create empty sketch and set its statistics
+        sketch = cls( len( state['count'] ) )
+        for name in ('count', 'na_count', 'min', 'max', 'mean', 'm2', 'm3', 'm4'):
+            setattr( sketch, name, np.asarray( state[ name ], dtype = 'float64' ) )
+
+
+        return sketch
+
+
+
+class QuantileSketch:
+    '''
+    Mergeable, bounded-memory quantile sketch for a single numerical column.
+    Values are kept on levels of at most sketch_size items: when a level is full,
+    it is sorted and every other item (random offset) is promoted to the next level
+    with twice the weight. Quantiles are exact while fewer than sketch_size values
+    were seen, and memory grows only with log(number of values / sketch_size).
+
+    Args
+        sketch_size: maximum number of items kept on each level
+        seed: seed for the random offsets used on compactions
+    '''
+
+    def __init__( self, sketch_size = 2048, seed = None ):
+
+        # import required libraries
+        import numpy as np
+
+        # sketch parameters
+        self.sketch_size = sketch_size
+        self.random_state = np.random.default_rng( seed )
+        # items of each level -> items on level h have weight 2**h
+        self.levels = [ np.empty( 0, dtype = 'float64' ) ]
+        # number of values seen
+        self.count = 0
+
+
+    def update( self, values ):
+        '''
+        Add values to the sketch (missing values are ignored)
+
+        Args
+            values: a numpy array with values
+
+        Return
+            self: the updated sketch
+        '''
+
+        # import required libraries
+        import numpy as np
+
+        # keep only valid values
+        values = np.asarray( values, dtype = 'float64' )
+        values = values[ ~np.isnan( values ) ]
+
+        # add values to the first level
+        self.levels[0] = np.concatenate( [ self.levels[0], values ] )
+        self.count += len( values )
+        # keep levels bounded
+        self._compress()
+
+
+        return self
+
+
+    def merge( self, other ):
+        '''
+        Combine the items of another sketch into this sketch
+
+        Args
+            other: a QuantileSketch object
+
+        Return
+            self: the updated sketch
+        '''
+
+        # import required libraries
+        import numpy as np
+
+        # create missing levels
+        while len( self.levels ) < len( other.levels ):
+            self.levels.append( np.empty( 0, dtype = 'float64' ) )
+
+        # concatenate items of the same level
+        for level, items in enumerate( other.levels ):
+            self.levels[ level ] = np.concatenate( [ self.levels[ level ], items ] )
+        self.count += other.count
+        # keep levels bounded
+        self._compress()
+
+
+        return self
+
+
+    def _compress( self ):
+        '''
+        Compact every level with more than sketch_size items
+
+        Args
+            None
+
+        Return
+            None: a None type object
+        '''
+
+        # import required libraries
+        import numpy as np
+
+        # iterate over levels (a new level may be created along the way)
+        level = 0
+        while level < len( self.levels ):
+
+            # check if level is full
+            items = self.levels[ level ]
+            if len( items ) > self.sketch_size:
+
+                # sort items and keep one item back if the number of items is odd
+                items = np.sort( items )
+                kept = items[ len( items ) - len( items ) % 2: ]
+                items = items[ : len( items ) - len( items ) % 2 ]
+
+                # create next level if needed
+                if level + 1 == len( self.levels ):
+                    self.levels.append( np.empty( 0, dtype = 'float64' ) )
+
+                # promote every other item to the next level
+                offset = self.random_state.integers( 2 )
+                self.levels[ level + 1 ] = np.concatenate( [ self.levels[ level + 1 ], items[ offset::2 ] ] )
+                self.levels[ level ] = kept
+
+            level += 1
+
+
+        return None
+
+
+    def quantile( self, q ):
+        '''
+        Estimate quantiles of the values seen so far.
+        Interpolation is linear, as with np.percentile, so results are exact
+        while no compaction happened.
+
+        Args
+            q: a float or a sequence of floats between 0 and 1
+
+        Return
+            quantiles: a numpy array with the estimated quantiles
+        '''
+
+        # import required libraries
+        import numpy as np
+
+        # no values -> no quantiles
+        q = np.atleast_1d( np.asarray( q, dtype = 'float64' ) )
+        if self.count == 0:
+            return np.full( q.shape, np.nan )
+
+        # gather items and their weights
+        items = np.concatenate( self.levels )
+        weights = np.concatenate( [ np.full( len( level_items ), 2.0**level )
+                                    for level, level_items in enumerate( self.levels ) ] )
+
+        # sort items
+        order = np.argsort( items, kind = 'stable' )
+        items, weights = items[ order ], weights[ order ]
+
+        # get the center rank each item represents
+        cumulative = np.cumsum( weights )
+        centers = cumulative - (weights + 1) / 2
+
+        # interpolate the target ranks
+        targets = q * ( cumulative[-1] - 1 )
+
+
+        return np.interp( targets, centers, items )
+
+
+    def to_dict( self ):
+        '''
+        Get the items and parameters of the sketch (see from_dict).
+        Items are numpy arrays and the other values can be saved as JSON.
+
+        Args
+            None
+
+        Return
+            state: a dictionary with sketch_size, count, the state of the random generator
+                and the list of items of each level
+        '''
+
+
+        return {'sketch_size': self.sketch_size,
+                'count': self.count,
+                'random_state': self.random_state.bit_generator.state,
+                'levels': list( self.levels ) }
+
+
+    @classmethod
+    def from_dict( cls, state ):
+        '''
+        Create a sketch from items and parameters saved with to_dict
+
+        Args
+            state: a dictionary as returned by to_dict
+
+        Return
+            sketch: a QuantileSketch object
+        '''
+
+        # import required libraries
+        import numpy as np
+
+        # create empty sketch
+        sketch = cls( state['sketch_size'] )
+        # restore random generator so later compactions are reproducible
+        sketch.random_state.bit_generator.state = state['random_state']
+        # restore items
+        sketch.levels = [ np.asarray( items, dtype = 'float64' ) for items in state['levels'] ]
+        sketch.count = int( state['count'] )
+
+
+        return sketch
+
+
+
+class HyperLogLog:
+    '''
+    Mergeable HyperLogLog sketch to estimate the number of distinct values.
+    Values are hashed with pandas' deterministic 64-bit hashing, so sketches can be
+    merged across processes and sessions. The sketch keeps 2**precision one-byte
+    registers, whatever the number of values. Building it is cheaper than an exact
+    count only when hashing is cheap and there are millions of distinct values (see
+    data_description._approx_unique).
+
+    Args
+        precision: number of bits used to choose a register (4 to 18).
+            The relative standard error is about 1.04 / sqrt(2**precision).
+    '''
+
+    def __init__( self, precision = 14 ):
+
+        # import required libraries
+        import numpy as np
+
+        # check precision
+        if not 4 <= precision <= 18:
+            raise ValueError( f'precision must be between 4 and 18, got {precision}' )
+
+        # sketch parameters
+        self.precision = precision
+        self.registers = np.zeros( 2**precision, dtype = 'uint8' )
+
+
+    @property
+    def standard_error( self ):
+        '''
+        Relative standard error of the estimates of this sketch
+        '''
+
+
+        return 1.04 / len( self.registers ) ** 0.5
+
+
+    def update( self, values ):
+        '''
+        Add values to the sketch (missing values are ignored).
+        Every value is hashed with pandas' vectorized, deterministic 64-bit hashing
+        (no hash table of distinct values is built), so sketches built on different
+        processes can be merged. Hashing is cheap for numerical values; for strings
+        it costs about as much as an exact count of distinct values.
+
+        Args
+            values: a pandas series or a numpy array with values
+
+        Return
+            self: the updated sketch
+        '''
+
+        # import required libraries
+        import numpy  as np
+        import pandas as pd
+
+        # hash every value (categories are hashed once and taken by their codes) and drop missing values
+        values = pd.Series( values )
+        hashes = pd.util.hash_pandas_object( values, index = False, categorize = False ).to_numpy( dtype = 'uint64' )
+        if values.hasnans:
+            hashes = hashes[ values.notna().to_numpy() ]
+
+        # nothing to add
+        if len( hashes ) == 0:
+            return self
+
+        # first bits choose the register
+        index = ( hashes >> np.uint64( 64 - self.precision ) ).astype( 'int64' )
+        # remaining bits give the rank (position of the first 1 bit)
+        remaining = hashes << np.uint64( self.precision )
+
+        # get the bit length of the remaining bits from float exponents
+        # (each 32-bit half is exact as a float64, and frexp( 0 ) gives 0)
+        bit_length = np.frexp( ( remaining >> np.uint64( 32 ) ).astype( 'float64' ) )[1]
+        bit_length[ bit_length > 0 ] += 32
+        # the low half only matters when the high half is zero (rare)
+        zero_high = np.flatnonzero( bit_length == 0 )
+        bit_length[ zero_high ] = np.frexp( ( remaining[ zero_high ] & np.uint64( 0xffffffff ) ).astype( 'float64' ) )[1]
+        rank = np.minimum( 64 - bit_length + 1, 64 - self.precision + 1 )
+
+        # count (register, rank) pairs -> linear in the number of values (no sort)
+        width = 64 - self.precision + 2
+        present = np.bincount( index * width + rank, minlength = len( self.registers ) * width ).reshape( -1, width ) > 0
+        # get the largest rank seen by each register (rank 0 when the register got no value)
+        present[ :, 0 ] = True
+        ranks = ( width - 1 ) - np.argmax( present[ :, ::-1 ], axis = 1 )
+
+        # keep the largest rank of each register
+        self.registers = np.maximum( self.registers, ranks.astype( 'uint8' ) )
+
+
+        return self
+
+
+    def merge( self, other ):
+        '''
+        Combine the registers of another sketch into this sketch
+
+        Args
+            other: a HyperLogLog object with the same precision
+
+        Return
+            self: the updated sketch
+        '''
+
+        # import required libraries
+        import numpy as np
+
+        # combine registers
+        self.registers = np.maximum( self.registers, other.registers )
+
+
+        return self
+
+
+    def count( self ):
+        '''
+        Estimate the number of distinct values seen so far
+
+        Args
+            None
+
+        Return
+            estimate: a float with the estimated number of distinct values
+        '''
+
+        # import required libraries
+        import numpy as np
+
+        # number of registers and bias correction constant
+        m = len( self.registers )
+        alpha = 0.7213 / (1 + 1.079 / m)
+
+        # raw harmonic mean estimate
+        estimate = alpha * m**2 / np.sum( 2.0 ** -self.registers.astype( 'float64' ) )
+
+        # small range correction -> linear counting
+        empty_registers = np.count_nonzero( self.registers == 0 )
+        if estimate <= 2.5 * m and empty_registers > 0:
+            estimate = m * np.log( m / empty_registers )
+
+
+        return float( estimate )
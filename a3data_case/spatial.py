@@ -0,0 +1,308 @@
+# mean earth radius in km
+EARTH_RADIUS_KM = 6371.0088
+
+
+
+def haversine_distance( latitude_one, longitude_one, latitude_two, longitude_two ):
+    '''
+    Great-circle distance between coordinates in decimal degrees (numpy broadcasting rules apply)
+
+    Args
+        latitude_one: latitude(s) of the first point(s)
+        longitude_one: longitude(s) of the first point(s)
+        latitude_two: latitude(s) of the second point(s)
+        longitude_two: longitude(s) of the second point(s)
+
+    Return
+        distance: numpy array (or float) with distances in km
+    '''
+
+    # import required libraries
+    import numpy as np
+
+    # convert degrees to radians
+    phi_one, phi_two = np.radians( latitude_one ), np.radians( latitude_two )
+    delta_phi = phi_two - phi_one
+    delta_lambda = np.radians( np.asarray( longitude_two ) - np.asarray( longitude_one ) )
+
+    # haversine formula (clipped against floating point errors)
+    a = np.sin( delta_phi / 2 )**2 + np.cos( phi_one ) * np.cos( phi_two ) * np.sin( delta_lambda / 2 )**2
+
+
+    return 2 * EARTH_RADIUS_KM * np.arcsin( np.sqrt( np.clip( a, 0, 1 ) ) )
+
+
+
+class GridIndex:
+    '''
+    Uniform latitude/longitude grid index over cleaned coordinates (e.g. from parse_lat_long).
+    Points are sorted by cell once, so each non-empty cell is a contiguous range of points:
+    radius and k-nearest queries only compute distances to points of nearby cells, and
+    per-cell counts give hotspot densities and heat-map rasters without touching points again.
+    Missing and out of range coordinates are left out of the index.
+
+        grid = GridIndex( latitude, longitude, cell_size = 0.1 )
+        grid.density().nlargest( 10, 'count' )       # hotspots
+        grid.radius_query( -23.55, -46.63, 50 )       # occurrences within 50 km
+        grid.knn_query( -23.55, -46.63, k = 5 )
+
+    Args
+        latitude: array with latitudes in decimal degrees
+        longitude: array with longitudes in decimal degrees
+        cell_size: size of the cells in degrees
+    '''
+
+    def __init__( self, latitude, longitude, cell_size = 0.1 ):
+
+        # import required libraries
+        import numpy as np
+        from a3data_case.instrumentation import stage
+
+        # grid parameters
+        self.cell_size = float( cell_size )
+        self.n_rows = int( np.ceil( 180 / self.cell_size ) )
+        self.n_cols = int( np.ceil( 360 / self.cell_size ) )
+
+        with stage( 'GridIndex.build', rows = len( latitude ) ):
+            # get valid coordinates
+            latitude = np.asarray( latitude, dtype = 'float64' )
+            longitude = np.asarray( longitude, dtype = 'float64' )
+            with np.errstate( invalid = 'ignore' ):
+                valid = np.isfinite( latitude ) & np.isfinite( longitude ) & ( np.abs( latitude ) <= 90 ) & ( np.abs( longitude ) <= 180 )
+            point_ids = np.flatnonzero( valid )
+            latitude, longitude = latitude[ valid ], longitude[ valid ]
+
+            # get the cell of each point
+            rows, cols = self._cell_of( latitude, longitude )
+            cells = rows * self.n_cols + cols
+
+            # sort points by cell
+            order = np.argsort( cells, kind = 'stable' )
+            self.point_ids = point_ids[ order ]
+            self.latitude = latitude[ order ]
+            self.longitude = longitude[ order ]
+            self.n_input_points = len( valid )
+
+            # get the range of points of each non-empty cell
+            self.cells, self.starts, self.counts = np.unique( cells[ order ], return_index = True, return_counts = True )
+            self.cell_rows, self.cell_cols = np.divmod( self.cells, self.n_cols )
+
+
+    def _cell_of( self, latitude, longitude ):
+        '''
+        Get the grid row and column of coordinates
+
+        Args
+            latitude: numpy array with latitudes
+            longitude: numpy array with longitudes
+
+        Return
+            rows: int64 numpy array with grid rows (south to north)
+            cols: int64 numpy array with grid columns (west to east, 180 is the same as -180)
+        '''
+
+        # import required libraries
+        import numpy as np
+
+        # rows from the south pole
+        rows = np.floor( ( np.asarray( latitude ) + 90 ) / self.cell_size ).astype( 'int64' ).clip( 0, self.n_rows - 1 )
+        # columns from the antimeridian (longitudes wrap around, so 180 is on the first column)
+        cols = np.floor( ( ( np.asarray( longitude ) + 180 ) % 360 ) / self.cell_size ).astype( 'int64' ).clip( 0, self.n_cols - 1 )
+
+
+        return rows, cols
+
+
+    def _points_of_cells( self, mask ):
+        '''
+        Get the positions (on the sorted points) of every point of the chosen cells
+
+        Args
+            mask: boolean numpy array with one value per non-empty cell
+
+        Return
+            positions: int64 numpy array with point positions
+        '''
+
+        # import required libraries
+        import numpy as np
+
+        # get ranges of the chosen cells
+        starts, counts = self.starts[ mask ], self.counts[ mask ]
+
+        # expand ranges to positions without a python loop
+        offsets = starts - ( np.cumsum( counts ) - counts )
+
+
+        return np.repeat( offsets, counts ) + np.arange( counts.sum() )
+
+
+    def radius_query( self, latitude, longitude, radius_km ):
+        '''
+        Get every point within a distance of a coordinate.
+        Only points of the cells that may be within the distance are checked.
+
+        Args
+            latitude: latitude of the query point
+            longitude: longitude of the query point
+            radius_km: distance in km
+
+        Return
+            point_ids: int64 numpy array with the positions of the points on the input arrays (nearest first)
+            distances: numpy array with the distances in km
+        '''
+
+        # import required libraries
+        import numpy as np
+
+        # angular radius
+        delta = radius_km / EARTH_RADIUS_KM
+        delta_latitude = np.degrees( delta )
+
+        # candidate rows
+        row_low, _ = self._cell_of( max( latitude - delta_latitude, -90 ), longitude )
+        row_high, _ = self._cell_of( min( latitude + delta_latitude, 90 ), longitude )
+        mask = ( self.cell_rows >= row_low ) & ( self.cell_rows <= row_high )
+
+        # largest longitude difference of points within the radius (every longitude near the poles)
+        cos_latitude = np.cos( np.radians( latitude ) )
+        if latitude + delta_latitude < 90 and latitude - delta_latitude > -90 and np.sin( min( delta, np.pi / 2 ) ) < cos_latitude:
+            delta_longitude = np.degrees( np.arcsin( np.sin( delta ) / cos_latitude ) )
+
+            # candidate columns (the range may wrap around the antimeridian)
+            _, col_low = self._cell_of( latitude, longitude - delta_longitude )
+            _, col_high = self._cell_of( latitude, longitude + delta_longitude )
+            if col_low <= col_high:
+                mask &= ( self.cell_cols >= col_low ) & ( self.cell_cols <= col_high )
+            else:
+                mask &= ( self.cell_cols >= col_low ) | ( self.cell_cols <= col_high )
+
+        # calculate distances to candidate points
+        positions = self._points_of_cells( mask )
+        distances = haversine_distance( latitude, longitude, self.latitude[ positions ], self.longitude[ positions ] )
+
+        # keep points within the radius, nearest first
+        within = distances <= radius_km
+        positions, distances = positions[ within ], distances[ within ]
+        order = np.argsort( distances, kind = 'stable' )
+
+
+        return self.point_ids[ positions[ order ] ], distances[ order ]
+
+
+    def knn_query( self, latitude, longitude, k = 5 ):
+        '''
+        Get the k nearest points of a coordinate.
+        The search radius starts at one cell and doubles until k points are found.
+
+        Args
+            latitude: latitude of the query point
+            longitude: longitude of the query point
+            k: number of points
+
+        Return
+            point_ids: int64 numpy array with the positions of the points on the input arrays (nearest first)
+            distances: numpy array with the distances in km
+        '''
+
+        # import required libraries
+        import numpy as np
+
+        # start with the size of a cell
+        radius_km = self.cell_size * np.radians( 1 ) * EARTH_RADIUS_KM
+
+        # grow radius until k points are found (or the whole earth is covered)
+        while True:
+            point_ids, distances = self.radius_query( latitude, longitude, radius_km )
+            if len( point_ids ) >= k or radius_km >= np.pi * EARTH_RADIUS_KM:
+                break
+            radius_km *= 2
+
+
+        return point_ids[ :k ], distances[ :k ]
+
+
+    def density( self ):
+        '''
+        Number of points of every non-empty cell (sort by count to find hotspots)
+
+        Args
+            None
+
+        Return
+            df_density: a pandas dataframe with cell id, cell center, count, cell area in km²
+                and density (points per km²)
+        '''
+
+        # import required libraries
+        import numpy  as np
+        import pandas as pd
+
+        # get cell bounds
+        latitude_low = self.cell_rows * self.cell_size - 90
+        latitude_high = np.minimum( latitude_low + self.cell_size, 90 )
+        longitude_low = self.cell_cols * self.cell_size - 180
+
+        # area of each cell on the sphere
+        area = EARTH_RADIUS_KM**2 * np.radians( self.cell_size ) \
+               * ( np.sin( np.radians( latitude_high ) ) - np.sin( np.radians( latitude_low ) ) )
+
+
+        return pd.DataFrame({'cell': self.cells,
+                             'latitude': ( latitude_low + latitude_high ) / 2,
+                             'longitude': longitude_low + self.cell_size / 2,
+                             'count': self.counts,
+                             'area_km2': area,
+                             'density_km2': self.counts / area })
+
+
+    def to_raster( self, bounds = None ):
+        '''
+        Get cell counts as a 2D array (e.g. for a heat map). Its size depends only on
+        the bounds and the cell size, not on the number of points.
+
+        Args
+            bounds: tuple (longitude_min, longitude_max, latitude_min, latitude_max)
+                (None -> bounds of the non-empty cells). Bounds with longitude_min > longitude_max
+                cross the antimeridian, e.g. (170, -170, -10, 10) covers longitudes 170 to 190 (-170).
+
+        Return
+            raster: int64 numpy array with one row per grid row (south to north) and one column per grid column
+            extent: tuple (longitude_min, longitude_max, latitude_min, latitude_max) of the raster
+                (longitude_max is above 180 when the raster crosses the antimeridian)
+        '''
+
+        # import required libraries
+        import numpy as np
+
+        # get rows and columns covered by bounds
+        if bounds is None and len( self.cells ) == 0:
+            row_low, row_high, col_low, col_high = 0, 0, 0, 0
+        elif bounds is None:
+            row_low, row_high = self.cell_rows.min(), self.cell_rows.max()
+            col_low, col_high = self.cell_cols.min(), self.cell_cols.max()
+        else:
+            # latitudes do not wrap around
+            if bounds[2] > bounds[3]:
+                raise ValueError( f'latitude_min ({bounds[2]}) is greater than latitude_max ({bounds[3]})' )
+            (row_low, row_high), (col_low, col_high) = self._cell_of( np.array( bounds[2:] ), np.array( bounds[:2] ) )
+            # longitude 180 is on column 0 -> keep the last column instead
+            if bounds[1] >= 180:
+                col_high = self.n_cols - 1
+
+        # number of columns (the column range wraps around the antimeridian when col_low > col_high)
+        n_rows = row_high - row_low + 1
+        n_cols = ( col_high - col_low ) % self.n_cols + 1
+
+        # place counts of cells within bounds
+        raster = np.zeros( ( n_rows, n_cols ), dtype = 'int64' )
+        offsets = ( self.cell_cols - col_low ) % self.n_cols
+        inside = ( self.cell_rows >= row_low ) & ( self.cell_rows <= row_high ) & ( offsets < n_cols )
+        raster[ self.cell_rows[ inside ] - row_low, offsets[ inside ] ] = self.counts[ inside ]
+
+        # get raster extent
+        extent = ( float( col_low * self.cell_size - 180 ), float( ( col_low + n_cols ) * self.cell_size - 180 ),
+                   float( row_low * self.cell_size - 90 ), float( ( row_high + 1 ) * self.cell_size - 90 ) )
+
+
+        return raster, extent
@@ -0,0 +1,55 @@
+import copy
+import json
+import os
+import unittest
+
+from a3data_case.benchmark import benchmark_functions, run_benchmarks, check_benchmark_regressions
+
+
+# committed baseline (regenerate with: a3data_case-run benchmark --scales 10000 100000 --repeat 5 --output benchmarks/baseline.json)
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "baseline.json")
+# tolerance against the baseline (timings of another machine or a busy one are noisy)
+THRESHOLD = float(os.environ.get("BENCHMARK_THRESHOLD", 2.0))
+# wall-clock timings only run on request (e.g. RUN_BENCHMARKS=1 python -m pytest tests/test_benchmark.py)
+RUN_BENCHMARKS = os.environ.get("RUN_BENCHMARKS", "") not in ("", "0")
+
+
+
+class TestBenchmarkRegressions(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        with open(BASELINE_PATH, encoding="utf-8") as file:
+            cls.baseline = json.load(file)
+
+
+    def test_baseline_covers_every_function(self):
+        timed = {entry["function"] for entry in self.baseline["results"] if entry["n_rows"] == 10_000}
+        self.assertEqual(timed, set(benchmark_functions()))
+
+
+    @unittest.skipUnless(RUN_BENCHMARKS, "wall-clock benchmark (set RUN_BENCHMARKS=1 to run it)")
+    def test_no_regression_against_baseline(self):
+        # time every function on the smallest scale of the baseline
+        results = run_benchmarks(scales=(10_000,), repeat=3, seed=self.baseline["meta"]["seed"], verbose=False)
+
+        report = check_benchmark_regressions(results, BASELINE_PATH, threshold=THRESHOLD, min_seconds=0.05, verbose=False)
+        self.assertEqual(len(report["comparisons"]), len(benchmark_functions()))
+        self.assertTrue(report["passed"], report["regressions"])
+
+
+    def test_slowdown_is_reported(self):
+        # one function gets three times slower
+        results = copy.deepcopy(self.baseline)
+        slowed = next(entry for entry in results["results"] if entry["function"] == "cramer_v_significance")
+        slowed["seconds"] *= 3
+
+        report = check_benchmark_regressions(results, self.baseline, threshold=THRESHOLD, verbose=False)
+        self.assertFalse(report["passed"])
+        self.assertEqual([(regression["function"], regression["n_rows"]) for regression in report["regressions"]],
+                         [("cramer_v_significance", slowed["n_rows"])])
+
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+import os
+import subprocess
+import sys
+import unittest
+
+from a3data_case.benchmark import HEAVY_LIBRARIES, check_import_time
+
+
+# import-time budget of the CLI in milliseconds
+BUDGET_MS = 100
+# root of the package, so child interpreters import this tree
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+
+class TestCLIImportTime(unittest.TestCase):
+
+    def test_help_is_under_budget(self):
+        # python -m a3data_case.cli --help on fresh interpreters (best of 3 runs)
+        results = check_import_time(budget_ms=BUDGET_MS, argv=("--help",), repeat=3, verbose=False)
+
+        self.assertLessEqual(results["import_ms"], BUDGET_MS)
+        self.assertTrue(results["passed"])
+
+
+    def test_help_does_not_import_heavy_libraries(self):
+        # run the CLI module as python -m does and list heavy libraries left in sys.modules
+        code = ("import runpy, sys\n"
+                "sys.argv = ['a3data_case.cli', '--help']\n"
+                "try:\n"
+                "    runpy.run_module('a3data_case.cli', run_name='__main__', alter_sys=True)\n"
+                "except SystemExit as exit:\n"
+                "    assert not exit.code, exit.code\n"
+                f"print('heavy:' + ','.join(sorted(name for name in {sorted(HEAVY_LIBRARIES)!r} if name in sys.modules)))\n")
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join([PACKAGE_ROOT, os.environ.get("PYTHONPATH", "")]))
+        process = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, check=True)
+
+        # help was printed and no heavy library was imported
+        self.assertIn("usage: a3data_case-run", process.stdout)
+        heavy_imports = process.stdout.strip().splitlines()[-1]
+        self.assertEqual(heavy_imports, "heavy:")
+        for name in ("pandas", "matplotlib", "scipy"):
+            self.assertNotIn(name, heavy_imports)
+
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from a3data_case.data_description import compute_summary_statistics, stream_summary_statistics, parse_lat_long, STATISTICS_COLUMNS
+
+
+
+class TestComputeSummaryStatistics(unittest.TestCase):
+
+    def test_statistics_match_pandas(self):
+        # numerical columns with missing values, a constant column and a non-numerical column
+        rng = np.random.default_rng(0)
+        df = pd.DataFrame({"normal": rng.normal(10, 3, 1_000),
+                           "skewed": rng.exponential(2, 1_000),
+                           "integers": rng.integers(-50, 50, 1_000),
+                           "constant": np.full(1_000, 7.0),
+                           "label": rng.choice(["a", "b"], 1_000)})
+        df.loc[::7, "normal"] = np.nan
+        df.loc[::11, "skewed"] = np.nan
+
+        # expected statistics from pandas (population std, like np.std)
+        numeric = df.select_dtypes(include="number")
+        expected = pd.DataFrame({"attribute": numeric.columns,
+                                 "mean": numeric.mean().to_numpy(),
+                                 "median": numeric.median().to_numpy(),
+                                 "std": numeric.std(ddof=0).to_numpy(),
+                                 "iqr": (numeric.quantile(0.75) - numeric.quantile(0.25)).to_numpy(),
+                                 "min": numeric.min().to_numpy(dtype="float64"),
+                                 "max": numeric.max().to_numpy(dtype="float64"),
+                                 "range": (numeric.max() - numeric.min()).to_numpy(dtype="float64"),
+                                 "skew": numeric.skew().to_numpy(),
+                                 "kurtosis": numeric.kurt().to_numpy()})
+
+        # check statistics
+        df_stats = compute_summary_statistics(df)
+        self.assertEqual(list(df_stats.columns), STATISTICS_COLUMNS)
+        self.assertEqual(list(df_stats["attribute"]), list(expected["attribute"]))
+        for column in STATISTICS_COLUMNS[1:]:
+            np.testing.assert_allclose(df_stats[column].to_numpy(dtype="float64"), expected[column].to_numpy(dtype="float64"),
+                                       rtol=1e-9, atol=1e-12, err_msg=column)
+
+
+
+class TestStreamSummaryStatistics(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # numerical features with missing values, placeholders on the first chunk or only on a later one,
+        # a text feature and a feature that only has text on a later chunk
+        rng = np.random.default_rng(1)
+        n_rows = 2_000
+        cls.df = pd.DataFrame({"normal": rng.normal(10, 3, n_rows),
+                               "integers": rng.integers(-50, 50, n_rows),
+                               "placeholder_first": rng.exponential(2, n_rows).round(3).astype(object),
+                               "placeholder_later": rng.integers(0, 9, n_rows).astype(object),
+                               "label": rng.choice(["a", "b"], n_rows),
+                               "text_later": rng.integers(0, 9, n_rows).astype(object)})
+        cls.df.loc[::7, "normal"] = np.nan
+        cls.df.loc[:10, "placeholder_first"] = "***"
+        cls.df.loc[1_500::3, "placeholder_later"] = "***"
+        cls.df.loc[1_900, "text_later"] = "unknown"
+
+        # CSV file as read by the streaming function
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.filepath = os.path.join(cls.directory.name, "data.csv")
+        cls.df.to_csv(cls.filepath, sep=";", index=False, encoding="latin-1")
+
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+
+    def assert_statistics_equal(self, df_stats, expected):
+        self.assertEqual(list(df_stats["attribute"]), list(expected["attribute"]))
+        for column in STATISTICS_COLUMNS[1:]:
+            np.testing.assert_allclose(df_stats[column].to_numpy(dtype="float64"), expected[column].to_numpy(dtype="float64"),
+                                       rtol=1e-9, atol=1e-12, err_msg=column)
+
+
+    def test_streaming_matches_exact(self):
+        # placeholders are missing values on every chunk -> same features as reading the whole file
+        expected = compute_summary_statistics(pd.read_csv(self.filepath, sep=";", encoding="latin-1", na_values=["***"]))
+        self.assertEqual(list(expected["attribute"]), ["normal", "integers", "placeholder_first", "placeholder_later"])
+
+        # median and IQR are exact while the sketches hold every value
+        df_stats = stream_summary_statistics(self.filepath, chunksize=300, sketch_size=4_096)
+        self.assert_statistics_equal(df_stats, expected)
+
+
+    def test_chunk_size_does_not_change_statistics(self):
+        expected = stream_summary_statistics(self.filepath, chunksize=len(self.df), sketch_size=4_096)
+        for chunksize in (1_000, 256, 7):
+            self.assert_statistics_equal(stream_summary_statistics(self.filepath, chunksize=chunksize, sketch_size=4_096), expected)
+
+        # dataframes given as chunks
+        chunks = (self.df.iloc[start:start + 500] for start in range(0, len(self.df), 500))
+        self.assert_statistics_equal(stream_summary_statistics(chunks, sketch_size=4_096), expected)
+
+
+
+class TestParseLatLong(unittest.TestCase):
+
+    def test_decimal_strings(self):
+        values = pd.Series(["-12.5", "-12,5", " -3.75 ", "48", None, "abc"])
+        np.testing.assert_allclose(parse_lat_long(values), [-12.5, -12.5, -3.75, 48.0, np.nan, np.nan])
+
+
+    def test_degree_minute_second_strings(self):
+        values = pd.Series(["12°30'00\"S", "-12°30'36\"", "12:30:36", "S 12°30'"])
+        np.testing.assert_allclose(parse_lat_long(values), [-12.5, -12.51, 12.51, -12.5])
+
+
+    def test_hemisphere_letters(self):
+        # south, west and oeste are negative, north is positive
+        values = pd.Series(["12.5 S", "12.5S", "48.25 W", "48,25 O", "12.5N", "12:30:36 N"])
+        np.testing.assert_allclose(parse_lat_long(values), [-12.5, -12.5, -48.25, -48.25, 12.5, 12.51])
+
+        # hemisphere letters before decimal values, as on degree-minute-second strings
+        values = pd.Series(["S22.5", "S 22,5", "W48.25", "O -48.25", "N12.5", "INFO 12.5"])
+        np.testing.assert_allclose(parse_lat_long(values), [-22.5, -22.5, -48.25, -48.25, 12.5, 12.5])
+
+
+    def test_repeated_strings_are_broadcast(self):
+        values = pd.Series(["10.5 S", "-3,25", "10.5 S", None] * 1_000)
+        np.testing.assert_allclose(parse_lat_long(values), [-10.5, -3.25, -10.5, np.nan] * 1_000)
+
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from a3data_case.data_extraction import plan_downcast, downcast_dataframe, load_cached_table, join_tables
+
+
+
+class TestPlanDowncast(unittest.TestCase):
+
+    def test_uint64_above_int64_max_is_kept_unsigned(self):
+        # values above the int64 range must not be planned as a signed type
+        df = pd.DataFrame({"big": np.array([1, 9223372036854775813], dtype="uint64"),
+                           "small": np.array([1, 200], dtype="uint64")})
+
+        # check plan and converted values
+        plan = plan_downcast(df)
+        self.assertNotIn("big", plan)
+        self.assertEqual(plan["small"], "uint8")
+        converted = downcast_dataframe(df, verbose=False)
+        self.assertEqual(converted["big"].tolist(), [1, 9223372036854775813])
+        self.assertEqual(converted["small"].tolist(), [1, 200])
+
+
+    def test_nullable_integer_with_missing_values_stays_integer(self):
+        # nullable integer columns with missing values
+        df = pd.DataFrame({"signed": pd.array([1, None, -3], dtype="Int64"),
+                           "wide": pd.array([None, 70000, 1], dtype="Int64"),
+                           "unsigned": pd.array([None, 3, 255], dtype="UInt32")})
+
+        # check plan
+        plan = plan_downcast(df)
+        self.assertEqual(plan, {"signed": "Int8", "wide": "Int32", "unsigned": "UInt8"})
+
+        # check that missing values and values are kept
+        converted = downcast_dataframe(df, verbose=False)
+        pd.testing.assert_frame_equal(converted, df, check_dtype=False)
+        self.assertEqual(str(converted["signed"].dtype), "Int8")
+
+
+    def test_float_columns(self):
+        # integral floats, floats with missing values and floats that need float64
+        df = pd.DataFrame({"integral": [1.0, 2.0, 300.0],
+                           "missing": [1.5, np.nan, 2.5],
+                           "precise": [0.1234567891, 1e10 + 0.5, 3.0]})
+
+        # check plan
+        self.assertEqual(plan_downcast(df), {"integral": "int16", "missing": "float32"})
+
+
+
+class TestLoadCachedTable(unittest.TestCase):
+
+    def test_parameter_variants_do_not_evict_each_other(self):
+        with tempfile.TemporaryDirectory() as directory:
+            # write a small CSV file
+            filepath = os.path.join(directory, "table.csv")
+            pd.DataFrame({"a": [1, 2, 3], "b": ["x", "y", "x"]}).to_csv(filepath, sep=";", index=False)
+            cache_dir = os.path.join(directory, "cache")
+
+            # build both variants
+            load_cached_table(filepath, cache_dir=cache_dir, downcast=True, verbose=False)
+            load_cached_table(filepath, cache_dir=cache_dir, downcast=False, verbose=False)
+            self.assertEqual(len(os.listdir(cache_dir)), 2)
+
+            # change source file -> only the version with the same parameters is replaced
+            pd.DataFrame({"a": [4, 5], "b": ["z", "z"]}).to_csv(filepath, sep=";", index=False)
+            df = load_cached_table(filepath, cache_dir=cache_dir, downcast=True, verbose=False)
+            self.assertEqual(df["a"].tolist(), [4, 5])
+            self.assertEqual(len(os.listdir(cache_dir)), 2)
+            df = load_cached_table(filepath, cache_dir=cache_dir, downcast=False, verbose=False)
+            self.assertEqual(len(os.listdir(cache_dir)), 2)
+
+
+
+class TestJoinTables(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # occurrences with a missing key and aircraft with zero, one or many rows per occurrence
+        rng = np.random.default_rng(0)
+        cls.left = pd.DataFrame({"codigo": [str(code) for code in rng.permutation(300)] + [None],
+                                 "uf": rng.choice(["SP", "MG", "RJ"], 301)})
+        cls.right = pd.DataFrame({"codigo": [str(code) for code in rng.integers(0, 400, 500)],
+                                  "aircraft": np.arange(500),
+                                  "uf": rng.choice(["SP", "PR"], 500)})
+
+
+    def test_matches_pd_merge(self):
+        for how in ("left", "inner"):
+            joined = join_tables(self.left, self.right, "codigo", "codigo", how=how, verbose=False)
+            expected = pd.merge(self.left, self.right, on="codigo", how=how)
+
+            # same rows (merge may order inner joins differently)
+            order = ["codigo", "aircraft"]
+            pd.testing.assert_frame_equal(joined.sort_values(order, na_position="first").reset_index(drop=True),
+                                          expected.sort_values(order, na_position="first").reset_index(drop=True),
+                                          check_dtype=False)
+
+
+    def test_left_join_keeps_left_order(self):
+        joined = join_tables(self.left, self.right, "codigo", "codigo", how="left", verbose=False)
+        expected = pd.merge(self.left, self.right, on="codigo", how="left")
+        self.assertEqual(joined["codigo"].tolist(), expected["codigo"].tolist())
+
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,255 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from a3data_case import eda
+
+
+
+class TestNumericalAggregates(unittest.TestCase):
+
+    def test_kde_matches_scipy(self):
+        # import required libraries
+        from scipy.stats import gaussian_kde
+
+        # binned KDE with Scott's rule bandwidth, scaled to histogram counts
+        # (few values, so a population std instead of the sample one would be noticed)
+        values = np.random.default_rng(0).normal(3, 2, 20)
+        aggregates = eda._numerical_aggregates(values)
+        expected = gaussian_kde(values)(aggregates["kde_x"]) * len(values) * (aggregates["edges"][1] - aggregates["edges"][0])
+        np.testing.assert_allclose(aggregates["kde_y"], expected, atol=0.003 * expected.max())
+
+
+    def test_single_and_constant_values_have_no_kde(self):
+        for values in ([1.5], [2.0] * 10):
+            aggregates = eda._numerical_aggregates(np.array(values))
+            self.assertEqual(aggregates["count"], len(values))
+            self.assertEqual(len(aggregates["kde_x"]), 0)
+
+
+
+class TestCategoricalAggregates(unittest.TestCase):
+
+    def test_numeric_looking_levels_are_drawn_as_labels(self):
+        # import required libraries
+        import io
+        from matplotlib.figure import Figure
+
+        # lat/long strings as they come on CENIPA files (decimal comma, long fractions)
+        df = pd.DataFrame({"latitude": ["3,5572685896"] * 5 + ["-23,3485226395"] * 3 + ["-0.9707092821", None]})
+
+        # draw aggregated counts and render the figure
+        fig = Figure()
+        ax = fig.add_subplot()
+        eda._draw_categorical(ax, df, "latitude", aggregate=True)
+        fig.savefig(io.BytesIO(), format="png")
+
+        # one bar per level at integer positions, labelled with the level
+        self.assertEqual([patch.get_height() for patch in ax.patches], [5, 3, 1])
+        self.assertEqual(list(ax.get_xticks()), [0, 1, 2])
+        self.assertEqual([label.get_text() for label in ax.get_xticklabels()],
+                         ["3,5572685896", "-23,3485226395", "-0.9707092821"])
+
+
+
+class TestExportFigures(unittest.TestCase):
+
+    def test_clashing_column_names_get_distinct_files(self):
+        # columns whose sanitized names are the same
+        df = pd.DataFrame({"a b": [1.0, 2.0, 3.0], "a_b": [3.0, 2.0, 1.0], "A/B": [1.0, 1.0, 2.0],
+                           "c": ["x", "y", "x"]})
+
+        with tempfile.TemporaryDirectory() as directory:
+            # export figures on the current process
+            manifest = eda.export_figures(df, directory, n_jobs=None)
+            files = [file_path for entry in manifest["figures"] for file_path in entry["files"]]
+
+            # every figure is saved to its own file
+            self.assertTrue(all(entry["error"] is None for entry in manifest["figures"]))
+            self.assertEqual(len({file_path.lower() for file_path in files}), 4)
+            self.assertTrue(all(os.path.isfile(file_path) for file_path in files))
+            self.assertEqual([os.path.basename(file_path) for file_path in files],
+                             ["numerical_a_b.png", "numerical_a_b_2.png", "numerical_A_B_3.png", "categorical_c.png"])
+
+
+    def test_default_export_saves_every_figure(self):
+        # import required libraries
+        from a3data_case.benchmark import make_cenipa_frame
+
+        # CENIPA-like columns (lat/long strings included) with the default aggregated plots
+        df = make_cenipa_frame(2_000, seed=42)
+        numerical = list(df.select_dtypes(include="number").columns)
+        categorical = list(df.select_dtypes(exclude="number").columns)
+
+        with tempfile.TemporaryDirectory() as directory:
+            manifest = eda.export_figures(df, directory, n_jobs=None)
+
+            # every column has its figure
+            self.assertEqual([entry["error"] for entry in manifest["figures"]], [None] * df.shape[1])
+            expected = {f"{kind}_{column}.{file_format}" for kind, columns in (("numerical", numerical), ("categorical", categorical))
+                        for column in columns for file_format in ("png",)}
+            self.assertEqual(set(os.listdir(directory)) - {"manifest.json"}, expected)
+            self.assertTrue(all(os.path.getsize(os.path.join(directory, file_name)) > 0 for file_name in expected))
+
+
+
+class TestCramerVSignificance(unittest.TestCase):
+
+    def test_cramer_v_matches_uncorrected_chi2_on_2x2_tables(self):
+        # import required libraries
+        from scipy.stats import chi2_contingency
+
+        # two associated binary columns
+        rng = np.random.default_rng(0)
+        one = rng.integers(0, 2, 500)
+        two = one ^ (rng.random(500) < 0.4)
+        df = pd.DataFrame({"one": one.astype(str), "two": two.astype(str)})
+
+        # bias-corrected cramer-v of the uncorrected pearson chi-squared
+        table = pd.crosstab(df["one"], df["two"]).to_numpy()
+        n = table.sum()
+        chi2 = chi2_contingency(table, correction=False)[0]
+        expected = np.sqrt((max(0, chi2 - 1 / (n - 1)) / n) / (1 - 1 / (n - 1)))
+
+        result = eda.cramer_v_significance(df, n_permutations=99, seed=0)
+        self.assertAlmostEqual(result["cramer_v"].iloc[0], expected, places=12)
+
+
+    def test_row_chunks_give_the_same_test(self):
+        # two weakly associated columns
+        rng = np.random.default_rng(1)
+        one = rng.integers(0, 5, 3_000)
+        two = (one + rng.integers(0, 4, 3_000)) % 6
+        reference = eda._permutation_test_pair(one, two, 200, 50, 0.05, None, 0)
+
+        # count only a few hundred rows per numpy call
+        default_codes = eda._PERMUTATION_CALL_CODES
+        eda._PERMUTATION_CALL_CODES = 50 * 700
+        try:
+            chunked = eda._permutation_test_pair(one, two, 200, 50, 0.05, None, 0)
+        finally:
+            eda._PERMUTATION_CALL_CODES = default_codes
+
+        self.assertEqual(chunked, reference)
+
+
+
+class TestCreateCramerVDataframe(unittest.TestCase):
+
+    def test_matches_pairwise_cramer_v(self):
+        # import required libraries
+        from a3data_case.benchmark import make_cenipa_frame, BENCHMARK_CATEGORICAL_COLUMNS
+
+        # CENIPA-like categorical columns (some with missing values)
+        df = make_cenipa_frame(5_000, seed=3)[BENCHMARK_CATEGORICAL_COLUMNS]
+
+        # cell by cell with the pandas crosstab implementation
+        expected = np.array([[eda.cramer_v_corrected_stat(df[row], df[column]) for column in df.columns]
+                             for row in df.columns])
+
+        # serial run and process pool
+        for n_jobs in (None, 2):
+            matrix = eda.create_cramer_v_dataframe(df, n_jobs=n_jobs)
+            self.assertEqual(list(matrix.index), list(df.columns))
+            self.assertEqual(list(matrix.columns), list(df.columns))
+            np.testing.assert_allclose(matrix.to_numpy(dtype="float64"), expected, rtol=1e-10)
+
+
+
+class TestSeasonFromDate(unittest.TestCase):
+
+    def test_season_boundaries(self):
+        # last day of a season and first day of the next one (dd/mm/yyyy strings and timestamps)
+        dates = pd.Series(["19/03/2020", "20/03/2020", "20/06/2020", "21/06/2020",
+                           "21/09/2020", "22/09/2020", "20/12/2020", "21/12/2020", "31/12/2020", "01/01/2021", None, "abc"])
+        south = ["summer", "autumn", "autumn", "winter", "winter", "spring", "spring", "summer", "summer", "summer", None, None]
+        north = ["winter", "spring", "spring", "summer", "summer", "autumn", "autumn", "winter", "winter", "winter", None, None]
+
+        self.assertEqual(eda.season_from_date(dates).tolist(), south)
+        self.assertEqual(eda.season_from_date(dates, hemisphere="north").tolist(), north)
+        timestamps = pd.to_datetime(dates, dayfirst=True, errors="coerce")
+        self.assertEqual(eda.season_from_date(timestamps, hemisphere="north").tolist(), north)
+
+        # month first strings
+        self.assertEqual(eda.season_from_date(pd.Series(["03/20/2020", "12/20/2020"]), dayfirst=False).tolist(), ["autumn", "spring"])
+
+        with self.assertRaises(ValueError):
+            eda.season_from_date(dates, hemisphere="east")
+
+
+
+class TestAggregationCube(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # three dimensions (one with missing values) and a measure with missing values
+        rng = np.random.default_rng(0)
+        cls.df = pd.DataFrame({"uf": rng.choice(["SP", "RJ", "MG", "***"], 5_000),
+                               "season": rng.choice(["summer", "autumn", "winter", "spring"], 5_000),
+                               "year": rng.choice([2010, 2011, 2012], 5_000),
+                               "fatalities": rng.poisson(1, 5_000).astype("float64")})
+        cls.df.loc[::13, "season"] = None
+        cls.df.loc[::17, "fatalities"] = np.nan
+        cls.cube = eda.build_aggregation_cube(cls.df, ["uf", "season", "year"], measures=["fatalities"])
+
+
+    def test_query_matches_groupby(self):
+        summer = self.df[self.df["season"] == "summer"]
+
+        # counts and sums per dimension(s), with and without filters
+        pd.testing.assert_series_equal(self.cube.query(by="uf"), self.df.groupby("uf").size(), check_names=False, check_index_type=False)
+        pd.testing.assert_series_equal(self.cube.query(by="uf", filters={"season": "summer"}), summer.groupby("uf").size(),
+                                       check_names=False, check_index_type=False)
+        pd.testing.assert_series_equal(self.cube.query(by="year", filters={"uf": ["SP", "RJ"]}, measure="fatalities"),
+                                       self.df[self.df["uf"].isin(["SP", "RJ"])].groupby("year")["fatalities"].sum(),
+                                       check_names=False, check_index_type=False)
+
+        # two dimensions in the requested order
+        expected = self.df.groupby(["year", "uf"]).size()
+        pd.testing.assert_series_equal(self.cube.query(by=["year", "uf"]).loc[expected.index], expected,
+                                       check_names=False, check_index_type=False)
+
+        # missing values are a level of their own
+        seasons = self.cube.query(by="season")
+        self.assertEqual(seasons[seasons.index.isna()].item(), self.df["season"].isna().sum())
+        self.assertEqual(self.cube.query(), len(self.df))
+
+        with self.assertRaises(KeyError):
+            self.cube.query(by="uf", filters={"uf": "XX"})
+
+
+    def test_ratio_vs_others_matches_groupby(self):
+        totals = self.df[self.df["season"] == "winter"].groupby("uf").size()
+        others = totals.drop(["SP", "***"])
+
+        comparison = self.cube.ratio_vs_others("uf", "SP", filters={"season": "winter"}, exclude=["***"])
+        self.assertEqual(comparison["value"], totals["SP"])
+        self.assertAlmostEqual(comparison["others_mean"], others.mean())
+        self.assertAlmostEqual(comparison["ratio"], totals["SP"] / others.mean())
+        self.assertEqual(comparison["total"], totals.sum())
+        self.assertAlmostEqual(comparison["share"], totals["SP"] / totals.sum())
+
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filepath = os.path.join(directory, "cube.npz")
+            self.cube.save(filepath)
+            cube = eda.AggregationCube.load(filepath)
+
+        # same dimensions, levels, arrays and query results
+        self.assertEqual(cube.dimensions, self.cube.dimensions)
+        for levels, expected in zip(cube.levels, self.cube.levels):
+            self.assertEqual([None if pd.isna(level) else level for level in levels], [None if pd.isna(level) else level for level in expected])
+        np.testing.assert_array_equal(cube.counts, self.cube.counts)
+        np.testing.assert_array_equal(cube.measures["fatalities"], self.cube.measures["fatalities"])
+        pd.testing.assert_series_equal(cube.query(by=["season", "uf"], filters={"year": 2011}, measure="fatalities"),
+                                       self.cube.query(by=["season", "uf"], filters={"year": 2011}, measure="fatalities"),
+                                       check_index_type=False)
+
+
+
+if __name__ == "__main__":
+    unittest.main()
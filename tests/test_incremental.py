@@ -0,0 +1,72 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from a3data_case.benchmark import make_cenipa_frame
+from a3data_case.data_description import compute_summary_statistics
+from a3data_case.eda import create_cramer_v_dataframe
+from a3data_case.incremental import ProfileState
+
+
+
+class TestProfileState(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # synthetic CENIPA-like rows fed as three appended releases
+        cls.df = make_cenipa_frame(12_000, seed=1)
+        cls.releases = np.array_split(np.arange(len(cls.df)), 3)
+        cls.categorical = ["ocorrencia_classificacao", "ocorrencia_uf", "ocorrencia_cidade", "aeronave_modelo",
+                           "aeronave_nivel_dano", "fator_area"]
+
+
+    def test_updates_match_full_recompute(self):
+        # feed releases one by one, saving and loading the state between them
+        with tempfile.TemporaryDirectory() as directory:
+            filepath = os.path.join(directory, "profile.npz")
+            ProfileState(categorical_columns=self.categorical, seed=0).save(filepath)
+            for release in self.releases:
+                state = ProfileState.load(filepath)
+                state.update(self.df.iloc[release])
+                state.save(filepath)
+            state = ProfileState.load(filepath)
+
+        # cramer-v of every pair is the value of a full recompute
+        self.assertEqual(state.n_rows, len(self.df))
+        np.testing.assert_allclose(state.cramer_v_dataframe().to_numpy(),
+                                   create_cramer_v_dataframe(self.df[self.categorical]).to_numpy(), rtol=1e-10)
+
+        # moments are exact (median and IQR come from quantile sketches)
+        exact = compute_summary_statistics(self.df[state.numerical_columns])
+        incremental = state.summary_statistics()
+        for column in ["mean", "std", "min", "max"]:
+            np.testing.assert_allclose(incremental[column].to_numpy(dtype="float64"),
+                                       exact[column].to_numpy(dtype="float64"), rtol=1e-9)
+
+
+    def test_tables_are_sparse(self):
+        # every non-numerical column, id-like ones included
+        columns = list(self.df.select_dtypes(exclude="number").columns)
+        state = ProfileState(categorical_columns=columns, seed=0).update(self.df)
+
+        # only observed level pairs are kept -> never more cells than rows per pair
+        for keys, counts in state.tables.values():
+            self.assertLessEqual(len(keys), len(self.df))
+            self.assertTrue((np.diff(keys) > 0).all())
+            self.assertTrue((counts > 0).all())
+
+
+    def test_default_features_leave_id_like_columns_out(self):
+        # one column has a distinct value per row
+        df = pd.DataFrame({"level": ["a", "b", "a", "b"] * 50, "identifier": [str(i) for i in range(200)]})
+        state = ProfileState(max_levels=10).update(df)
+
+        self.assertEqual(state.categorical_columns, ["level"])
+
+
+
+if __name__ == "__main__":
+    unittest.main()
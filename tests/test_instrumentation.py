@@ -0,0 +1,108 @@
+import json
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from a3data_case import instrumentation
+from a3data_case.instrumentation import JSONLinesSink, MemoryCollector, instrumented, stage, RECORD_FIELDS
+
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    def test_disabled_by_default(self):
+        # import required libraries
+        from a3data_case.data_description import compute_dataframe_description
+
+        # stages are a shared do-nothing context manager
+        self.assertFalse(instrumentation.is_instrumentation_enabled())
+        self.assertIs(stage("a"), stage("b", rows=10))
+
+        # library functions send records only inside an instrumented block
+        df = pd.DataFrame({"a": [1, 2, None]})
+        collector = MemoryCollector()
+        with instrumented(collector):
+            compute_dataframe_description(df)
+        n_records = len(collector.records)
+        compute_dataframe_description(df)
+        self.assertGreater(n_records, 0)
+        self.assertEqual(len(collector.records), n_records)
+        self.assertFalse(instrumentation.is_instrumentation_enabled())
+
+
+    def test_nested_stages(self):
+        collector = MemoryCollector()
+        with instrumented(collector, track_memory=True):
+            with stage("outer", rows=3):
+                with stage("inner", rows=3, column="a"):
+                    values = list(range(100_000))
+                del values
+        self.assertFalse(instrumentation.is_instrumentation_enabled())
+
+        # records come in the order stages finished, with their parents and depths
+        self.assertEqual(list(collector.to_dataframe().columns), RECORD_FIELDS)
+        inner, outer = collector.records
+        self.assertEqual([inner["stage"], outer["stage"]], ["inner", "outer"])
+        self.assertEqual([inner["parent"], outer["parent"]], ["outer", None])
+        self.assertEqual([inner["depth"], outer["depth"]], [1, 0])
+        self.assertEqual([inner["column"], outer["column"]], ["a", None])
+
+        # outer stage includes the time and the peak memory of the inner stage
+        self.assertGreaterEqual(outer["wall_seconds"], inner["wall_seconds"])
+        self.assertGreater(inner["peak_bytes"], 0)
+        self.assertGreaterEqual(outer["peak_bytes"], inner["peak_bytes"])
+
+
+    def test_json_lines_sink(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filepath = os.path.join(directory, "stages.jsonl")
+
+            # two stages, the second one twice
+            sink = JSONLinesSink(filepath, mode="w")
+            with instrumented(sink):
+                with stage("first", rows=1):
+                    pass
+                for _ in range(2):
+                    with stage("second", column="b"):
+                        pass
+            sink.close()
+
+            # one JSON object per line with every record field
+            with open(filepath, encoding="utf-8") as file:
+                records = [json.loads(line) for line in file]
+        self.assertEqual([record["stage"] for record in records], ["first", "second", "second"])
+        self.assertTrue(all(list(record) == RECORD_FIELDS for record in records))
+        self.assertEqual(records[0]["rows"], 1)
+        self.assertEqual(records[1]["column"], "b")
+
+
+    def test_worker_processes_send_no_records(self):
+        # import required libraries
+        from a3data_case.benchmark import make_cenipa_frame
+        from a3data_case.data_description import compute_dataframe_description
+        from a3data_case.eda import create_cramer_v_dataframe
+
+        df = make_cenipa_frame(2_000, seed=0)
+        with tempfile.TemporaryDirectory() as directory:
+            filepath = os.path.join(directory, "stages.jsonl")
+
+            # process pools of parallel.py and eda.py
+            sink = JSONLinesSink(filepath, mode="a")
+            with instrumented(sink):
+                compute_dataframe_description(df, n_jobs=2, backend="processes")
+                create_cramer_v_dataframe(df.select_dtypes(exclude="number").iloc[:, :4], n_jobs=2)
+            sink.close()
+
+            # only the stages of the parent process are written (per-column stages run on workers)
+            with open(filepath, encoding="utf-8") as file:
+                stages = [json.loads(line)["stage"] for line in file]
+        self.assertIn("map_column_groups._describe_columns", stages)
+        self.assertIn("create_cramer_v_dataframe.pairs", stages)
+        self.assertNotIn("compute_dataframe_description.unique_values", stages)
+
+
+
+if __name__ == "__main__":
+    unittest.main()
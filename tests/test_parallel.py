@@ -0,0 +1,67 @@
+import os
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from a3data_case.benchmark import make_cenipa_frame
+from a3data_case.data_description import compute_dataframe_description, compute_summary_statistics
+from a3data_case.data_extraction import plan_downcast
+from a3data_case.parallel import map_column_groups
+
+
+
+def column_summary(dataframe):
+    # one item per column that depends on values, dtype and label
+    return [(column, str(dataframe[column].dtype), [str(value) for value in dataframe[column].tolist()]) for column in dataframe.columns]
+
+
+
+class TestParallel(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # numpy-typed (shared) and object/extension (pickled) columns with a non-default index
+        cls.df = make_cenipa_frame(5_000, seed=2)
+        cls.df["when"] = pd.date_range("2000-01-01", periods=len(cls.df), freq="h")
+        cls.df["flag"] = np.arange(len(cls.df)) % 3 == 0
+        cls.df["nullable"] = pd.array(np.where(np.arange(len(cls.df)) % 5 == 0, None, np.arange(len(cls.df))), dtype="Int64")
+        cls.df.index = np.arange(len(cls.df))[::-1] + 7
+
+
+    def test_map_column_groups_rebuilds_columns(self):
+        # every backend gets the same columns, dtypes and labels
+        serial = map_column_groups(column_summary, self.df)
+        for backend in ("threads", "processes"):
+            self.assertEqual(map_column_groups(column_summary, self.df, n_jobs=2, backend=backend), serial)
+
+
+    def test_parallel_matches_serial(self):
+        # shared memory blocks are removed after the run
+        shared_before = set(os.listdir("/dev/shm")) if os.path.isdir("/dev/shm") else set()
+
+        for backend in ("threads", "processes"):
+            pd.testing.assert_frame_equal(compute_dataframe_description(self.df, n_jobs=2, backend=backend),
+                                          compute_dataframe_description(self.df))
+            pd.testing.assert_frame_equal(compute_summary_statistics(self.df, n_jobs=2, backend=backend),
+                                          compute_summary_statistics(self.df))
+            self.assertEqual(plan_downcast(self.df, n_jobs=2, backend=backend), plan_downcast(self.df))
+
+        shared_after = set(os.listdir("/dev/shm")) if os.path.isdir("/dev/shm") else set()
+        self.assertEqual(shared_after - shared_before, set())
+
+
+
+    def test_permutation_tests_do_not_depend_on_n_jobs(self):
+        # import required libraries
+        from a3data_case.benchmark import BENCHMARK_CATEGORICAL_COLUMNS
+        from a3data_case.eda import cramer_v_significance
+
+        df = self.df[BENCHMARK_CATEGORICAL_COLUMNS[:5]]
+        pd.testing.assert_frame_equal(cramer_v_significance(df, n_permutations=99, seed=0, n_jobs=2),
+                                      cramer_v_significance(df, n_permutations=99, seed=0))
+
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+import subprocess
+import sys
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from a3data_case.sketches import HyperLogLog, MomentSketch, QuantileSketch
+
+
+
+class TestHyperLogLog(unittest.TestCase):
+
+    def test_estimate_within_error_bound(self):
+        # strings with repeated values and numbers with many distinct values
+        rng = np.random.default_rng(0)
+        strings = pd.Series(rng.integers(0, 20_000, 200_000).astype(str)).astype(object)
+        numbers = pd.Series(rng.integers(0, 10**9, 200_000)).astype("float64")
+        numbers[::10] = np.nan
+
+        # check estimates against exact counts (4 standard errors)
+        for values in (strings, numbers):
+            sketch = HyperLogLog(14).update(values)
+            self.assertLess(abs(sketch.count() / values.nunique() - 1), 4 * sketch.standard_error)
+
+
+    def test_merge_across_processes(self):
+        # half of the values are sketched on another python process
+        values = pd.Series([f"value {i}" for i in range(50_000)], dtype=object)
+        code = ("import pandas as pd, sys; from a3data_case.sketches import HyperLogLog, MomentSketch, QuantileSketch; "
+                "values = pd.Series([f'value {i}' for i in range(25_000, 50_000)], dtype=object); "
+                "sys.stdout.write(HyperLogLog(12).update(values).registers.tobytes().hex())")
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+        other = HyperLogLog(12)
+        other.registers = np.frombuffer(bytes.fromhex(output), dtype="uint8").copy()
+
+        # merged sketch must be the sketch of all values
+        merged = HyperLogLog(12).update(values.iloc[:25_000]).merge(other)
+        np.testing.assert_array_equal(merged.registers, HyperLogLog(12).update(values).registers)
+
+
+
+class TestMomentSketch(unittest.TestCase):
+
+    def test_merged_chunks_match_numpy(self):
+        # three features (one with missing values, one without valid values) split into uneven chunks
+        rng = np.random.default_rng(0)
+        block = np.vstack([rng.normal(5, 2, 10_000), rng.exponential(3, 10_000), np.full(10_000, np.nan)])
+        block[0, ::9] = np.nan
+
+        sketch = MomentSketch(3)
+        for chunk in np.split(block, [1, 500, 501, 7_000], axis=1):
+            sketch.merge(MomentSketch(3).update(np.ascontiguousarray(chunk)))
+        whole = MomentSketch(3).update(block)
+
+        # same statistics as a single update and as numpy
+        for name, values in whole.to_dict().items():
+            np.testing.assert_allclose(sketch.to_dict()[name], values, rtol=1e-9, err_msg=name)
+        for row, values in enumerate(block[:2]):
+            values = values[~np.isnan(values)]
+            self.assertEqual(sketch.count[row], len(values))
+            self.assertAlmostEqual(sketch.mean[row], values.mean())
+            self.assertAlmostEqual(sketch.m2[row] / sketch.count[row], values.var(), places=9)
+            self.assertAlmostEqual(sketch.min[row], values.min())
+        self.assertEqual(sketch.count[2], 0)
+        self.assertEqual(sketch.na_count[2], 10_000)
+        self.assertTrue(np.isnan(sketch.min[2]))
+
+
+
+class TestQuantileSketch(unittest.TestCase):
+
+    def test_merge_is_exact_below_sketch_size(self):
+        rng = np.random.default_rng(0)
+        values = rng.normal(0, 1, 1_000)
+        sketch = QuantileSketch(2_048, seed=0).update(values[:600]).merge(QuantileSketch(2_048, seed=1).update(values[600:]))
+        np.testing.assert_allclose(sketch.quantile([0, 0.25, 0.5, 0.75, 1]), np.percentile(values, [0, 25, 50, 75, 100]))
+
+
+    def test_merged_quantiles_within_rank_error(self):
+        # sketches of 20 chunks merged into one
+        rng = np.random.default_rng(0)
+        values = rng.lognormal(0, 1, 200_000)
+        sketch = QuantileSketch(256, seed=0)
+        for index, chunk in enumerate(np.array_split(values, 20)):
+            sketch.merge(QuantileSketch(256, seed=index).update(chunk))
+        self.assertEqual(sketch.count, len(values))
+
+        # rank of every estimate is close to the requested one
+        q = np.array([0.01, 0.25, 0.5, 0.75, 0.99])
+        ranks = np.searchsorted(np.sort(values), sketch.quantile(q)) / len(values)
+        np.testing.assert_allclose(ranks, q, atol=0.01)
+
+
+
+class TestApproxDescription(unittest.TestCase):
+
+    def test_low_cardinality_and_string_columns_are_exact(self):
+        # import required libraries
+        from a3data_case.benchmark import make_cenipa_frame
+        from a3data_case.data_description import compute_dataframe_description
+
+        # CENIPA-like columns as arrow strings, python strings and categories
+        df = make_cenipa_frame(20_000, seed=0)
+        strings = df.select_dtypes(exclude="number").columns
+        df = pd.concat([df, df[strings].astype(object).add_suffix("_object"), df[strings].astype("category").add_suffix("_category")], axis=1)
+
+        # unique counts are exact (no sketch is needed) and memory is exact on small dataframes
+        exact = compute_dataframe_description(df)
+        approx = compute_dataframe_description(df, mode="approx", seed=0)
+        self.assertEqual(approx["Num unique"].tolist(), exact["Num unique"].tolist())
+        self.assertEqual(approx["Num unique error"].tolist(), [0] * df.shape[1])
+        np.testing.assert_allclose(approx["Memory MB"].to_numpy(dtype="float64"), exact["Memory MB"].to_numpy(dtype="float64"))
+
+
+    def test_distinct_numbers_are_estimated(self):
+        # import required libraries
+        from a3data_case.data_description import _approx_unique
+
+        # distinct numbers, repeated numbers and numbers with missing values
+        rng = np.random.default_rng(0)
+        distinct = pd.Series(rng.random(50_000))
+        repeated = pd.Series(rng.integers(0, 100, 50_000))
+        missing = distinct.where(np.arange(50_000) % 4 > 0)
+
+        # only distinct numbers go through the sketch (with a 95% error bound)
+        for values in (distinct, missing):
+            estimate, error = _approx_unique(values, min_rows=10_000)
+            self.assertGreater(error, 0)
+            self.assertLess(abs(estimate - values.nunique()), 2 * error)
+        self.assertEqual(_approx_unique(repeated, min_rows=10_000), (100, 0))
+        self.assertEqual(_approx_unique(distinct), (50_000, 0))
+
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from a3data_case.spatial import GridIndex, haversine_distance
+
+
+
+class TestGridIndex(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # random points, clustered points on both sides of the antimeridian and invalid coordinates
+        rng = np.random.default_rng(0)
+        cls.latitude = np.concatenate([rng.uniform(-60, 60, 5_000), rng.normal(-15, 2, 500), [np.nan, 95.0, 10.0]])
+        cls.longitude = np.concatenate([rng.uniform(-180, 180, 5_000), (rng.normal(180, 2, 500) + 180) % 360 - 180, [10.0, 10.0, np.nan]])
+        cls.grid = GridIndex(cls.latitude, cls.longitude, cell_size=0.5)
+        cls.valid = np.flatnonzero(np.isfinite(cls.latitude) & np.isfinite(cls.longitude) & (np.abs(cls.latitude) <= 90))
+
+
+    def brute_force(self, latitude, longitude):
+        # distances from the query point to every valid point
+        distances = haversine_distance(latitude, longitude, self.latitude[self.valid], self.longitude[self.valid])
+        order = np.argsort(distances, kind="stable")
+        return self.valid[order], distances[order]
+
+
+    def test_radius_query_matches_brute_force(self):
+        # query points near the antimeridian (both sides), near a pole and at the origin
+        for latitude, longitude in [(-15.0, 179.9), (-15.0, -179.8), (85.0, 0.0), (0.0, 0.0)]:
+            for radius_km in (50, 300, 2_000):
+                expected_ids, expected_distances = self.brute_force(latitude, longitude)
+                expected_ids = expected_ids[expected_distances <= radius_km]
+
+                point_ids, distances = self.grid.radius_query(latitude, longitude, radius_km)
+                self.assertEqual(set(point_ids), set(expected_ids), (latitude, longitude, radius_km))
+                self.assertTrue(np.all(np.diff(distances) >= 0))
+                np.testing.assert_allclose(distances, haversine_distance(latitude, longitude, self.latitude[point_ids], self.longitude[point_ids]))
+
+
+    def test_knn_query_matches_brute_force(self):
+        for latitude, longitude in [(-15.0, 179.9), (-15.0, -179.8), (85.0, 0.0), (0.0, 0.0)]:
+            _, expected_distances = self.brute_force(latitude, longitude)
+
+            point_ids, distances = self.grid.knn_query(latitude, longitude, k=10)
+            self.assertEqual(len(point_ids), 10)
+            np.testing.assert_allclose(distances, expected_distances[:10])
+
+
+    def test_raster_across_the_antimeridian(self):
+        # a raster over the whole earth holds every valid point
+        raster, extent = self.grid.to_raster((-180, 180, -90, 90))
+        self.assertEqual(raster.shape, (self.grid.n_rows, self.grid.n_cols))
+        self.assertEqual(raster.sum(), len(self.valid))
+        self.assertEqual(extent, (-180.0, 180.0, -90.0, 90.0))
+
+        # bounds from 170 to -170 cover 20 degrees of longitude (plus the cells of the upper bounds)
+        raster, extent = self.grid.to_raster((170, -170, -30, 0))
+        self.assertEqual(raster.shape, (61, 41))
+        self.assertEqual(extent, (170.0, 190.5, -30.0, 0.5))
+        latitude, longitude = self.latitude[self.valid], self.longitude[self.valid]
+        within = (latitude >= -30) & (latitude < 0.5) & ((longitude >= 170) | (longitude < -169.5))
+        self.assertEqual(raster.sum(), within.sum())
+
+        # latitudes do not wrap around
+        with self.assertRaises(ValueError):
+            self.grid.to_raster((170, -170, 10, -10))
+
+
+    def test_heatmap_returns_figure(self):
+        # import required libraries
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+        from a3data_case.eda import spatial_heatmap_plot
+
+        df = pd.DataFrame({"lat": self.latitude, "lon": self.longitude})
+        fig, grid = spatial_heatmap_plot(df, "lat", "lon", cell_size=1, bounds=(170, -170, -30, 0))
+        self.assertIn(fig.number, plt.get_fignums())
+        self.assertEqual(len(grid.point_ids), len(self.valid))
+        plt.close(fig)
+
+
+
+if __name__ == "__main__":
+    unittest.main()